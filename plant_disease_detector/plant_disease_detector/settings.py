@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 from pathlib import Path
 import os
+import tempfile
 from dotenv import load_dotenv
 from corsheaders.defaults import default_headers
 
@@ -55,6 +56,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # First, so that its request timings include every other middleware.
+    'plant_doctor_ai.middleware.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -92,6 +95,13 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # The tests use a file rather than Django's default in-memory
+        # database, so that tests running requests on several threads see
+        # SQLite's real locking (an in-memory database shared between
+        # threads fails with "database table is locked" instead of waiting).
+        'TEST': {
+            'NAME': BASE_DIR / 'test_db.sqlite3',
+        },
     }
 }
 
@@ -144,4 +154,171 @@ REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'rest_framework_simplejwt.authentication.JWTAuthentication',
     ),
-}
\ No newline at end of file
+}
+
+# Model inference
+# Concurrent analyze requests are collected into one forward pass of up to
+# MODEL_BATCH_MAX_SIZE images, waiting at most MODEL_BATCH_MAX_WAIT_MS for
+# the batch to fill up.
+
+MODEL_BATCH_MAX_SIZE = int(os.getenv('MODEL_BATCH_MAX_SIZE', 8))
+MODEL_BATCH_MAX_WAIT_MS = float(os.getenv('MODEL_BATCH_MAX_WAIT_MS', 10))
+
+# Maximum number of images accepted by the analyze/batch/ endpoint.
+ANALYZE_BATCH_MAX_IMAGES = int(os.getenv('ANALYZE_BATCH_MAX_IMAGES', 32))
+
+# Treatment info cache
+# Bump TREATMENT_CACHE_VERSION (e.g. after changing the Gemini prompt) to make
+# every cached entry stale. Entries older than TREATMENT_CACHE_TTL_DAYS are
+# regenerated on the next request; 0 disables expiry.
+
+TREATMENT_CACHE_VERSION = int(os.getenv('TREATMENT_CACHE_VERSION', 1))
+TREATMENT_CACHE_TTL_DAYS = int(os.getenv('TREATMENT_CACHE_TTL_DAYS', 30))
+
+# Size of the thread pool that async views use for image decoding and
+# inference. Requests beyond this wait in the pool's queue without holding
+# up the event loop.
+MODEL_INFERENCE_WORKERS = int(os.getenv('MODEL_INFERENCE_WORKERS', 4))
+
+# Admission control for the analyze endpoints
+# At most INFERENCE_MAX_IN_FLIGHT requests per process decode and classify
+# images at once. Up to INFERENCE_MAX_QUEUE more wait, for at most
+# INFERENCE_QUEUE_TIMEOUT_SECONDS; the rest get a 503 with Retry-After.
+# 0 in-flight disables it. Each user may also send
+# ANALYZE_RATE_LIMIT_PER_MINUTE analyze requests, in bursts of up to
+# ANALYZE_RATE_LIMIT_BURST, before getting a 429; 0 disables the limit.
+INFERENCE_MAX_IN_FLIGHT = int(os.getenv('INFERENCE_MAX_IN_FLIGHT', 8))
+INFERENCE_MAX_QUEUE = int(os.getenv('INFERENCE_MAX_QUEUE', 16))
+INFERENCE_QUEUE_TIMEOUT_SECONDS = float(os.getenv('INFERENCE_QUEUE_TIMEOUT_SECONDS', 10))
+ANALYZE_RATE_LIMIT_PER_MINUTE = float(os.getenv('ANALYZE_RATE_LIMIT_PER_MINUTE', 30))
+ANALYZE_RATE_LIMIT_BURST = int(os.getenv('ANALYZE_RATE_LIMIT_BURST', 10))
+
+# Services (the PyTorch model and the Gemini client) are created lazily on
+# first use. Set SERVICES_WARMUP_ON_STARTUP=1 for serving processes to load
+# them when Django starts instead.
+SERVICES_WARMUP_ON_STARTUP = os.getenv('SERVICES_WARMUP_ON_STARTUP', '0') == '1'
+
+# 'gemini' talks to the real API; 'fake' answers locally with canned text
+# after GEMINI_FAKE_LATENCY_MS, for development and benchmarks.
+GEMINI_BACKEND = os.getenv('GEMINI_BACKEND', 'gemini')
+GEMINI_FAKE_LATENCY_MS = float(os.getenv('GEMINI_FAKE_LATENCY_MS', 0))
+# Fraction of fake Gemini calls that fail, to exercise the retry and
+# circuit breaker paths.
+GEMINI_FAKE_ERROR_RATE = float(os.getenv('GEMINI_FAKE_ERROR_RATE', 0))
+
+# 'inline' waits for the treatment info before answering an analyze request.
+# 'background' answers with the prediction alone when the treatment is not
+# cached yet; TREATMENT_ENRICHMENT_WORKERS threads fill it in afterwards and
+# clients poll or stream analysis/<id>/ for it. Clients can pick either
+# per request with ?enrichment=. Event streams check for completion every
+# ENRICHMENT_POLL_INTERVAL_SECONDS and end after
+# ENRICHMENT_STREAM_TIMEOUT_SECONDS, kept short because each open stream
+# holds a worker thread; clients then reconnect.
+TREATMENT_ENRICHMENT_MODE = os.getenv('TREATMENT_ENRICHMENT_MODE', 'inline')
+TREATMENT_ENRICHMENT_WORKERS = int(os.getenv('TREATMENT_ENRICHMENT_WORKERS', 4))
+ENRICHMENT_POLL_INTERVAL_SECONDS = float(os.getenv('ENRICHMENT_POLL_INTERVAL_SECONDS', 0.5))
+ENRICHMENT_STREAM_TIMEOUT_SECONDS = float(os.getenv('ENRICHMENT_STREAM_TIMEOUT_SECONDS', 10))
+
+# Gemini calls time out after GEMINI_TIMEOUT_SECONDS per attempt and
+# GEMINI_DEADLINE_SECONDS in total. Timeouts, connection errors and
+# overload responses are retried up to GEMINI_MAX_RETRIES times with
+# jittered exponential backoff. After GEMINI_CIRCUIT_FAILURE_THRESHOLD
+# failed calls in a row, Gemini is not called for
+# GEMINI_CIRCUIT_RESET_SECONDS and cached or fallback answers are served.
+GEMINI_TIMEOUT_SECONDS = float(os.getenv('GEMINI_TIMEOUT_SECONDS', 15))
+GEMINI_DEADLINE_SECONDS = float(os.getenv('GEMINI_DEADLINE_SECONDS', 30))
+GEMINI_MAX_RETRIES = int(os.getenv('GEMINI_MAX_RETRIES', 2))
+GEMINI_RETRY_BASE_DELAY_MS = float(os.getenv('GEMINI_RETRY_BASE_DELAY_MS', 250))
+GEMINI_RETRY_MAX_DELAY_MS = float(os.getenv('GEMINI_RETRY_MAX_DELAY_MS', 2000))
+GEMINI_CIRCUIT_FAILURE_THRESHOLD = int(os.getenv('GEMINI_CIRCUIT_FAILURE_THRESHOLD', 5))
+GEMINI_CIRCUIT_RESET_SECONDS = float(os.getenv('GEMINI_CIRCUIT_RESET_SECONDS', 30))
+
+# Inference runtime: 'eager' (PyTorch), 'torchscript', 'onnxruntime' or
+# 'quantized' (INT8, CPU only). All but 'eager' load artifacts written by
+# `manage.py export_model` / `manage.py quantize_model`.
+MODEL_BACKEND = os.getenv('MODEL_BACKEND', 'eager')
+
+# 'local' runs the model inside every web process. 'pool' sends decoded
+# images to a separate pool of inference processes (`manage.py
+# run_inference_pool`) over the Unix socket MODEL_POOL_ADDRESS, so web
+# processes never load torch. MODEL_POOL_TIMEOUT is in seconds.
+MODEL_INFERENCE_MODE = os.getenv('MODEL_INFERENCE_MODE', 'local')
+MODEL_POOL_ADDRESS = os.getenv('MODEL_POOL_ADDRESS', os.path.join(tempfile.gettempdir(), 'plantdoc-inference.sock'))
+MODEL_POOL_WORKERS = int(os.getenv('MODEL_POOL_WORKERS', 2))
+MODEL_POOL_TIMEOUT = float(os.getenv('MODEL_POOL_TIMEOUT', 30))
+
+# Uploads to the analyze endpoints are validated while they stream in: each
+# image may have at most IMAGE_UPLOAD_MAX_BYTES bytes and
+# IMAGE_UPLOAD_MAX_PIXELS pixels (read from its header, before any decoding),
+# and must be a JPEG, PNG or WebP. Other uploads (e.g. in the admin) are not.
+# Uploads up to FILE_UPLOAD_MAX_MEMORY_SIZE bytes are kept in memory, larger
+# ones are spooled to a temporary file.
+IMAGE_UPLOAD_MAX_BYTES = int(os.getenv('IMAGE_UPLOAD_MAX_BYTES', 10 * 1024 * 1024))
+IMAGE_UPLOAD_MAX_PIXELS = int(os.getenv('IMAGE_UPLOAD_MAX_PIXELS', 50_000_000))
+FILE_UPLOAD_MAX_MEMORY_SIZE = int(os.getenv('FILE_UPLOAD_MAX_MEMORY_SIZE', 2_621_440))
+
+# Uploads are hashed so that identical images are stored once and skip
+# inference (see plant_doctor_ai.services.content_store).
+FILE_UPLOAD_HANDLERS = [
+    'plant_doctor_ai.upload_handlers.HashingMemoryFileUploadHandler',
+    'plant_doctor_ai.upload_handlers.HashingTemporaryFileUploadHandler',
+]
+
+# Also match re-encoded or resized copies of an earlier upload by their
+# perceptual hash (dHash) and reuse its prediction.
+IMAGE_DEDUPE_PERCEPTUAL_HASH = os.getenv('IMAGE_DEDUPE_PERCEPTUAL_HASH', '0') == '1'
+
+# Number of memoized predictions kept in process memory in front of the
+# PredictionMemo table.
+PREDICTION_MEMO_LRU_SIZE = int(os.getenv('PREDICTION_MEMO_LRU_SIZE', 2048))
+
+# Analysis history
+# Default and maximum page size for history/?page_size=...&cursor=...
+HISTORY_PAGE_SIZE = int(os.getenv('HISTORY_PAGE_SIZE', 20))
+HISTORY_MAX_PAGE_SIZE = int(os.getenv('HISTORY_MAX_PAGE_SIZE', 100))
+
+# Generate the thumbnail/preview derivatives of a new image as soon as it is
+# stored, on IMAGE_DERIVATIVE_WORKERS background threads, so the upload
+# request does not wait for them. Until they exist, responses carry no
+# thumbnail; when off, only `manage.py generate_derivatives` creates them.
+IMAGE_DERIVATIVES_ON_INGEST = os.getenv('IMAGE_DERIVATIVES_ON_INGEST', '1') == '1'
+IMAGE_DERIVATIVE_WORKERS = int(os.getenv('IMAGE_DERIVATIVE_WORKERS', 1))
+
+# Number of ranked alternatives returned with every prediction, and the
+# temperature used to calibrate its probabilities (softmax(logits / T)).
+# Fit T on labelled images with `manage.py calibrate_model`.
+MODEL_TOP_K = int(os.getenv('MODEL_TOP_K', 3))
+MODEL_CALIBRATION_TEMPERATURE = float(os.getenv('MODEL_CALIBRATION_TEMPERATURE', 1.0))
+
+# Directory holding class_names.json and the model artifacts.
+MODEL_ARTIFACTS_DIR = os.getenv('MODEL_ARTIFACTS_DIR', os.path.join(BASE_DIR, 'deployment_artifacts'))
+
+# Chat sessions
+# Chat history is kept server-side. Once the messages not yet summarized
+# exceed CHAT_CONTEXT_TOKEN_BUDGET (estimated) tokens, all but the last
+# CHAT_KEEP_RECENT_MESSAGES (one more if that would split a turn) are folded
+# into a rolling summary of at most CHAT_SUMMARY_MAX_TOKENS, by
+# CHAT_COMPACTION_WORKERS background threads.
+# For clients that still send their own history, only the newest
+# CHAT_MAX_HISTORY_MESSAGES items are used. Chat request bodies over
+# CHAT_MAX_REQUEST_BYTES are rejected outright, as a guard against abuse.
+CHAT_CONTEXT_TOKEN_BUDGET = int(os.getenv('CHAT_CONTEXT_TOKEN_BUDGET', 3000))
+CHAT_KEEP_RECENT_MESSAGES = int(os.getenv('CHAT_KEEP_RECENT_MESSAGES', 6))
+CHAT_SUMMARY_MAX_TOKENS = int(os.getenv('CHAT_SUMMARY_MAX_TOKENS', 400))
+CHAT_COMPACTION_WORKERS = int(os.getenv('CHAT_COMPACTION_WORKERS', 2))
+CHAT_MAX_REQUEST_BYTES = int(os.getenv('CHAT_MAX_REQUEST_BYTES', 1048576))
+CHAT_MAX_HISTORY_MESSAGES = int(os.getenv('CHAT_MAX_HISTORY_MESSAGES', 40))
+
+# Chat pre-filter
+# Platform FAQs, greetings and off-topic messages are answered locally when
+# their best intent scores at least CHAT_PREFILTER_THRESHOLD (0-1 cosine
+# similarity) and beats the plant-question intent by CHAT_PREFILTER_MARGIN.
+# Run `python manage.py eval_chat_prefilter` after changing either value.
+CHAT_PREFILTER_ENABLED = os.getenv('CHAT_PREFILTER_ENABLED', '1') == '1'
+CHAT_PREFILTER_THRESHOLD = float(os.getenv('CHAT_PREFILTER_THRESHOLD', 0.5))
+CHAT_PREFILTER_MARGIN = float(os.getenv('CHAT_PREFILTER_MARGIN', 0.1))
+
+# Metrics
+# Bearer token required to read metrics/ (Prometheus "authorization"
+# scrape config). When empty, the endpoint is disabled and answers 404.
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
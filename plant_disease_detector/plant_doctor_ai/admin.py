@@ -1,5 +1,11 @@
 from django.contrib import admin
-from .models import AnalysisResult
+from .models import AnalysisResult, TreatmentCacheEntry, ImageBlob, PredictionMemo, AnalyticsRollup, ChatSession, ChatMessage
 # Register your models here.
 
-admin.site.register(AnalysisResult)
\ No newline at end of file
+admin.site.register(AnalysisResult)
+admin.site.register(TreatmentCacheEntry)
+admin.site.register(ImageBlob)
+admin.site.register(PredictionMemo)
+admin.site.register(AnalyticsRollup)
+admin.site.register(ChatSession)
+admin.site.register(ChatMessage)
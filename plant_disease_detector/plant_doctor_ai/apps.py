@@ -1,6 +1,18 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class PlantDoctorAiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'plant_doctor_ai'
+
+    def ready(self):
+        # Keeps the analytics rollups in step with deleted analyses.
+        from . import signals  # noqa: F401
+
+        # Services are built lazily on first use. Serving processes can opt
+        # into loading them at startup instead, so that the first request
+        # does not pay for importing torch and loading the weights.
+        if getattr(settings, 'SERVICES_WARMUP_ON_STARTUP', False):
+            from .services.providers import warmup
+            warmup()
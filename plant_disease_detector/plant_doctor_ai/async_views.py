@@ -0,0 +1,193 @@
+import json
+
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import status
+from rest_framework.exceptions import AuthenticationFailed, Throttled
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from .services.providers import model_service, gemini_service
+from .services.treatment_cache import treatment_cache
+from .services.content_store import discard_blob, store_blob, prediction_memo
+from .serializers import ChatbotRequestSerializer
+from .services.chat_sessions import append_turn
+from .services.chat_prefilter import chat_prefilter
+from .services.admission import AdmissionRejected, inference_admission
+from .throttling import AnalyzeRateThrottle
+from .services.gemini_service import CHAT_ERROR_MESSAGE
+from .views import (
+    build_analysis, format_analysis, save_analyses, chat_request_too_large, resolve_chat_session,
+    upload_too_large, upload_too_large_error, queue_enrichment, BUSY_ERROR, CHAT_TOO_LARGE_ERROR
+)
+from .upload_handlers import UploadRejected, validate_image_uploads
+from .services.preprocessing import ImageDecodeError
+from .services.enrichment import enrichment_mode
+
+
+async def authenticate(request):
+    """
+    Authenticates a plain Django request with the same JWT scheme as the DRF
+    views. Returns the user, or None if the credentials are missing or invalid.
+    """
+    try:
+        result = await sync_to_async(JWTAuthentication().authenticate)(request)
+    except AuthenticationFailed:
+        return None
+    return result[0] if result else None
+
+
+def unauthorized():
+    return JsonResponse(
+        {"detail": "Authentication credentials were not provided or are invalid."},
+        status=status.HTTP_401_UNAUTHORIZED
+    )
+
+
+def throttled(wait):
+    """The same 429 that DRF sends for a throttled request."""
+    exc = Throttled(wait)
+    return JsonResponse(
+        {"detail": str(exc.detail)}, status=status.HTTP_429_TOO_MANY_REQUESTS, headers={'Retry-After': str(exc.wait)}
+    )
+
+
+def busy(rejection):
+    return JsonResponse(
+        BUSY_ERROR, status=status.HTTP_503_SERVICE_UNAVAILABLE, headers={'Retry-After': str(rejection.retry_after)}
+    )
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class AsyncAnalyzePlantView(View):
+    """
+    ASGI variant of AnalyzePlantView.
+
+    Decoding and inference run on the model service's bounded executor and
+    the Gemini call is awaited, so a single worker can keep many analyses in
+    flight without blocking a thread per request. Rate limiting and
+    admission control work as in the sync view; queued requests wait on the
+    event loop. So does '?enrichment=background'.
+    """
+
+    async def post(self, request, *args, **kwargs):
+        user = await authenticate(request)
+        if user is None:
+            return unauthorized()
+
+        throttle = AnalyzeRateThrottle()
+        if not await sync_to_async(throttle.consume)(user.pk, view='analyze-plant-async'):
+            return throttled(throttle.wait())
+        if upload_too_large(request):
+            return JsonResponse(upload_too_large_error(), status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        try:
+            inference_admission.check()
+        except AdmissionRejected as rejection:
+            return busy(rejection)
+
+        validate_image_uploads(request)
+        try:
+            files = await sync_to_async(lambda: request.FILES)()
+        except UploadRejected as rejection:
+            return JsonResponse({"error": str(rejection)}, status=rejection.status_code)
+        image_file = files.get('image')
+        language = request.headers.get('Language')
+
+        if not image_file:
+            return JsonResponse(
+                {"error": "Image file not provided."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        # 1. Store the image once, then reuse a memoized prediction or run the
+        #    model on the bounded inference executor, once admitted
+        try:
+            async with inference_admission.aadmit():
+                blob = await sync_to_async(store_blob)(image_file)
+                # The first use of the model service imports torch and loads
+                # the weights, which must not happen on the event loop.
+                model_version = await sync_to_async(lambda: model_service.model_version, thread_sensitive=False)()
+                prediction = await sync_to_async(prediction_memo.get)(blob, model_version)
+                if prediction is None:
+                    try:
+                        prediction = await model_service.apredict(image_file)
+                    except ImageDecodeError:
+                        await sync_to_async(discard_blob)(blob)
+                        raise
+                    await sync_to_async(prediction_memo.set)(blob, model_version, prediction)
+        except AdmissionRejected as rejection:
+            return busy(rejection)
+        except ImageDecodeError as e:
+            return JsonResponse({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        if not prediction:
+            return JsonResponse(
+                {"error": "Failed to analyze the image."},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+        # 2. Enrich with treatment info without blocking the event loop
+        #    (or, in background mode, after the response)
+        if enrichment_mode(request.GET.get('enrichment')) == 'background':
+            treatment_info = await sync_to_async(treatment_cache.get)(prediction['disease'], language)
+        else:
+            treatment_info = await treatment_cache.aget_treatment_info(prediction['disease'], language=language)
+
+        # 3. Save the result and update user analytics in a short transaction
+        analysis = build_analysis(user, blob, prediction, treatment_info, language)
+        analysis, = await sync_to_async(save_analyses)(user, [analysis])
+        queue_enrichment([analysis], language)
+
+        return JsonResponse(format_analysis(analysis, request), status=status.HTTP_200_OK)
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class AsyncChatbotView(View):
+    """
+    ASGI variant of ChatbotView that awaits the Gemini chat call.
+    """
+
+    async def post(self, request, *args, **kwargs):
+        user = await authenticate(request)
+        if user is None:
+            return unauthorized()
+
+        if chat_request_too_large(request):
+            return JsonResponse(CHAT_TOO_LARGE_ERROR, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+
+        try:
+            data = json.loads(request.body or b'{}')
+        except ValueError:
+            return JsonResponse({"error": "Invalid JSON body."}, status=status.HTTP_400_BAD_REQUEST)
+
+        serializer = ChatbotRequestSerializer(data=data)
+        if not serializer.is_valid():
+            return JsonResponse(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        validated_data = serializer.validated_data
+        new_message = validated_data.get('newMessage')
+
+        session, history = None, validated_data.get('history')
+        if validated_data.get('sessionId'):
+            session, history = await sync_to_async(resolve_chat_session)(user, validated_data)
+        if session is None and validated_data.get('sessionId'):
+            return JsonResponse({"error": "Chat session not found."}, status=status.HTTP_404_NOT_FOUND)
+
+        language = request.headers.get('Language')
+        ai_response = chat_prefilter.answer(new_message, language)
+        if ai_response is None:
+            try:
+                ai_response = await gemini_service.aprocess_chat(history, new_message, language=language)
+            except Exception as e:
+                return JsonResponse(
+                    {"error": "An unexpected error occurred. We are unable to process your request at this time."},
+                    status=status.HTTP_500_INTERNAL_SERVER_ERROR
+                )
+
+        if session is None:
+            return JsonResponse({"response": ai_response}, status=status.HTTP_200_OK)
+
+        if ai_response != CHAT_ERROR_MESSAGE:
+            await sync_to_async(append_turn)(session, new_message, ai_response)
+        return JsonResponse({"response": ai_response, "sessionId": str(session.id)}, status=status.HTTP_200_OK)
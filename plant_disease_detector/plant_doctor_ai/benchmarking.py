@@ -0,0 +1,69 @@
+# plant_doctor_ai/benchmarking.py
+"""
+Shared helpers for the benchmark management commands.
+
+Benchmarks run against a throwaway SQLite database and a temporary
+MEDIA_ROOT, so they never touch db.sqlite3 or the real uploads.
+"""
+
+import glob
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connection
+from django.test.utils import override_settings
+
+
+def sample_images():
+    """Returns the sample photos shipped under media/analyses."""
+    pattern = os.path.join(settings.MEDIA_ROOT, 'analyses', '**', '*.jpg')
+    derivatives = os.path.join(settings.MEDIA_ROOT, 'analyses', 'derivatives', '')
+    return sorted(path for path in glob.glob(pattern, recursive=True) if not path.startswith(derivatives))
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, round(pct / 100.0 * len(ordered) + 0.5) - 1))
+    return ordered[rank]
+
+
+@contextmanager
+def isolated_environment():
+    """
+    Creates a file-backed test database and a temporary MEDIA_ROOT for the
+    duration of the block. A file (rather than in-memory) database is used
+    so that several threads can write to it concurrently.
+    """
+    workdir = tempfile.mkdtemp(prefix='plantdoc-bench-')
+    test_settings = connection.settings_dict.setdefault('TEST', {})
+    previous_test_name = test_settings.get('NAME')
+    test_settings['NAME'] = os.path.join(workdir, 'bench.sqlite3')
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        with override_settings(MEDIA_ROOT=os.path.join(workdir, 'media')):
+            yield workdir
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        test_settings['NAME'] = previous_test_name
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def create_benchmark_user(email='bench@example.com'):
+    from users.models import User
+    return User.objects.create_user(email=email, full_name='Benchmark User', password='benchmark')
+
+
+def latency_summary(latencies):
+    """p50/p99/mean of a list of durations in seconds, as milliseconds."""
+    return {
+        "samples": len(latencies),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 3) if latencies else 0.0,
+    }
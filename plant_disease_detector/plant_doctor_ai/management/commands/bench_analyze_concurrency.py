@@ -0,0 +1,82 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from rest_framework.test import APIClient
+
+from plant_doctor_ai.benchmarking import create_benchmark_user, isolated_environment, sample_images
+from plant_doctor_ai.services import treatment_cache as treatment_cache_module
+from plant_doctor_ai.services.fake_gemini import FakeGeminiService
+from plant_doctor_ai.services.gemini_service import SUPPORTED_LANGUAGES
+
+
+class Command(BaseCommand):
+    help = (
+        "Runs N analyze requests in parallel against a fake Gemini with a fixed "
+        "latency, through the real treatment cache, and checks that they overlap "
+        "instead of queueing behind each other."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=8, help="Number of parallel analyze requests.")
+        parser.add_argument('--latency-ms', type=float, default=2000, help="Simulated Gemini latency per call.")
+
+    def handle(self, *args, **options):
+        images = sample_images()
+        if not images:
+            raise CommandError("No sample images found under MEDIA_ROOT/analyses.")
+
+        n = options['requests']
+        latency = options['latency_ms'] / 1000.0
+        fake_gemini = FakeGeminiService(latency_ms=options['latency_ms'])
+
+        with isolated_environment(), mock.patch.object(treatment_cache_module, 'gemini_service', fake_gemini):
+            user = create_benchmark_user()
+
+            def analyze(index):
+                client = APIClient()
+                client.force_authenticate(user)
+                try:
+                    # Each language is a separate cache entry, so requests in
+                    # different languages make their own Gemini calls.
+                    language = SUPPORTED_LANGUAGES[index % len(SUPPORTED_LANGUAGES)]
+                    with open(images[index % len(images)], 'rb') as image:
+                        response = client.post(
+                            '/api/plant_doctor_ai/analyze/', {'image': image}, format='multipart',
+                            headers={'Language': language}
+                        )
+                    return response.status_code
+                finally:
+                    connections.close_all()
+
+            # Warm up the model and the batcher thread so they are not timed.
+            analyze(0)
+            warmup_calls = fake_gemini.calls
+
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=n) as executor:
+                statuses = list(executor.map(analyze, range(n)))
+            elapsed = time.perf_counter() - started
+
+            user.refresh_from_db()
+
+        # Identical (disease, language) misses share one call, so only the
+        # calls that were actually made would add up if serialized.
+        calls = fake_gemini.calls - warmup_calls
+        serial = calls * latency
+        self.stdout.write(f"{n} parallel analyses with {options['latency_ms']:.0f} ms Gemini latency")
+        self.stdout.write(f"  Gemini calls:       {calls}")
+        self.stdout.write(f"  wall time:          {elapsed:.3f} s")
+        self.stdout.write(f"  serialized would be: >= {serial:.3f} s")
+        if calls > 1:
+            self.stdout.write(f"  speedup:            {serial / elapsed:.1f}x")
+        self.stdout.write(f"  status codes:       {sorted(set(statuses))}")
+        self.stdout.write(f"  total_uploads:      {user.total_uploads} (expected {n + 1})")
+
+        if any(code != 200 for code in statuses) or user.total_uploads != n + 1:
+            raise CommandError("Concurrent analyses failed or lost counter updates.")
+        if calls > 1 and elapsed >= serial:
+            raise CommandError("Analyses were serialized behind the Gemini call.")
+        self.stdout.write(self.style.SUCCESS("Analyses ran concurrently."))
@@ -0,0 +1,84 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.test import AsyncClient, Client
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from plant_doctor_ai import async_views, views
+from plant_doctor_ai.benchmarking import create_benchmark_user, isolated_environment, percentile
+from plant_doctor_ai.services.fake_gemini import FakeGeminiService
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares the sync chat/ view, limited to a fixed number of worker threads, "
+        "with the async/chat/ view on one event loop, against a fake Gemini."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help="Number of concurrent chat requests.")
+        parser.add_argument('--latency-ms', type=float, default=1000, help="Simulated Gemini latency per call.")
+        parser.add_argument(
+            '--sync-threads', type=int, default=8,
+            help="Worker threads available to the sync view (e.g. gunicorn --threads)."
+        )
+
+    def handle(self, *args, **options):
+        n = options['requests']
+        fake_gemini = FakeGeminiService(latency_ms=options['latency_ms'])
+        payload = {"history": [], "newMessage": "How do I treat early blight on tomatoes?"}
+
+        with isolated_environment(), \
+                mock.patch.object(views, 'gemini_service', fake_gemini), \
+                mock.patch.object(async_views, 'gemini_service', fake_gemini):
+            user = create_benchmark_user()
+            headers = {"Authorization": f"Bearer {RefreshToken.for_user(user).access_token}"}
+
+            sync_wall, sync_latencies = self._run_sync(n, options['sync_threads'], payload, headers)
+            async_wall, async_latencies = asyncio.run(self._run_async(n, payload, headers))
+
+        self.stdout.write(f"{n} chat requests, {options['latency_ms']:.0f} ms Gemini latency")
+        for label, wall, latencies in (
+            (f"sync  ({options['sync_threads']} threads)", sync_wall, sync_latencies),
+            ("async (1 event loop)", async_wall, async_latencies),
+        ):
+            self.stdout.write(
+                f"  {label:<22} wall {wall:7.3f} s  "
+                f"p50 {percentile(latencies, 50) * 1000:8.1f} ms  "
+                f"p99 {percentile(latencies, 99) * 1000:8.1f} ms  "
+                f"{n / wall:7.1f} req/s"
+            )
+        self.stdout.write(self.style.SUCCESS(f"Async speedup: {sync_wall / async_wall:.1f}x"))
+
+    def _run_sync(self, n, threads, payload, headers):
+        def chat(_):
+            client = Client()
+            started = time.perf_counter()
+            try:
+                response = client.post('/api/plant_doctor_ai/chat/', payload, content_type='application/json', headers=headers)
+                assert response.status_code == 200, response.content
+                return time.perf_counter() - started
+            finally:
+                connections.close_all()
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            latencies = list(executor.map(chat, range(n)))
+        return time.perf_counter() - started, latencies
+
+    async def _run_async(self, n, payload, headers):
+        client = AsyncClient()
+
+        async def chat():
+            started = time.perf_counter()
+            response = await client.post('/api/plant_doctor_ai/async/chat/', payload, content_type='application/json', headers=headers)
+            assert response.status_code == 200, response.content
+            return time.perf_counter() - started
+
+        started = time.perf_counter()
+        latencies = await asyncio.gather(*(chat() for _ in range(n)))
+        return time.perf_counter() - started, latencies
@@ -0,0 +1,60 @@
+import json
+import os
+import time
+
+import torch
+from django.core.management.base import BaseCommand
+
+from plant_doctor_ai.benchmarking import percentile
+from plant_doctor_ai.services.inference_backends import ARTIFACT_FILENAMES, artifact_path, artifacts_directory, load_backend
+
+
+class Command(BaseCommand):
+    help = "Reports p50/p99 latency and images/sec of every available inference backend on the CPU."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--backend', action='append', dest='backends', choices=list(ARTIFACT_FILENAMES),
+            help="Backend to benchmark. Can be repeated. Defaults to every backend with an artifact on disk."
+        )
+        parser.add_argument('--batch-size', action='append', type=int, dest='batch_sizes', help="Defaults to 1 and 8.")
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--warmup', type=int, default=3)
+
+    def handle(self, *args, **options):
+        artifacts_dir = artifacts_directory()
+        with open(os.path.join(artifacts_dir, 'class_names.json'), 'r') as f:
+            num_classes = len(json.load(f))
+
+        backends = options['backends'] or [
+            name for name in ARTIFACT_FILENAMES if os.path.exists(artifact_path(artifacts_dir, name))
+        ]
+        batch_sizes = options['batch_sizes'] or [1, 8]
+        device = torch.device('cpu')
+
+        self.stdout.write(f"torch threads: {torch.get_num_threads()}")
+        self.stdout.write(f"{'backend':<14}{'batch':>6}{'p50 ms':>10}{'p99 ms':>10}{'img/s':>10}")
+        for name in backends:
+            try:
+                backend = load_backend(name, artifacts_dir, num_classes, device)
+            except Exception as e:
+                self.stderr.write(f"{name}: skipped ({e})")
+                continue
+
+            for batch_size in batch_sizes:
+                batch = torch.rand((batch_size, 3, 256, 256))
+                for _ in range(options['warmup']):
+                    backend(batch)
+
+                latencies = []
+                for _ in range(options['iterations']):
+                    started = time.perf_counter()
+                    backend(batch)
+                    latencies.append(time.perf_counter() - started)
+
+                throughput = batch_size * len(latencies) / sum(latencies)
+                self.stdout.write(
+                    f"{name:<14}{batch_size:>6}"
+                    f"{percentile(latencies, 50) * 1000:>10.1f}{percentile(latencies, 99) * 1000:>10.1f}"
+                    f"{throughput:>10.1f}"
+                )
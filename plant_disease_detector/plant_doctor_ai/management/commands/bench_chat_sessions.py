@@ -0,0 +1,118 @@
+import json
+import time
+from unittest import mock
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client, override_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from plant_doctor_ai import views
+from plant_doctor_ai.benchmarking import create_benchmark_user, isolated_environment
+from plant_doctor_ai.services import chat_sessions
+from plant_doctor_ai.services.chat_sessions import estimate_tokens
+from plant_doctor_ai.services.fake_gemini import FakeGeminiService
+
+QUESTION = (
+    "My tomato plants have yellow leaves with brown concentric spots that started on the lower leaves "
+    "and are slowly moving up the plant. I water in the evening and the weather has been humid. "
+    "What could it be and what should I do this week? (turn {turn})"
+)
+
+
+class MeasuringGemini(FakeGeminiService):
+    """
+    A fake Gemini whose latency grows with the size of the context it is
+    sent, like a real LLM's prefill, and which records that size.
+    """
+
+    def __init__(self, ms_per_1k_tokens):
+        super().__init__()
+        self.ms_per_1k_tokens = ms_per_1k_tokens
+        self.context_tokens = []
+
+    def process_chat(self, history, new_message, language='en'):
+        tokens = sum(estimate_tokens(item['parts'][0]['text']) for item in history) + estimate_tokens(new_message)
+        self.context_tokens.append(tokens)
+        time.sleep(tokens * self.ms_per_1k_tokens / 1e6)
+        # A longer answer than the default fake, so the history grows realistically.
+        return f"It looks like early blight. {new_message} Remove the lower leaves and water at the base."
+
+
+class Command(BaseCommand):
+    help = (
+        "Simulates a long chat and compares request size, Gemini context size and latency per turn "
+        "between resending the whole history and a server-side chat session."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--turns', type=int, default=80)
+        parser.add_argument(
+            '--ms-per-1k-tokens', type=float, default=20,
+            help="Simulated Gemini latency per 1000 context tokens."
+        )
+
+    def handle(self, *args, **options):
+        turns = options['turns']
+        results = {}
+        with isolated_environment():
+            user = create_benchmark_user()
+            headers = {"Authorization": f"Bearer {RefreshToken.for_user(user).access_token}"}
+            for mode in ('history', 'session'):
+                gemini = MeasuringGemini(options['ms_per_1k_tokens'])
+                with mock.patch.object(views, 'gemini_service', gemini), \
+                        mock.patch.object(chat_sessions, 'gemini_service', gemini), \
+                        override_settings(CHAT_MAX_HISTORY_MESSAGES=10 ** 6, CHAT_MAX_REQUEST_BYTES=10 ** 9):
+                    results[mode] = self.converse(mode, turns, headers, gemini)
+
+        checkpoints = sorted({1, 10, 20, 40, turns} & set(range(1, turns + 1)))
+        self.stdout.write(f"{turns}-turn conversation, budget {settings.CHAT_CONTEXT_TOKEN_BUDGET} tokens")
+        self.stdout.write(f"  {'turn':>5} {'mode':<8} {'request bytes':>14} {'context tokens':>15} {'latency ms':>11}")
+        for turn in checkpoints:
+            for mode, rows in results.items():
+                size, tokens, latency = rows[turn - 1]
+                self.stdout.write(f"  {turn:>5} {mode:<8} {size:>14} {tokens:>15} {latency * 1000:>11.1f}")
+        for mode, rows in results.items():
+            self.stdout.write(
+                f"  total {mode:<8} {sum(r[0] for r in rows):>14} {sum(r[1] for r in rows):>15} "
+                f"{sum(r[2] for r in rows) * 1000:>11.1f}"
+            )
+
+        # The session request stays the same size, and its context stays
+        # within the budget plus the summary and the newest exchange.
+        session = results['session']
+        context_limit = settings.CHAT_CONTEXT_TOKEN_BUDGET + settings.CHAT_SUMMARY_MAX_TOKENS + 500
+        if max(r[0] for r in session) > 2 * session[0][0]:
+            raise CommandError("Session request size grew with the conversation.")
+        if max(r[1] for r in session) > context_limit:
+            raise CommandError(f"Session context exceeded {context_limit} tokens.")
+        self.stdout.write(self.style.SUCCESS("Session request size and context stayed bounded."))
+
+    def converse(self, mode, turns, headers, gemini):
+        """Returns one (request bytes, context tokens, latency) tuple per turn."""
+        client = Client()
+        history, session_id, rows = [], None, []
+        if mode == 'session':
+            session_id = client.post('/api/plant_doctor_ai/chat/sessions/', headers=headers).json()['id']
+        for turn in range(1, turns + 1):
+            message = QUESTION.format(turn=turn)
+            payload = {"newMessage": message}
+            if mode == 'history':
+                payload["history"] = history
+            else:
+                payload["sessionId"] = session_id
+            body = json.dumps(payload)
+
+            started = time.perf_counter()
+            response = client.post('/api/plant_doctor_ai/chat/', body, content_type='application/json', headers=headers)
+            latency = time.perf_counter() - started
+            if response.status_code != 200:
+                raise CommandError(f"{mode} turn {turn}: HTTP {response.status_code} {response.content[:200]}")
+
+            answer = response.json()
+            history += [
+                {"role": "user", "parts": [{"text": message}]},
+                {"role": "model", "parts": [{"text": answer['response']}]},
+            ]
+            rows.append((len(body.encode()), gemini.context_tokens[-1], latency))
+        return rows
@@ -0,0 +1,111 @@
+import time
+from datetime import timedelta
+from unittest import mock
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from plant_doctor_ai.benchmarking import create_benchmark_user, isolated_environment, percentile
+from plant_doctor_ai.models import AnalysisResult
+
+HISTORY_URL = '/api/plant_doctor_ai/history/'
+
+
+class Command(BaseCommand):
+    help = (
+        "Fills a throwaway database with synthetic analyses and measures history/ page latency "
+        "at increasing depths, for keyset (cursor) pagination against OFFSET pagination."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100_000, help="Synthetic analyses for the benchmark user.")
+        parser.add_argument('--other-rows', type=int, default=20_000, help="Analyses belonging to another user.")
+        parser.add_argument('--page-size', type=int, default=50)
+        parser.add_argument('--samples', type=int, default=10, help="Pages timed at each depth.")
+
+    def handle(self, *args, **options):
+        with isolated_environment():
+            user = create_benchmark_user()
+            other = create_benchmark_user(email='other@example.com')
+            self.fill(other, options['other_rows'])
+            self.fill(user, options['rows'])
+            self.stdout.write(f"Created {options['rows']} analyses (+{options['other_rows']} for another user).")
+
+            self.report_plan(user)
+            client = APIClient()
+            client.force_authenticate(user)
+            self.walk_cursor(client, options)
+            self.offset_pages(user, options)
+
+    def fill(self, user, rows):
+        """Bulk-inserts analyses with distinct, decreasing created_at values."""
+        now = timezone.now()
+        clock = iter([now - timedelta(seconds=i) for i in range(rows)])
+        template = dict(
+            user=user, image='analyses/blobs/bench.jpg', disease_name='Tomato___Late_blight',
+            confidence=0.9, severity=AnalysisResult.Severity.HIGH,
+            recommended_treatment='Remove infected leaves. ' * 40, prevention_tips=['Rotate crops'] * 5,
+        )
+        # created_at is auto_now_add, so feed it from a fake clock.
+        with mock.patch('django.utils.timezone.now', side_effect=lambda: next(clock)):
+            for start in range(0, rows, 5000):
+                AnalysisResult.objects.bulk_create(
+                    AnalysisResult(**template) for _ in range(min(5000, rows - start))
+                )
+
+    def report_plan(self, user):
+        queryset = AnalysisResult.objects.filter(user=user, created_at__lt=timezone.now())[:50]
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+            plan = "; ".join(row[-1] for row in cursor.fetchall())
+        self.stdout.write(f"Query plan for a keyset page: {plan}")
+
+    def walk_cursor(self, client, options):
+        """Follows `next` links through the whole history, timing every page."""
+        url = f"{HISTORY_URL}?page_size={options['page_size']}"
+        latencies = []
+        while url:
+            started = time.perf_counter()
+            response = client.get(url)
+            latencies.append(time.perf_counter() - started)
+            url = response.json()['next']
+
+        samples = options['samples']
+        self.stdout.write(f"Cursor pagination, {len(latencies)} pages of {options['page_size']}:")
+        for label, window in (
+            ("first", latencies[:samples]),
+            ("middle", latencies[len(latencies) // 2:len(latencies) // 2 + samples]),
+            ("last", latencies[-samples:]),
+        ):
+            self.stdout.write(
+                f"  {label:<7} pages: p50 {percentile(window, 50) * 1000:.2f} ms, "
+                f"p99 {percentile(window, 99) * 1000:.2f} ms"
+            )
+
+    def offset_pages(self, user, options):
+        """Times the bare page query at the same depths, keyset against LIMIT/OFFSET."""
+        history = AnalysisResult.objects.filter(user=user).only(
+            'id', 'image', 'disease_name', 'confidence', 'severity', 'created_at'
+        )
+        total = history.count()
+        page_size = options['page_size']
+        self.stdout.write("Page query alone, keyset vs OFFSET:")
+        for label, offset in (("first", 0), ("middle", total // 2), ("last", total - page_size)):
+            boundary = history.values_list('created_at', flat=True)[offset]
+            timings = {}
+            for name, page in (
+                ("keyset", lambda: history.filter(created_at__lte=boundary)[:page_size]),
+                ("offset", lambda: history[offset:offset + page_size]),
+            ):
+                latencies = []
+                for _ in range(options['samples']):
+                    started = time.perf_counter()
+                    list(page())
+                    latencies.append(time.perf_counter() - started)
+                timings[name] = percentile(latencies, 50) * 1000
+            self.stdout.write(
+                f"  {label:<7} page: keyset p50 {timings['keyset']:.2f} ms, offset p50 {timings['offset']:.2f} ms"
+            )
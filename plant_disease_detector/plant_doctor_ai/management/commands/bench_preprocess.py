@@ -0,0 +1,72 @@
+import os
+import tempfile
+import time
+
+import torch
+import torchvision.transforms as transforms
+from django.core.management.base import BaseCommand, CommandError
+from PIL import Image
+
+from plant_doctor_ai.benchmarking import percentile, sample_images
+from plant_doctor_ai.services.model_service import InputBuffers
+from plant_doctor_ai.services.preprocessing import decode_image
+
+
+def legacy_preprocess(path):
+    """The original per-call Compose + full-resolution decode, for comparison."""
+    transform = transforms.Compose([
+        transforms.Resize((256, 256)),
+        transforms.ToTensor()
+    ])
+    image = Image.open(path).convert('RGB')
+    return transform(image).unsqueeze(0)
+
+
+class Command(BaseCommand):
+    help = "Times per-image decode + transform for the legacy and the current preprocessing pipelines."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=20, help="Passes over the sample images.")
+        parser.add_argument(
+            '--phone-size', action='store_true',
+            help="Also upscale each sample to a 4032x3024 JPEG to mimic a 12MP phone photo."
+        )
+
+    def handle(self, *args, **options):
+        images = sample_images()
+        if not images:
+            raise CommandError("No sample images found under MEDIA_ROOT/analyses.")
+
+        with tempfile.TemporaryDirectory() as workdir:
+            sets = [("media/analyses samples", images)]
+            if options['phone_size']:
+                phone_images = []
+                for index, path in enumerate(images):
+                    target = os.path.join(workdir, f'phone_{index}.jpg')
+                    Image.open(path).convert('RGB').resize((4032, 3024)).save(target, quality=90)
+                    phone_images.append(target)
+                sets.append(("12MP upscaled samples", phone_images))
+
+            buffers = InputBuffers(capacity=1)
+            for label, paths in sets:
+                self.stdout.write(f"{label} ({len(paths)} images x {options['repeat']}):")
+                for name, run in (
+                    ('legacy', legacy_preprocess),
+                    ('current', lambda path: buffers.fill([decode_image(path)])),
+                ):
+                    run(paths[0])
+                    timings = []
+                    for _ in range(options['repeat']):
+                        for path in paths:
+                            started = time.perf_counter()
+                            run(path)
+                            timings.append(time.perf_counter() - started)
+                    self.stdout.write(
+                        f"  {name:<8} mean {sum(timings) / len(timings) * 1000:7.2f} ms  "
+                        f"p50 {percentile(timings, 50) * 1000:7.2f} ms  "
+                        f"p99 {percentile(timings, 99) * 1000:7.2f} ms"
+                    )
+
+                # The two pipelines should feed the model (nearly) the same pixels.
+                diff = (legacy_preprocess(paths[0]) - buffers.fill([decode_image(paths[0])])).abs().mean().item()
+                self.stdout.write(f"  mean |pixel diff| legacy vs current: {diff:.4f}")
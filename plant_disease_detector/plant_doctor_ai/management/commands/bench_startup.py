@@ -0,0 +1,79 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.test import APIClient
+
+from plant_doctor_ai.benchmarking import create_benchmark_user, isolated_environment, sample_images
+
+
+class Command(BaseCommand):
+    help = (
+        "Measures cold 'manage.py check' time and first analyze request latency "
+        "with lazy services versus services loaded eagerly at startup."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=3, help="Repetitions per measurement.")
+        parser.add_argument('--first-request', action='store_true', help="(internal) Time one analyze request and print JSON.")
+
+    def handle(self, *args, **options):
+        if options['first_request']:
+            return self._first_request()
+
+        manage_py = os.path.join(settings.BASE_DIR, 'manage.py')
+        results = {}
+        for mode, warmup_flag in (('eager (before)', '1'), ('lazy (after)', '0')):
+            # The fake Gemini backend keeps both modes off the network and
+            # independent of GEMINI_API_KEY.
+            env = dict(os.environ, SERVICES_WARMUP_ON_STARTUP=warmup_flag, GEMINI_BACKEND='fake')
+
+            check_times = [self._timed(env, [sys.executable, manage_py, 'check'])[0] for _ in range(options['runs'])]
+
+            first_request, process_total = [], []
+            for _ in range(options['runs']):
+                elapsed, output = self._timed(env, [sys.executable, manage_py, 'bench_startup', '--first-request'])
+                first_request.append(json.loads(output.strip().splitlines()[-1])['first_request_s'])
+                process_total.append(elapsed)
+
+            results[mode] = {
+                "check_s": statistics.mean(check_times),
+                "first_request_s": statistics.mean(first_request),
+                "start_to_first_response_s": statistics.mean(process_total),
+            }
+
+        self.stdout.write(f"{'mode':<16}{'manage.py check':>18}{'first request':>16}{'process total':>16}")
+        for mode, r in results.items():
+            self.stdout.write(
+                f"{mode:<16}{r['check_s']:>17.3f}s{r['first_request_s']:>15.3f}s{r['start_to_first_response_s']:>15.3f}s"
+            )
+
+    def _timed(self, env, cmd):
+        started = time.perf_counter()
+        completed = subprocess.run(cmd, env=env, capture_output=True, text=True)
+        elapsed = time.perf_counter() - started
+        if completed.returncode != 0:
+            raise CommandError(f"{' '.join(cmd)} failed:\n{completed.stderr}")
+        return elapsed, completed.stdout
+
+    def _first_request(self):
+        images = sample_images()
+        if not images:
+            raise CommandError("No sample images found under MEDIA_ROOT/analyses.")
+
+        with isolated_environment():
+            client = APIClient()
+            client.force_authenticate(create_benchmark_user())
+            with open(images[0], 'rb') as image:
+                started = time.perf_counter()
+                response = client.post('/api/plant_doctor_ai/analyze/', {'image': image}, format='multipart')
+                elapsed = time.perf_counter() - started
+
+        if response.status_code != 200:
+            raise CommandError(f"Analyze request failed with status {response.status_code}")
+        self.stdout.write(json.dumps({"first_request_s": elapsed}))
@@ -0,0 +1,82 @@
+import json
+import os
+
+import torch
+import torch.nn.functional as F
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from plant_doctor_ai.management.commands.quantize_model import batched
+from plant_doctor_ai.services.inference_backends import artifacts_directory, load_backend
+from plant_doctor_ai.services.model_service import preprocess_image
+from plant_doctor_ai.services.preprocessing import find_images
+
+
+def expected_calibration_error(probabilities, labels, bins=15):
+    """Weighted gap between confidence and accuracy over equal-width confidence bins."""
+    confidences, predictions = probabilities.max(dim=1)
+    correct = (predictions == labels).float()
+    ece = torch.zeros(())
+    edges = torch.linspace(0, 1, bins + 1)
+    for lower, upper in zip(edges[:-1], edges[1:]):
+        in_bin = (confidences > lower) & (confidences <= upper)
+        if in_bin.any():
+            ece += in_bin.float().mean() * (confidences[in_bin].mean() - correct[in_bin].mean()).abs()
+    return ece.item()
+
+
+def fit_temperature(logits, labels, iterations=100):
+    """Finds the T > 0 that minimizes the NLL of softmax(logits / T) on labelled data."""
+    log_t = torch.zeros(1, requires_grad=True)
+    optimizer = torch.optim.LBFGS([log_t], lr=0.1, max_iter=iterations)
+
+    def closure():
+        optimizer.zero_grad()
+        loss = F.cross_entropy(logits / log_t.exp(), labels)
+        loss.backward()
+        return loss
+
+    optimizer.step(closure)
+    return log_t.exp().item()
+
+
+class Command(BaseCommand):
+    help = (
+        "Fits the softmax temperature (MODEL_CALIBRATION_TEMPERATURE) on labelled images "
+        "so that reported confidences match observed accuracy."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'eval_dir', help="Labelled images, one sub-directory per class name (as in class_names.json)."
+        )
+        parser.add_argument('--batch-size', type=int, default=16)
+
+    def handle(self, *args, **options):
+        artifacts_dir = artifacts_directory()
+        with open(os.path.join(artifacts_dir, 'class_names.json'), 'r') as f:
+            class_names = json.load(f)
+
+        tensors, labels = [], []
+        for index, class_name in enumerate(class_names):
+            for path in find_images(os.path.join(options['eval_dir'], class_name)):
+                tensors.append(preprocess_image(path))
+                labels.append(index)
+        if not tensors:
+            raise CommandError(f"No labelled images found under {options['eval_dir']}.")
+
+        backend_name = getattr(settings, 'MODEL_BACKEND', 'eager')
+        backend = load_backend(backend_name, artifacts_dir, len(class_names), torch.device('cpu'))
+        with torch.no_grad():
+            logits = torch.cat([backend(batch) for batch in batched(tensors, options['batch_size'])])
+        labels = torch.tensor(labels)
+
+        temperature = fit_temperature(logits, labels)
+        self.stdout.write(f"{len(labels)} labelled images, backend '{backend_name}'")
+        for name, t in (("uncalibrated", 1.0), ("calibrated", temperature)):
+            with torch.no_grad():
+                nll = F.cross_entropy(logits / t, labels).item()
+                ece = expected_calibration_error(F.softmax(logits / t, dim=1), labels)
+            self.stdout.write(f"  {name:<13} T={t:.3f}  NLL {nll:.4f}  ECE {ece:.4f}")
+
+        self.stdout.write(self.style.SUCCESS(f"MODEL_CALIBRATION_TEMPERATURE={temperature:.4f}"))
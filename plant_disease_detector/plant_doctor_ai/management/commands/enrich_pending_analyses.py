@@ -0,0 +1,42 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from plant_doctor_ai.models import AnalysisResult
+from plant_doctor_ai.services.enrichment import apply_treatment
+from plant_doctor_ai.services.treatment_cache import treatment_cache
+
+
+class Command(BaseCommand):
+    help = (
+        "Fills in the treatment of analyses still pending background enrichment, "
+        "e.g. after a restart dropped the in-process queue."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--older-than', type=int, default=300, metavar='SECONDS',
+            help="Only analyses created at least this long ago, so jobs still queued by a running server are left alone."
+        )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(seconds=options['older_than'])
+        pending = AnalysisResult.objects.filter(
+            enrichment_status=AnalysisResult.EnrichmentStatus.PENDING, created_at__lte=cutoff
+        ).values_list('pk', 'disease_name', 'language')
+
+        groups = {}
+        for pk, disease_name, language in pending:
+            groups.setdefault((disease_name, language), []).append(pk)
+
+        results = {AnalysisResult.EnrichmentStatus.COMPLETE: 0, AnalysisResult.EnrichmentStatus.FAILED: 0}
+        for (disease_name, language), analysis_ids in groups.items():
+            treatment_info = treatment_cache.get_treatment_info(disease_name, language=language)
+            results[apply_treatment(analysis_ids, treatment_info)] += len(analysis_ids)
+            self.stdout.write(f"Enriched {len(analysis_ids)} x {disease_name} [{language}]")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{results[AnalysisResult.EnrichmentStatus.COMPLETE]} analyses enriched, "
+            f"{results[AnalysisResult.EnrichmentStatus.FAILED]} left with the fallback text."
+        ))
@@ -0,0 +1,140 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from plant_doctor_ai.services.chat_prefilter import ChatPrefilter
+
+# Held-out messages (none of them is an example in chat_intents), labelled
+# with the intent that should answer them locally, or None for Gemini.
+LABELLED_MESSAGES = [
+    ("How can I upload a picture of my sick plant?", 'upload_photo'),
+    ("where do i put the photo to get it analysed", 'upload_photo'),
+    ("¿Cómo puedo subir una foto de mi planta?", 'upload_photo'),
+    ("Comment puis-je télécharger la photo d'une feuille ?", 'upload_photo'),
+    ("अपने पौधे की फोटो कैसे अपलोड करूँ?", 'upload_photo'),
+    ("Where can I find my history?", 'view_history'),
+    ("where are my previous results", 'view_history'),
+    ("¿Dónde puedo ver mi historial?", 'view_history'),
+    ("Où se trouve mon historique d'analyses ?", 'view_history'),
+    ("मेरा पुराना इतिहास कहाँ मिलेगा", 'view_history'),
+    ("show me my statistics", 'analytics'),
+    ("¿Dónde veo mis estadísticas?", 'analytics'),
+    ("what languages do you support?", 'languages'),
+    ("How do I switch the language to French?", 'languages'),
+    ("how can I contact the support team", 'contact'),
+    ("hello!", 'greeting'),
+    ("Merci !", 'thanks'),
+    ("tell me a funny joke", 'off_topic'),
+    ("Who won the cricket world cup?", 'off_topic'),
+    ("Write a python script to sort a list", 'off_topic'),
+    ("¿Quién es el presidente de Francia?", 'off_topic'),
+    ("Raconte-moi une blague s'il te plaît", 'off_topic'),
+    ("My tomato leaves have yellow spots, what should I do?", None),
+    ("How do I treat early blight on potatoes?", None),
+    ("Is neem oil safe for my basil?", None),
+    ("What is the best time to water my roses?", None),
+    ("Can I upload a photo of the roots, or only the leaves?", None),
+    ("¿Por qué mi planta de tomate tiene hojas marrones?", None),
+    ("Mes feuilles de vigne ont des taches noires, que faire ?", None),
+    ("मेरे आलू के पौधे की पत्तियाँ मुरझा रही हैं", None),
+    ("What does late blight look like on apple trees?", None),
+    ("How long does recovery from leaf mold take?", None),
+    ("thanks, and how do I stop the mildew from coming back?", None),
+    ("Is the disease in my last analysis contagious to my other plants?", None),
+    # FAQs, asked differently from the examples.
+    ("how do I upload an image?", 'upload_photo'),
+    ("Which file formats can I upload?", 'upload_photo'),
+    ("¿Qué tamaño máximo de imagen aceptan?", 'upload_photo'),
+    ("show me my past analyses", 'view_history'),
+    ("how can I delete an old analysis", 'view_history'),
+    ("Comment supprimer une ancienne analyse ?", 'view_history'),
+    ("पिछले परिणाम कहाँ देखूँ", 'view_history'),
+    ("where can I view my analytics", 'analytics'),
+    ("how many images have I analyzed so far", 'analytics'),
+    ("Où est mon tableau de bord ?", 'analytics'),
+    ("can I change the language to hindi", 'languages'),
+    ("Quelles langues parlez-vous ?", 'languages'),
+    ("भाषा बदलनी है", 'languages'),
+    ("how do I reach customer support", 'contact'),
+    ("Comment contacter l'équipe support ?", 'contact'),
+    ("how do I delete my account", 'account'),
+    ("where can I edit my profile", 'account'),
+    ("¿Cómo cierro mi sesión?", 'account'),
+    ("hey there!", 'greeting'),
+    ("thank you so much", 'thanks'),
+    ("धन्यवाद जी", 'thanks'),
+    ("tell me a joke about cats", 'off_topic'),
+    ("who is the prime minister of india", 'off_topic'),
+    ("can you write me a poem", 'off_topic'),
+    ("recommend me a good movie", 'off_topic'),
+    ("¿Me cuentas un chiste?", 'off_topic'),
+    ("Qui a gagné le match hier soir ?", 'off_topic'),
+    # Plant questions, including pests and symptoms that share phrasing
+    # ("how to ...", "how can I ...") with the FAQs.
+    ("How to get rid of aphids", None),
+    ("how to get rid of mealybugs on my plant", None),
+    ("How can I save my dying plant", None),
+    ("what is the history of potato famine", None),
+    ("there are tiny white flies under the leaves of my tomato", None),
+    ("how do I kill spider mites", None),
+    ("what should I spray for thrips", None),
+    ("how to treat black spot on roses", None),
+    ("my cucumber plant is wilting in the afternoon", None),
+    ("why is my basil drooping", None),
+    ("can caterpillars destroy my cabbage", None),
+    ("how many times a week should I water tomatoes", None),
+    ("Where can I see the symptoms of late blight?", None),
+    ("how do I upload a photo that shows the whole plant with the pests", None),
+    ("Is it ok to compost diseased leaves?", None),
+    ("hello, my pepper plant has curling leaves", None),
+    ("¿Cómo elimino los pulgones de mi rosal?", None),
+    ("mi planta se está muriendo, ¿qué hago?", None),
+    ("Comment se débarrasser des pucerons ?", None),
+    ("ma plante est en train de mourir", None),
+    ("पौधे पर कीड़े लग गए हैं क्या करें", None),
+    ("मेरा पौधा सूख रहा है", None),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Evaluates the local chat pre-filter on held-out labelled messages: how many are answered "
+        "locally, whether they get the right answer, and how many plant questions are wrongly kept from Gemini."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verbose-scores', action='store_true', help="Print the score of every message.")
+
+    def handle(self, *args, **options):
+        prefilter = ChatPrefilter()
+        started = time.perf_counter()
+        prefilter.classifier
+        build_ms = (time.perf_counter() - started) * 1000
+
+        correct = local = blocked = 0
+        latencies = []
+        for message, expected in LABELLED_MESSAGES:
+            started = time.perf_counter()
+            intent, score = prefilter.classify(message)
+            latencies.append(time.perf_counter() - started)
+
+            local += intent is not None
+            correct += intent == expected
+            if expected is None and intent is not None:
+                blocked += 1
+            if options['verbose_scores'] or intent != expected:
+                marker = '  ' if intent == expected else '✗ '
+                self.stdout.write(f"{marker}{score:.2f} {intent or 'gemini':<13} (expected {expected or 'gemini'}) {message}")
+
+        total = len(LABELLED_MESSAGES)
+        expected_local = sum(expected is not None for _, expected in LABELLED_MESSAGES)
+        self.stdout.write(
+            f"{correct}/{total} routed correctly; {local} answered locally (of {expected_local} that could be); "
+            f"{blocked} plant question(s) kept from Gemini"
+        )
+        self.stdout.write(
+            f"model built in {build_ms:.1f} ms; classification mean {sum(latencies) / total * 1000:.2f} ms, "
+            f"max {max(latencies) * 1000:.2f} ms"
+        )
+        if blocked:
+            raise CommandError("Plant-health questions must always reach Gemini.")
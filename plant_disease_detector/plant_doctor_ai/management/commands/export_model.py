@@ -0,0 +1,72 @@
+import json
+import os
+
+import torch
+from django.core.management.base import BaseCommand, CommandError
+
+from plant_doctor_ai.services.inference_backends import artifact_path, artifacts_directory, load_backend, load_eager_model
+
+
+class Command(BaseCommand):
+    help = (
+        "Exports the trained CNN_NeuralNet to TorchScript and/or ONNX next to the "
+        "state dict, and checks the exported outputs against eager PyTorch."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--format', action='append', dest='formats', choices=['torchscript', 'onnxruntime'],
+            help="Backend to export for. Can be repeated. Defaults to both."
+        )
+        parser.add_argument('--atol', type=float, default=1e-3, help="Maximum allowed absolute logit difference.")
+        parser.add_argument('--opset', type=int, default=17, help="ONNX opset version.")
+
+    def handle(self, *args, **options):
+        artifacts_dir = artifacts_directory()
+        with open(os.path.join(artifacts_dir, 'class_names.json'), 'r') as f:
+            num_classes = len(json.load(f))
+
+        device = torch.device('cpu')
+        model = load_eager_model(artifact_path(artifacts_dir, 'eager'), num_classes, device)
+        example = torch.rand((1, 3, 256, 256))
+        formats = options['formats'] or ['torchscript', 'onnxruntime']
+
+        if 'torchscript' in formats:
+            path = artifact_path(artifacts_dir, 'torchscript')
+            with torch.no_grad():
+                traced = torch.jit.trace(model, example)
+                # Freezing inlines the weights and folds BatchNorm into the convolutions.
+                traced = torch.jit.freeze(traced)
+            traced.save(path)
+            self.stdout.write(f"Wrote TorchScript model to {path}")
+
+        if 'onnxruntime' in formats:
+            path = artifact_path(artifacts_dir, 'onnxruntime')
+            torch.onnx.export(
+                model, (example,), path,
+                input_names=['images'],
+                output_names=['logits'],
+                dynamic_axes={'images': {0: 'batch'}, 'logits': {0: 'batch'}},
+                opset_version=options['opset'],
+                dynamo=False,
+            )
+            self.stdout.write(f"Wrote ONNX model to {path}")
+
+        self.verify(model, formats, artifacts_dir, num_classes, device, options['atol'])
+
+    def verify(self, model, formats, artifacts_dir, num_classes, device, atol):
+        torch.manual_seed(0)
+        batch = torch.rand((8, 3, 256, 256))
+        with torch.no_grad():
+            reference = model(batch)
+
+        for backend_name in formats:
+            backend = load_backend(backend_name, artifacts_dir, num_classes, device)
+            outputs = backend(batch).float()
+            max_diff = (outputs - reference).abs().max().item()
+            same_argmax = bool((outputs.argmax(1) == reference.argmax(1)).all())
+            self.stdout.write(f"{backend_name}: max |logit diff| = {max_diff:.2e}, same top-1 = {same_argmax}")
+            if max_diff > atol or not same_argmax:
+                raise CommandError(f"{backend_name} output differs from eager beyond atol={atol}.")
+
+        self.stdout.write(self.style.SUCCESS("Exported models match eager PyTorch."))
@@ -0,0 +1,61 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from plant_doctor_ai.services.derivatives import generate_derivatives, is_derivative
+from plant_doctor_ai.services.preprocessing import IMAGE_EXTENSIONS
+
+
+def find_sources(media_root):
+    """Storage names of every original image under MEDIA_ROOT/analyses."""
+    names = []
+    for directory, _, files in os.walk(os.path.join(media_root, 'analyses')):
+        for filename in files:
+            if filename.lower().endswith(IMAGE_EXTENSIONS):
+                name = os.path.relpath(os.path.join(directory, filename), media_root).replace(os.sep, '/')
+                if not is_derivative(name):
+                    names.append(name)
+    return sorted(names)
+
+
+def generate(job):
+    """Process-pool worker: returns (name, files written, error message or None)."""
+    name, force = job
+    try:
+        return name, generate_derivatives(name, force=force), None
+    except Exception as e:
+        return name, 0, str(e)
+
+
+class Command(BaseCommand):
+    help = (
+        "Backfills thumbnail and preview derivatives (JPEG + WebP) for every image "
+        "under MEDIA_ROOT/analyses, in parallel worker processes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count(), help="Worker processes.")
+        parser.add_argument('--force', action='store_true', help="Regenerate derivatives that already exist.")
+
+    def handle(self, *args, **options):
+        names = find_sources(settings.MEDIA_ROOT)
+        self.stdout.write(f"Found {len(names)} images; using {options['workers']} workers.")
+
+        written = failed = 0
+        started = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=options['workers']) as pool:
+            jobs = [(name, options['force']) for name in names]
+            for name, count, error in pool.map(generate, jobs, chunksize=16):
+                if error:
+                    failed += 1
+                    self.stderr.write(f"Failed {name}: {error}")
+                written += count
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {written} derivative files for {len(names)} images in {elapsed:.1f} s "
+            f"({len(names) / elapsed if elapsed else 0:.1f} images/s), {failed} failed."
+        ))
@@ -0,0 +1,120 @@
+import json
+import os
+import time
+
+import torch
+import torch.nn.functional as F
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from plant_doctor_ai.services.inference_backends import artifact_path, artifacts_directory, load_backend, load_eager_model
+from plant_doctor_ai.services.model_service import preprocess_image
+from plant_doctor_ai.services.preprocessing import find_images
+from plant_doctor_ai.services.quantization import quantize_model, quantized_engine
+
+def batched(tensors, batch_size):
+    for start in range(0, len(tensors), batch_size):
+        yield torch.cat(tensors[start:start + batch_size], dim=0)
+
+
+class Command(BaseCommand):
+    help = (
+        "Builds an INT8 model with post-training static quantization (Conv+BN+ReLU fused), "
+        "calibrated on local images, and reports its accuracy and speed against FP32."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--images-dir', default=os.path.join(settings.MEDIA_ROOT, 'analyses'),
+            help="Calibration images (searched recursively). Defaults to MEDIA_ROOT/analyses."
+        )
+        parser.add_argument('--max-images', type=int, default=512, help="Maximum number of calibration images.")
+        parser.add_argument(
+            '--eval-dir',
+            help="Optional labelled images, one sub-directory per class name, for an accuracy comparison."
+        )
+        parser.add_argument('--batch-size', type=int, default=8)
+        parser.add_argument('--iterations', type=int, default=10, help="Timed batches for the throughput comparison.")
+
+    def handle(self, *args, **options):
+        artifacts_dir = artifacts_directory()
+        with open(os.path.join(artifacts_dir, 'class_names.json'), 'r') as f:
+            class_names = json.load(f)
+
+        calibration_paths = find_images(options['images_dir'])[:options['max_images']]
+        if not calibration_paths:
+            raise CommandError(f"No calibration images found under {options['images_dir']}.")
+
+        device = torch.device('cpu')
+        fp32_model = load_eager_model(artifact_path(artifacts_dir, 'eager'), len(class_names), device)
+        calibration = [preprocess_image(path) for path in calibration_paths]
+
+        # 1. Calibrate and convert, then save as a frozen TorchScript graph
+        self.stdout.write(f"Calibrating on {len(calibration)} images with the '{quantized_engine()}' engine...")
+        int8_model = quantize_model(fp32_model, batched(calibration, options['batch_size']))
+        with torch.no_grad():
+            traced = torch.jit.freeze(torch.jit.trace(int8_model, calibration[0]))
+        path = artifact_path(artifacts_dir, 'quantized')
+        traced.save(path)
+        self.stdout.write(f"Wrote INT8 model to {path}")
+
+        # 2. Load the artifact the same way ModelService will
+        int8_backend = load_backend('quantized', artifacts_dir, len(class_names), device)
+        fp32_backend = load_backend('eager', artifacts_dir, len(class_names), device)
+
+        # 3. Accuracy delta against FP32
+        self.report_agreement("calibration images", fp32_backend, int8_backend, calibration, options['batch_size'])
+        if options['eval_dir']:
+            self.report_accuracy(options['eval_dir'], class_names, fp32_backend, int8_backend, options['batch_size'])
+
+        # 4. Throughput comparison
+        batch = torch.rand((options['batch_size'], 3, 256, 256))
+        for name, backend in (('fp32', fp32_backend), ('int8', int8_backend)):
+            backend(batch)
+            started = time.perf_counter()
+            for _ in range(options['iterations']):
+                backend(batch)
+            elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f"{name}: {elapsed / options['iterations'] * 1000:.1f} ms/batch of {options['batch_size']}, "
+                f"{options['batch_size'] * options['iterations'] / elapsed:.1f} img/s"
+            )
+
+    def report_agreement(self, label, fp32_backend, int8_backend, tensors, batch_size):
+        agree = total = 0
+        prob_diffs = []
+        for batch in batched(tensors, batch_size):
+            fp32_probs = F.softmax(fp32_backend(batch), dim=1)
+            int8_probs = F.softmax(int8_backend(batch), dim=1)
+            agree += (fp32_probs.argmax(1) == int8_probs.argmax(1)).sum().item()
+            total += batch.shape[0]
+            prob_diffs.append((fp32_probs - int8_probs).abs().max(dim=1).values)
+
+        max_prob_diff = torch.cat(prob_diffs).max().item()
+        self.stdout.write(
+            f"{label}: top-1 agreement {agree}/{total} ({agree / total:.1%}), "
+            f"max |probability diff| {max_prob_diff:.4f}"
+        )
+
+    def report_accuracy(self, eval_dir, class_names, fp32_backend, int8_backend, batch_size):
+        tensors, labels = [], []
+        for index, class_name in enumerate(class_names):
+            for path in find_images(os.path.join(eval_dir, class_name)):
+                tensors.append(preprocess_image(path))
+                labels.append(index)
+        if not tensors:
+            self.stderr.write(f"No labelled images found under {eval_dir}; skipping accuracy report.")
+            return
+
+        labels = torch.tensor(labels)
+        correct = {'fp32': 0, 'int8': 0}
+        for start, batch in zip(range(0, len(tensors), batch_size), batched(tensors, batch_size)):
+            expected = labels[start:start + batch.shape[0]]
+            correct['fp32'] += (fp32_backend(batch).argmax(1) == expected).sum().item()
+            correct['int8'] += (int8_backend(batch).argmax(1) == expected).sum().item()
+
+        fp32_acc, int8_acc = correct['fp32'] / len(tensors), correct['int8'] / len(tensors)
+        self.stdout.write(
+            f"labelled accuracy on {len(tensors)} images: fp32 {fp32_acc:.2%}, int8 {int8_acc:.2%}, "
+            f"delta {(int8_acc - fp32_acc) * 100:+.2f} pp"
+        )
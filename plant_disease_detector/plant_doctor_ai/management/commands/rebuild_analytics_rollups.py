@@ -0,0 +1,63 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from plant_doctor_ai.models import AnalyticsRollup
+from plant_doctor_ai.services.analytics import aggregate_analyses, rebuild_rollup, rollup_differences
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuilds the per-user analytics rollups from the raw analysis rows, or with --check "
+        "verifies them against the raw aggregation without writing anything."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user', action='append', dest='emails',
+            help="Only process the user with this email. Can be repeated. Defaults to every user."
+        )
+        parser.add_argument(
+            '--check', action='store_true',
+            help="Report rollups that disagree with the raw data and exit with an error if any do."
+        )
+
+    def handle(self, *args, **options):
+        users = User.objects.order_by('pk')
+        if options['emails']:
+            users = users.filter(email__in=options['emails'])
+            missing = set(options['emails']) - set(users.values_list('email', flat=True))
+            if missing:
+                raise CommandError(f"Unknown user(s): {', '.join(sorted(missing))}")
+
+        if not options['check']:
+            count = 0
+            for user in users.iterator():
+                rebuild_rollup(user)
+                count += 1
+            self.stdout.write(self.style.SUCCESS(f"Rebuilt analytics rollups for {count} users."))
+            return
+
+        rollups = {rollup.user_id: rollup for rollup in AnalyticsRollup.objects.filter(user__in=users)}
+        checked = inconsistent = 0
+        for user in users.iterator():
+            checked += 1
+            expected = aggregate_analyses(user)
+            rollup = rollups.get(user.pk)
+            if rollup is None:
+                # A missing rollup only matters if there is something to roll up.
+                if expected['total_analyzed']:
+                    inconsistent += 1
+                    self.stderr.write(f"{user.email}: no rollup for {expected['total_analyzed']} analyses")
+                continue
+
+            differences = rollup_differences(rollup, expected)
+            if differences:
+                inconsistent += 1
+                self.stderr.write(f"{user.email}: {', '.join(differences)} out of date")
+
+        if inconsistent:
+            raise CommandError(
+                f"{inconsistent} of {checked} users have inconsistent rollups. "
+                "Run `python manage.py rebuild_analytics_rollups` to fix them."
+            )
+        self.stdout.write(self.style.SUCCESS(f"All {checked} analytics rollups match the raw data."))
@@ -0,0 +1,227 @@
+import io
+import json
+import os
+import platform
+import shutil
+import subprocess
+import tempfile
+import time
+
+import torch
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+from django.utils import timezone
+from django.utils.functional import empty
+from PIL import Image
+from rest_framework.test import APIClient
+
+from plant_doctor_ai.benchmarking import create_benchmark_user, isolated_environment, latency_summary, sample_images
+from plant_doctor_ai.services.inference_backends import ARTIFACT_FILENAMES, artifacts_directory
+from plant_doctor_ai.services.model_service import CNN_NeuralNet, preprocess_image
+from plant_doctor_ai.services import providers
+
+SECTIONS = ['forward', 'preprocess', 'endpoints']
+API = '/api/plant_doctor_ai'
+
+
+def unique_uploads(paths, count):
+    """
+    Re-encodes the sample photos with one pixel changed per copy, so every
+    upload has new bytes and goes through inference instead of the memo.
+    """
+    uploads = []
+    for index in range(count):
+        image = Image.open(paths[index % len(paths)]).convert('RGB')
+        image.putpixel((0, 0), (index % 256, index // 256 % 256, 7))
+        buffer = io.BytesIO()
+        image.save(buffer, 'JPEG', quality=95)
+        buffer.name = f'bench_{index}.jpg'
+        buffer.seek(0)
+        uploads.append(buffer)
+    return uploads
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        "Runs the benchmark suite (model forward pass, preprocessing and the analyze/history/analytics/chat "
+        "endpoints) against random model weights and a fake Gemini, and writes the results as JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', help="Write the JSON report here instead of stdout.")
+        parser.add_argument('--only', action='append', choices=SECTIONS, help="Run only these sections.")
+        parser.add_argument('--iterations', type=int, default=20, help="Timed repetitions per measurement.")
+        parser.add_argument(
+            '--batch-size', action='append', type=int, dest='batch_sizes',
+            help="Forward-pass batch size. Can be repeated. Defaults to 1, 2, 4, 8, 16 and 32."
+        )
+        parser.add_argument('--requests', type=int, default=20, help="Requests per endpoint.")
+        parser.add_argument('--gemini-latency-ms', type=float, default=100, help="Delay of the fake Gemini.")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--compare', metavar='BASELINE',
+            help="A report from an earlier run; prints the p50 change of every measurement against it."
+        )
+
+    def handle(self, *args, **options):
+        sections = options['only'] or SECTIONS
+        images = sample_images()
+        if not images and set(sections) & {'preprocess', 'endpoints'}:
+            raise CommandError("No sample images found under MEDIA_ROOT/analyses.")
+        if 'endpoints' in sections and providers.model_service._wrapped is not empty:
+            raise CommandError("The model service is already loaded; unset SERVICES_WARMUP_ON_STARTUP.")
+
+        torch.manual_seed(options['seed'])
+        with open(os.path.join(artifacts_directory(), 'class_names.json'), 'r') as f:
+            class_names = json.load(f)
+
+        report = {
+            "meta": {
+                "revision": git_revision(),
+                "timestamp": timezone.now().isoformat(),
+                "python": platform.python_version(),
+                "torch": torch.__version__,
+                "torch_threads": torch.get_num_threads(),
+                "iterations": options['iterations'],
+                "requests": options['requests'],
+                "gemini_latency_ms": options['gemini_latency_ms'],
+            },
+            "results": {},
+        }
+        if 'forward' in sections:
+            report['results']['forward'] = self.bench_forward(len(class_names), options)
+        if 'preprocess' in sections:
+            report['results']['preprocess'] = self.bench_preprocess(images, options)
+        if 'endpoints' in sections:
+            report['results']['endpoints'] = self.bench_endpoints(images, class_names, options)
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output + '\n')
+            self.stderr.write(f"Wrote benchmark report to {options['output']}")
+        else:
+            self.stdout.write(output)
+
+        if options['compare']:
+            with open(options['compare'], 'r') as f:
+                self.print_comparison(json.load(f), report)
+
+    def print_comparison(self, baseline, report):
+        """Writes one line per measurement present in both reports, to stderr."""
+        self.stderr.write(f"p50 vs baseline {baseline['meta'].get('revision')}:")
+        for section, measurements in report['results'].items():
+            if 'p50_ms' in measurements:
+                measurements = {'all': measurements}
+            old_section = baseline['results'].get(section, {})
+            if 'p50_ms' in old_section:
+                old_section = {'all': old_section}
+            for name, summary in measurements.items():
+                old = old_section.get(name)
+                if not old or not old['p50_ms']:
+                    continue
+                change = (summary['p50_ms'] - old['p50_ms']) / old['p50_ms'] * 100
+                self.stderr.write(
+                    f"  {section}/{name}: {old['p50_ms']:.2f} -> {summary['p50_ms']:.2f} ms ({change:+.1f}%)"
+                )
+
+    def bench_forward(self, num_classes, options):
+        """Raw CNN_NeuralNet forward passes (random weights) per batch size."""
+        model = CNN_NeuralNet(in_channels=3, num_diseases=num_classes).eval()
+        results = {}
+        for batch_size in options['batch_sizes'] or [1, 2, 4, 8, 16, 32]:
+            batch = torch.rand((batch_size, 3, 256, 256))
+            latencies = []
+            with torch.no_grad():
+                model(batch)
+                for _ in range(options['iterations']):
+                    started = time.perf_counter()
+                    model(batch)
+                    latencies.append(time.perf_counter() - started)
+            summary = latency_summary(latencies)
+            summary['images_per_s'] = round(batch_size * len(latencies) / sum(latencies), 2)
+            results[str(batch_size)] = summary
+            self.stderr.write(f"forward batch {batch_size}: p50 {summary['p50_ms']} ms")
+        return results
+
+    def bench_preprocess(self, images, options):
+        """preprocess_image (decode + resize + tensor) on every sample photo."""
+        latencies = []
+        for path in images:
+            for _ in range(options['iterations']):
+                started = time.perf_counter()
+                preprocess_image(path)
+                latencies.append(time.perf_counter() - started)
+        self.stderr.write(f"preprocess: p50 {latency_summary(latencies)['p50_ms']} ms")
+        return latency_summary(latencies)
+
+    def bench_endpoints(self, images, class_names, options):
+        """End-to-end requests through the Django test client."""
+        artifacts_dir = tempfile.mkdtemp(prefix='plantdoc-bench-artifacts-')
+        try:
+            # A randomly initialised model stands in for the trained weights.
+            shutil.copy(os.path.join(artifacts_directory(), 'class_names.json'), artifacts_dir)
+            model = CNN_NeuralNet(in_channels=3, num_diseases=len(class_names))
+            torch.save(model.state_dict(), os.path.join(artifacts_dir, ARTIFACT_FILENAMES['eager']))
+
+            with isolated_environment(), override_settings(
+                MODEL_ARTIFACTS_DIR=artifacts_dir,
+                MODEL_BACKEND='eager',
+                GEMINI_BACKEND='fake',
+                GEMINI_FAKE_LATENCY_MS=options['gemini_latency_ms'],
+            ):
+                return self.run_endpoints(images, options)
+        finally:
+            shutil.rmtree(artifacts_dir, ignore_errors=True)
+
+    def run_endpoints(self, images, options):
+        client = APIClient()
+        client.force_authenticate(create_benchmark_user())
+        n = options['requests']
+        results = {}
+
+        def measure(name, send):
+            latencies = []
+            for index in range(n):
+                started = time.perf_counter()
+                response = send(index)
+                latencies.append(time.perf_counter() - started)
+                if response.status_code != 200:
+                    raise CommandError(f"{name} returned {response.status_code}: {response.content[:200]!r}")
+            results[name] = latency_summary(latencies)
+            self.stderr.write(f"{name}: p50 {results[name]['p50_ms']} ms")
+
+        # Load the model outside of the timed requests.
+        providers.warmup(gemini=False)
+
+        new_uploads = unique_uploads(images, n)
+        measure('analyze_new_image', lambda i: client.post(
+            f'{API}/analyze/', {'image': new_uploads[i]}, format='multipart'
+        ))
+
+        # The same bytes every time: served from the prediction memo.
+        repeat_upload, = unique_uploads(images, 1)
+
+        def analyze_repeat(index):
+            repeat_upload.seek(0)
+            return client.post(f'{API}/analyze/', {'image': repeat_upload}, format='multipart')
+
+        measure('analyze_repeat_image', analyze_repeat)
+        measure('history', lambda i: client.get(f'{API}/history/'))
+        measure('history_page', lambda i: client.get(f'{API}/history/?page_size=20'))
+        measure('analytics', lambda i: client.get(f'{API}/analytics/'))
+        measure('chat', lambda i: client.post(
+            f'{API}/chat/', {'history': [], 'newMessage': 'How do I treat leaf mold on tomatoes?'}, format='json'
+        ))
+        return results
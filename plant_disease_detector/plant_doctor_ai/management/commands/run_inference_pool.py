@@ -0,0 +1,44 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        "Runs the inference worker pool that web processes use when "
+        "MODEL_INFERENCE_MODE='pool'. The model is loaded once and shared by every worker."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=getattr(settings, 'MODEL_POOL_WORKERS', 2),
+            help="Worker processes (default: MODEL_POOL_WORKERS)."
+        )
+        parser.add_argument(
+            '--threads', type=int,
+            help="Torch threads per worker (default: CPU cores divided by workers)."
+        )
+        parser.add_argument(
+            '--address', default=getattr(settings, 'MODEL_POOL_ADDRESS', None),
+            help="Unix socket path to listen on (default: MODEL_POOL_ADDRESS)."
+        )
+        parser.add_argument('--no-pin', action='store_true', help="Do not pin each worker to its own CPU cores.")
+
+    def handle(self, *args, **options):
+        from plant_doctor_ai.services.inference_pool import InferencePool
+
+        workers = options['workers']
+        if workers < 1:
+            raise CommandError("--workers must be at least 1.")
+        threads = options['threads'] or max(1, (os.cpu_count() or 1) // workers)
+
+        pool = InferencePool(
+            workers=workers, threads=threads, address=options['address'], pin_cores=not options['no_pin']
+        )
+        self.stdout.write(f"Starting {workers} inference worker(s) with {threads} thread(s) each on {pool.address}")
+        try:
+            pool.run()
+        except RuntimeError as e:
+            raise CommandError(str(e))
+        self.stdout.write("Inference pool stopped.")
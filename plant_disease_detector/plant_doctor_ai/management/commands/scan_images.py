@@ -0,0 +1,180 @@
+import csv
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.files import File
+from django.core.management.base import BaseCommand, CommandError
+
+from plant_doctor_ai.services.preprocessing import decode_files, find_images
+
+CSV_FIELDS = ['path', 'disease', 'confidence', 'top_k', 'error']
+
+
+def read_done(output, fmt):
+    """Paths already recorded in an existing output file, so a rerun can resume."""
+    if not os.path.exists(output):
+        return set()
+    done = set()
+    with open(output, 'r', newline='') as f:
+        if fmt == 'csv':
+            for row in csv.DictReader(f):
+                if row.get('path'):
+                    done.add(row['path'])
+        else:
+            for line in f:
+                try:
+                    done.add(json.loads(line)['path'])
+                except (ValueError, KeyError):
+                    # A line cut short by an interruption; that image is redone.
+                    continue
+    return done
+
+
+class ResultWriter:
+    """Appends JSONL or CSV records and flushes after every batch."""
+
+    def __init__(self, output, fmt):
+        self.fmt = fmt
+        new_file = not os.path.exists(output) or os.path.getsize(output) == 0
+        self.file = open(output, 'a', newline='')
+        if fmt == 'csv':
+            self.writer = csv.DictWriter(self.file, fieldnames=CSV_FIELDS)
+            if new_file:
+                self.writer.writeheader()
+
+    def write(self, record):
+        if self.fmt == 'csv':
+            row = dict(record)
+            if 'top_k' in row:
+                row['top_k'] = json.dumps(row['top_k'])
+            self.writer.writerow(row)
+        else:
+            self.file.write(json.dumps(record) + '\n')
+
+    def flush(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def close(self):
+        self.file.close()
+
+
+class Command(BaseCommand):
+    help = (
+        "Scores every image under a directory with the model: files are decoded in a process pool, "
+        "classified in batches, and written as JSONL or CSV. Rerunning with the same output resumes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('directory', help="Directory searched recursively for .jpg/.jpeg/.png/.webp files.")
+        parser.add_argument('--output', required=True, help="Results file. Appended to (and resumed from) if it exists.")
+        parser.add_argument(
+            '--format', choices=['jsonl', 'csv'],
+            help="Output format. Defaults to the --output extension, or jsonl."
+        )
+        parser.add_argument('--batch-size', type=int, default=32, help="Images per forward pass.")
+        parser.add_argument('--workers', type=int, default=os.cpu_count(), help="Decode processes.")
+        parser.add_argument(
+            '--user', dest='email',
+            help="Also save each result as an AnalysisResult for the user with this email."
+        )
+        parser.add_argument('--language', default='en', help="Treatment info language for saved results.")
+
+    def handle(self, *args, **options):
+        fmt = options['format'] or ('csv' if options['output'].lower().endswith('.csv') else 'jsonl')
+        user = self.get_user(options['email'])
+
+        paths = find_images(options['directory'])
+        done = read_done(options['output'], fmt)
+        pending = [path for path in paths if path not in done]
+        self.stdout.write(
+            f"{len(paths)} images found, {len(paths) - len(pending)} already in {options['output']}, "
+            f"{len(pending)} to scan."
+        )
+        if not pending:
+            return
+
+        batch_size = options['batch_size']
+        chunks = [pending[start:start + batch_size] for start in range(0, len(pending), batch_size)]
+        writer = ResultWriter(options['output'], fmt)
+        scanned = failed = 0
+        started = last_report = time.perf_counter()
+
+        # The pool is started before the model is loaded, so the forked
+        # decode workers stay small and never touch torch.
+        with ProcessPoolExecutor(max_workers=options['workers']) as pool:
+            from plant_doctor_ai.services.providers import model_service
+
+            # Keep a bounded number of chunks in flight so that decoded images
+            # never pile up in memory faster than the model can consume them.
+            in_flight = deque()
+            chunk_iter = iter(chunks)
+            for chunk in chunk_iter:
+                in_flight.append(pool.submit(decode_files, chunk))
+                if len(in_flight) >= 2 * options['workers']:
+                    break
+
+            try:
+                while in_flight:
+                    decoded, errors = in_flight.popleft().result()
+                    next_chunk = next(chunk_iter, None)
+                    if next_chunk is not None:
+                        in_flight.append(pool.submit(decode_files, next_chunk))
+
+                    predictions = model_service.predict_arrays([array for _, array in decoded]) if decoded else []
+                    for (path, _), prediction in zip(decoded, predictions):
+                        writer.write({
+                            "path": path, "disease": prediction['disease'],
+                            "confidence": prediction['confidence'], "top_k": prediction['top_k'],
+                        })
+                    for path, error in errors:
+                        writer.write({"path": path, "error": error})
+                        self.stderr.write(f"Failed {path}: {error}")
+
+                    if user is not None and decoded:
+                        self.save_results(user, [path for path, _ in decoded], predictions, options['language'])
+                    writer.flush()
+
+                    scanned += len(decoded)
+                    failed += len(errors)
+                    now = time.perf_counter()
+                    if now - last_report >= 10:
+                        last_report = now
+                        self.stdout.write(
+                            f"  {scanned + failed}/{len(pending)} images, {scanned / (now - started):.1f} images/s"
+                        )
+            finally:
+                writer.close()
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Scanned {scanned} images ({failed} failed) in {elapsed:.1f} s: {scanned / elapsed:.1f} images/s."
+        ))
+
+    def get_user(self, email):
+        if not email:
+            return None
+        from users.models import User
+        try:
+            return User.objects.get(email=email)
+        except User.DoesNotExist:
+            raise CommandError(f"No user with email {email}.")
+
+    def save_results(self, user, paths, predictions, language):
+        """Stores the images and saves one AnalysisResult per prediction, as the analyze endpoints do."""
+        from plant_doctor_ai.services.content_store import store_blob, prediction_memo
+        from plant_doctor_ai.services.providers import model_service
+        from plant_doctor_ai.services.treatment_cache import treatment_cache
+        from plant_doctor_ai.views import build_analysis, save_analyses
+
+        analyses = []
+        for path, prediction in zip(paths, predictions):
+            with open(path, 'rb') as f:
+                blob = store_blob(File(f, name=os.path.basename(path)))
+            prediction_memo.set(blob, model_service.model_version, prediction)
+            treatment_info = treatment_cache.get_treatment_info(prediction['disease'], language=language)
+            analyses.append(build_analysis(user, blob, prediction, treatment_info, language=language))
+        save_analyses(user, analyses)
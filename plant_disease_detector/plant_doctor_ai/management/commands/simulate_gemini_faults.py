@@ -0,0 +1,125 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+
+from plant_doctor_ai.benchmarking import isolated_environment
+from plant_doctor_ai.services import treatment_cache as treatment_cache_module
+from plant_doctor_ai.services.fake_gemini import FakeGeminiService
+from plant_doctor_ai.services.gemini_service import is_transient_error, FALLBACK_TREATMENT_INFO
+from plant_doctor_ai.services.resilience import CallPolicy, CircuitBreaker
+from plant_doctor_ai.services.treatment_cache import TreatmentCache
+
+DISEASE = 'Tomato___Late_blight'
+
+
+def drill_policy(timeout=0.2, deadline=0.5, max_retries=2, failure_threshold=5, reset_timeout=0.5):
+    """A fast policy so every scenario finishes in about a second."""
+    return CallPolicy(
+        'gemini-drill',
+        CircuitBreaker('gemini-drill', failure_threshold=failure_threshold, reset_timeout=reset_timeout),
+        timeout=timeout, deadline=deadline, max_retries=max_retries,
+        base_delay=0.005, max_delay=0.02, is_retryable=is_transient_error,
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        "Runs the Gemini client against a fake upstream that injects latency and errors, "
+        "and checks the timeouts, retries, circuit breaker, request coalescing and stale fallback."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--calls', type=int, default=200, help="Calls in the flaky-upstream scenario.")
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        self.failures = 0
+        self.seed = options['seed']
+
+        self.slow_upstream()
+        self.flaky_upstream(options['calls'])
+        self.upstream_outage()
+        with isolated_environment():
+            self.coalesced_misses()
+            self.stale_fallback()
+
+        if self.failures:
+            raise CommandError(f"{self.failures} check(s) failed.")
+        self.stdout.write(self.style.SUCCESS("All checks passed."))
+
+    def report(self, label, passed, detail):
+        status = self.style.SUCCESS('ok  ') if passed else self.style.ERROR('FAIL')
+        self.stdout.write(f"  {status} {label}: {detail}")
+        if not passed:
+            self.failures += 1
+
+    def slow_upstream(self):
+        self.stdout.write("Slow upstream (2 s latency, 0.2 s timeout, 0.5 s deadline)")
+        fake = FakeGeminiService(latency_ms=2000, policy=drill_policy())
+        started = time.perf_counter()
+        answer = fake.get_treatment_info(DISEASE)
+        elapsed = time.perf_counter() - started
+        self.report("bounded by the deadline", elapsed < 0.75, f"answered in {elapsed:.2f} s")
+        self.report("fallback served", answer == FALLBACK_TREATMENT_INFO, f"{fake.calls} attempt(s)")
+
+    def flaky_upstream(self, calls):
+        self.stdout.write(f"Flaky upstream (30% of attempts fail), {calls} calls")
+        rates = {}
+        for retries in (0, 3):
+            # A high threshold keeps the circuit closed; this scenario is about retries.
+            policy = drill_policy(max_retries=retries, failure_threshold=calls + 1)
+            fake = FakeGeminiService(error_rate=0.3, seed=self.seed, policy=policy)
+            ok = sum(fake.get_treatment_info(DISEASE) != FALLBACK_TREATMENT_INFO for _ in range(calls))
+            rates[retries] = ok / calls
+            self.stdout.write(f"    {retries} retries: {ok / calls:.1%} answered, {fake.calls} upstream attempts")
+        self.report("retries recover transient errors", rates[3] > 0.97 and rates[3] > rates[0], f"{rates[3]:.1%}")
+
+    def upstream_outage(self):
+        self.stdout.write("Upstream outage (every attempt fails), 50 calls")
+        policy = drill_policy(failure_threshold=5)
+        fake = FakeGeminiService(error_rate=1.0, policy=policy)
+        started = time.perf_counter()
+        for _ in range(50):
+            fake.get_treatment_info(DISEASE)
+        elapsed = time.perf_counter() - started
+        expected_attempts = 5 * (policy.max_retries + 1)
+        self.report(
+            "circuit opens and fails fast", fake.calls == expected_attempts and policy.breaker.state == 'open',
+            f"{fake.calls} upstream attempts for 50 calls in {elapsed:.2f} s"
+        )
+
+        fake.error_rate = 0.0
+        time.sleep(policy.breaker.reset_timeout)
+        answer = fake.get_treatment_info(DISEASE)
+        self.report(
+            "trial call closes the circuit after recovery",
+            answer != FALLBACK_TREATMENT_INFO and policy.breaker.state == 'closed', policy.breaker.state
+        )
+
+    def coalesced_misses(self):
+        self.stdout.write("20 concurrent cache misses for the same disease and language")
+        fake = FakeGeminiService(latency_ms=200, policy=drill_policy(timeout=1, deadline=2))
+        cache = TreatmentCache()
+        with mock.patch.object(treatment_cache_module, 'gemini_service', fake):
+            with ThreadPoolExecutor(max_workers=20) as executor:
+                answers = list(executor.map(lambda _: cache.get_treatment_info(DISEASE, 'en'), range(20)))
+        self.report(
+            "one upstream call", fake.calls == 1 and all(a != FALLBACK_TREATMENT_INFO for a in answers),
+            f"{fake.calls} upstream call(s)"
+        )
+
+    def stale_fallback(self):
+        self.stdout.write("Outdated cache entry while the upstream is down")
+        fake = FakeGeminiService(error_rate=1.0, policy=drill_policy())
+        cache = TreatmentCache()
+        with mock.patch.object(treatment_cache_module, 'gemini_service', fake), \
+                override_settings(TREATMENT_CACHE_VERSION=99):
+            answer = cache.get_treatment_info(DISEASE, 'en')
+        self.report(
+            "outdated entry served instead of the fallback text",
+            answer != FALLBACK_TREATMENT_INFO and DISEASE in answer['recommended_treatment'],
+            answer['recommended_treatment'][:60]
+        )
@@ -0,0 +1,54 @@
+import json
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from plant_doctor_ai.services.gemini_service import SUPPORTED_LANGUAGES
+from plant_doctor_ai.services.treatment_cache import treatment_cache
+
+
+class Command(BaseCommand):
+    help = "Pre-warms the treatment cache for every (disease class, language) pair."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--language', action='append', dest='languages', choices=SUPPORTED_LANGUAGES,
+            help="Only warm the given language. Can be repeated. Defaults to all supported languages."
+        )
+        parser.add_argument(
+            '--force', action='store_true',
+            help="Regenerate entries even if they are still fresh."
+        )
+
+    def handle(self, *args, **options):
+        classes_path = os.path.join(
+            getattr(settings, 'MODEL_ARTIFACTS_DIR', os.path.join(settings.BASE_DIR, 'deployment_artifacts')),
+            'class_names.json'
+        )
+        try:
+            with open(classes_path, 'r') as f:
+                class_names = json.load(f)
+        except FileNotFoundError:
+            raise CommandError(f"Class names file not found at {classes_path}")
+
+        languages = options['languages'] or SUPPORTED_LANGUAGES
+        warmed = skipped = failed = 0
+
+        for disease_name in class_names:
+            for language in languages:
+                if not options['force'] and treatment_cache.get(disease_name, language) is not None:
+                    skipped += 1
+                    continue
+                try:
+                    treatment_cache.refresh(disease_name, language)
+                    warmed += 1
+                    self.stdout.write(f"Cached {disease_name} [{language}]")
+                except Exception as e:
+                    failed += 1
+                    self.stderr.write(f"Failed {disease_name} [{language}]: {e}")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Treatment cache v{treatment_cache.version}: "
+            f"{warmed} warmed, {skipped} already fresh, {failed} failed."
+        ))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from plant_doctor_ai.services.providers import warmup
+
+
+class Command(BaseCommand):
+    help = "Loads the model and configures Gemini ahead of the first request."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--skip-model', action='store_true', help="Do not load the PyTorch model.")
+        parser.add_argument('--skip-gemini', action='store_true', help="Do not configure the Gemini client.")
+
+    def handle(self, *args, **options):
+        timings = warmup(model=not options['skip_model'], gemini=not options['skip_gemini'])
+        for service, seconds in timings.items():
+            self.stdout.write(f"{service}: {seconds:.3f} s")
+        self.stdout.write(self.style.SUCCESS("Services warmed up."))
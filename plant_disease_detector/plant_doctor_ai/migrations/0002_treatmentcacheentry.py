@@ -0,0 +1,29 @@
+# Generated by Django 5.2.4 on 2026-10-18 04:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('plant_doctor_ai', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TreatmentCacheEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('disease_name', models.CharField(max_length=255)),
+                ('language', models.CharField(max_length=10)),
+                ('version', models.PositiveIntegerField(default=1)),
+                ('recommended_treatment', models.TextField()),
+                ('prevention_tips', models.JSONField(default=list)),
+                ('expected_recovery_time', models.CharField(default='Varies', max_length=100)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('disease_name', 'language'), name='unique_treatment_per_language')],
+            },
+        ),
+    ]
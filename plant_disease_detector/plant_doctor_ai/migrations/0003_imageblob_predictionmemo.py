@@ -0,0 +1,39 @@
+# Generated by Django 5.2.4 on 2026-10-18 05:00
+
+import plant_doctor_ai.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('plant_doctor_ai', '0002_treatmentcacheentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImageBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sha256', models.CharField(max_length=64, unique=True)),
+                ('file', models.ImageField(upload_to=plant_doctor_ai.models.blob_upload_path)),
+                ('size', models.PositiveIntegerField(default=0)),
+                ('perceptual_hash', models.CharField(blank=True, db_index=True, max_length=16)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='PredictionMemo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sha256', models.CharField(max_length=64)),
+                ('model_version', models.CharField(max_length=64)),
+                ('disease_name', models.CharField(max_length=255)),
+                ('confidence', models.FloatField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('sha256', 'model_version'), name='unique_prediction_per_model_version')],
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.4 on 2026-10-18 05:03
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('plant_doctor_ai', '0004_analyticsrollup'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='analysisresult',
+            index=models.Index(fields=['user', '-created_at'], name='analysis_user_created_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.4 on 2026-10-18 05:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('plant_doctor_ai', '0005_analysis_user_created_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='analysisresult',
+            name='top_predictions',
+            field=models.JSONField(default=list),
+        ),
+        migrations.AddField(
+            model_name='predictionmemo',
+            name='top_predictions',
+            field=models.JSONField(default=list),
+        ),
+    ]
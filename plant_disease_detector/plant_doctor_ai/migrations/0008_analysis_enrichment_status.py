@@ -0,0 +1,23 @@
+# Generated by Django 5.2.4 on 2026-10-18 05:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('plant_doctor_ai', '0007_chatsession_chatmessage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='analysisresult',
+            name='enrichment_status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('complete', 'Complete'), ('failed', 'Failed')], default='complete', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='analysisresult',
+            name='language',
+            field=models.CharField(default='en', max_length=10),
+        ),
+    ]
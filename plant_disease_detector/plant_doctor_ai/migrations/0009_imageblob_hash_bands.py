@@ -0,0 +1,46 @@
+# Generated by Django 5.2.4 on 2026-10-18 05:49
+
+from django.db import migrations, models
+
+BANDS = 4
+
+
+def fill_hash_bands(apps, schema_editor):
+    ImageBlob = apps.get_model('plant_doctor_ai', 'ImageBlob')
+    blobs = ImageBlob.objects.exclude(perceptual_hash='').only('perceptual_hash')
+    for blob in blobs.iterator():
+        width = len(blob.perceptual_hash) // BANDS
+        for band in range(BANDS):
+            setattr(blob, f'hash_band{band}', blob.perceptual_hash[band * width:(band + 1) * width])
+        blob.save(update_fields=[f'hash_band{band}' for band in range(BANDS)])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('plant_doctor_ai', '0008_analysis_enrichment_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='imageblob',
+            name='hash_band0',
+            field=models.CharField(blank=True, db_index=True, max_length=4),
+        ),
+        migrations.AddField(
+            model_name='imageblob',
+            name='hash_band1',
+            field=models.CharField(blank=True, db_index=True, max_length=4),
+        ),
+        migrations.AddField(
+            model_name='imageblob',
+            name='hash_band2',
+            field=models.CharField(blank=True, db_index=True, max_length=4),
+        ),
+        migrations.AddField(
+            model_name='imageblob',
+            name='hash_band3',
+            field=models.CharField(blank=True, db_index=True, max_length=4),
+        ),
+        migrations.RunPython(fill_hash_bands, migrations.RunPython.noop),
+    ]
@@ -1,3 +1,6 @@
+import os
+import uuid
+
 from django.db import models
 from django.conf import settings
 
@@ -7,6 +10,13 @@ class AnalysisResult(models.Model):
         MEDIUM = 'Medium', 'Medium'
         HIGH = 'High', 'High'
 
+    class EnrichmentStatus(models.TextChoices):
+        # The treatment fields are filled in by the background enrichment queue.
+        PENDING = 'pending', 'Pending'
+        COMPLETE = 'complete', 'Complete'
+        # Gemini could not be reached; the treatment fields hold the fallback text.
+        FAILED = 'failed', 'Failed'
+
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='analyses')
     image = models.ImageField(upload_to='analyses/%Y/%m/%d/')
     disease_name = models.CharField(max_length=255)
@@ -15,10 +25,190 @@ class AnalysisResult(models.Model):
     recommended_treatment = models.TextField()
     prevention_tips = models.JSONField(default=list) # Use JSONField for the list of tips
     expected_recovery_time = models.CharField(max_length=100, default="N/A")
+    top_predictions = models.JSONField(default=list) # [{"disease": ..., "confidence": ...}], best first
+    enrichment_status = models.CharField(
+        max_length=10, choices=EnrichmentStatus.choices, default=EnrichmentStatus.COMPLETE
+    )
+    language = models.CharField(max_length=10, default='en') # Language of the treatment text
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Serves history/ (filter by user, newest first) and its keyset pagination.
+            models.Index(fields=['user', '-created_at'], name='analysis_user_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.disease_name} for {self.user.email} at {self.created_at.strftime('%Y-%m-%d')}"
+
+class TreatmentCacheEntry(models.Model):
+    """
+    Precomputed treatment info for one (disease class, language) pair.
+
+    Entries written under an older TREATMENT_CACHE_VERSION, or older than
+    TREATMENT_CACHE_TTL_DAYS, are treated as misses and regenerated.
+    """
+    disease_name = models.CharField(max_length=255)
+    language = models.CharField(max_length=10)
+    version = models.PositiveIntegerField(default=1)
+    recommended_treatment = models.TextField()
+    prevention_tips = models.JSONField(default=list)
+    expected_recovery_time = models.CharField(max_length=100, default="Varies")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['disease_name', 'language'], name='unique_treatment_per_language')
+        ]
+
+    def __str__(self):
+        return f"{self.disease_name} ({self.language}, v{self.version})"
+
+    def as_treatment_info(self):
+        return {
+            "recommended_treatment": self.recommended_treatment,
+            "prevention_tips": self.prevention_tips,
+            "expected_recovery_time": self.expected_recovery_time,
+        }
+
+
+def blob_upload_path(instance, filename):
+    """Content-addressed location, e.g. analyses/blobs/3f/a9/3fa9....jpg"""
+    extension = os.path.splitext(filename)[1].lower() or '.jpg'
+    digest = instance.sha256
+    return f"analyses/blobs/{digest[:2]}/{digest[2:4]}/{digest}{extension}"
+
+class ImageBlob(models.Model):
+    """
+    One stored copy of an uploaded image, keyed by the SHA-256 of its bytes.
+    AnalysisResult rows for identical uploads all point at the same file.
+    """
+    sha256 = models.CharField(max_length=64, unique=True)
+    file = models.ImageField(upload_to=blob_upload_path)
+    size = models.PositiveIntegerField(default=0)
+    perceptual_hash = models.CharField(max_length=16, blank=True, db_index=True)
+    # The perceptual hash in four 4-character bands, indexed so that near
+    # duplicates can be found with equality lookups (see content_store).
+    hash_band0 = models.CharField(max_length=4, blank=True, db_index=True)
+    hash_band1 = models.CharField(max_length=4, blank=True, db_index=True)
+    hash_band2 = models.CharField(max_length=4, blank=True, db_index=True)
+    hash_band3 = models.CharField(max_length=4, blank=True, db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.sha256
+
+class PredictionMemo(models.Model):
+    """
+    The model's prediction for an image, memoized per (content hash, model
+    version) so that repeat uploads skip inference.
+    """
+    sha256 = models.CharField(max_length=64)
+    model_version = models.CharField(max_length=64)
+    disease_name = models.CharField(max_length=255)
+    confidence = models.FloatField()
+    top_predictions = models.JSONField(default=list)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['sha256', 'model_version'], name='unique_prediction_per_model_version')
+        ]
+
+    def __str__(self):
+        return f"{self.sha256[:12]} -> {self.disease_name} ({self.model_version})"
+
+    def as_prediction(self):
+        return {"disease": self.disease_name, "confidence": self.confidence, "top_k": self.top_predictions}
+
+class AnalyticsRollup(models.Model):
+    """
+    Running per-user totals behind the analytics dashboard, updated in the
+    same transaction that inserts new AnalysisResult rows, so the dashboard
+    reads one row instead of aggregating the user's whole history.
+    """
+    user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='analytics_rollup')
+    total_analyzed = models.PositiveIntegerField(default=0)
+    confidence_sum = models.FloatField(default=0.0)
+    disease_counts = models.JSONField(default=dict) # {disease_name: count}
+    severity_counts = models.JSONField(default=dict) # {severity: count}
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Analytics for {self.user.email} ({self.total_analyzed} analyses)"
+
+    def add(self, analyses):
+        """Folds newly saved analyses into the totals (does not save)."""
+        for analysis in analyses:
+            self.total_analyzed += 1
+            self.confidence_sum += analysis.confidence
+            self.disease_counts[analysis.disease_name] = self.disease_counts.get(analysis.disease_name, 0) + 1
+            self.severity_counts[analysis.severity] = self.severity_counts.get(analysis.severity, 0) + 1
+
+    def remove(self, analyses):
+        """Takes deleted analyses back out of the totals (does not save)."""
+        for analysis in analyses:
+            self.total_analyzed = max(0, self.total_analyzed - 1)
+            self.confidence_sum -= analysis.confidence
+            for counts, key in ((self.disease_counts, analysis.disease_name), (self.severity_counts, analysis.severity)):
+                if counts.get(key, 0) > 1:
+                    counts[key] -= 1
+                else:
+                    counts.pop(key, None)
+        if not self.total_analyzed:
+            # Don't let float error leave a residue once every analysis is gone.
+            self.confidence_sum = 0.0
+
+    @property
+    def avg_confidence(self):
+        return self.confidence_sum / self.total_analyzed if self.total_analyzed else 0
+
+
+class ChatSession(models.Model):
+    """
+    A server-side chat conversation. Clients send only the session id and
+    the new message; the history is kept here.
+
+    Once the messages after `summarized_until` exceed the context token
+    budget, the older ones are folded into `summary`, so the context sent
+    to Gemini stays bounded however long the conversation gets.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='chat_sessions')
+    summary = models.TextField(blank=True)
+    summarized_until = models.PositiveBigIntegerField(default=0) # id of the last ChatMessage folded into summary
+    context_tokens = models.PositiveIntegerField(default=0) # estimated tokens of the messages after it
+    message_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-updated_at']
+        indexes = [
+            models.Index(fields=['user', '-updated_at'], name='chat_session_user_updated_idx'),
+        ]
+
+    def __str__(self):
+        return f"Chat {self.id} for {self.user.email} ({self.message_count} messages)"
+
+class ChatMessage(models.Model):
+    class Role(models.TextChoices):
+        USER = 'user', 'User'
+        MODEL = 'model', 'Model'
+
+    session = models.ForeignKey(ChatSession, on_delete=models.CASCADE, related_name='messages')
+    role = models.CharField(max_length=10, choices=Role.choices)
+    text = models.TextField()
+    tokens = models.PositiveIntegerField(default=0) # estimated, see services.chat_sessions.estimate_tokens
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['id']
 
     def __str__(self):
-        return f"{self.disease_name} for {self.user.email} at {self.created_at.strftime('%Y-%m-%d')}"
\ No newline at end of file
+        return f"{self.role}: {self.text[:40]}"
+
+    def as_history_item(self):
+        """The message in the {"role", "parts"} format of the Gemini chat history."""
+        return {"role": self.role, "parts": [{"text": self.text}]}
@@ -0,0 +1,37 @@
+from django.conf import settings
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import CursorPagination
+
+
+class HistoryCursorPagination(CursorPagination):
+    """
+    Keyset pagination for analysis history, newest first.
+
+    Each page is fetched with `WHERE created_at < <last seen> ORDER BY
+    created_at DESC LIMIT n` on the (user, -created_at) index, so page 5000
+    costs the same as page 1, unlike OFFSET pagination.
+
+    Rows saved by one batch analysis can share a created_at, so the id breaks
+    ties and every row appears on exactly one page.
+
+    Pagination is opt-in: a request with neither `cursor` nor `page_size` gets
+    the full list, as the dashboard currently expects. A `page_size` that is
+    not a positive number falls back to HISTORY_PAGE_SIZE.
+    """
+    ordering = ('-created_at', '-id')
+    page_size_query_param = 'page_size'
+    page_size = getattr(settings, 'HISTORY_PAGE_SIZE', 20)
+    max_page_size = getattr(settings, 'HISTORY_MAX_PAGE_SIZE', 100)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        params = request.query_params
+        if self.cursor_query_param not in params and self.page_size_query_param not in params:
+            return None
+        return super().paginate_queryset(queryset, request, view)
+
+    def decode_cursor(self, request):
+        # DRF answers a cursor it cannot decode with a 404; it is a bad request.
+        try:
+            return super().decode_cursor(request)
+        except NotFound:
+            raise ValidationError({self.cursor_query_param: "Invalid cursor."})
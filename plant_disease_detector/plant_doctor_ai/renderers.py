@@ -0,0 +1,28 @@
+import json
+
+from rest_framework.renderers import BaseRenderer
+
+
+def sse_event(data, event=None):
+    """Encodes one Server-Sent Event with a JSON payload."""
+    lines = [f"event: {event}"] if event else []
+    lines.append(f"data: {json.dumps(data, ensure_ascii=False)}")
+    return "\n".join(lines) + "\n\n"
+
+
+class EventStreamRenderer(BaseRenderer):
+    """
+    Lets views negotiate 'Accept: text/event-stream'. Streaming responses
+    bypass rendering entirely; this only renders regular Responses (such
+    as validation errors) as a single SSE event.
+    """
+    media_type = 'text/event-stream'
+    format = 'sse'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        response = (renderer_context or {}).get('response')
+        event = 'error' if response is not None and response.status_code >= 400 else 'message'
+        return sse_event(data, event=event).encode(self.charset)
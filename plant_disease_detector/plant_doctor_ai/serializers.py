@@ -1,18 +1,33 @@
 from rest_framework import serializers
 from django.contrib.auth import authenticate
-from .models import AnalysisResult
+from django.conf import settings
+from .models import AnalysisResult, ChatMessage, ChatSession
+from .services.chat_sessions import trim_history
+from .services.derivatives import derivative_urls
 from users.models import User
 
 class AnalysisResultSerializer(serializers.ModelSerializer):
     image_url = serializers.SerializerMethodField()
+    thumbnail_url = serializers.SerializerMethodField()
+    derivatives = serializers.SerializerMethodField()
 
     class Meta:
         model = AnalysisResult
         fields = [
-            'id', 'image_url', 'disease_name', 'confidence',
-            'severity', 'created_at'
+            'id', 'image_url', 'thumbnail_url', 'derivatives', 'disease_name', 'confidence',
+            'severity', 'enrichment_status', 'created_at'
         ]
 
+    def get_derivatives(self, obj):
+        """{"thumb": {"jpeg": url, "webp": url}, "preview": {...}}, computed once per object."""
+        cache = self.context.setdefault('derivative_urls', {})
+        if obj.pk not in cache:
+            cache[obj.pk] = derivative_urls(obj.image, self.context.get('request'))
+        return cache[obj.pk]
+
+    def get_thumbnail_url(self, obj):
+        return self.get_derivatives(obj).get('thumb', {}).get('jpeg')
+
     def get_image_url(self, obj):
         request = self.context.get('request')
         if obj.image and hasattr(obj.image, 'url'):
@@ -31,6 +46,10 @@ class ChatHistoryItemSerializer(serializers.Serializer):
     )
 
 class ChatbotRequestSerializer(serializers.Serializer):
+    # Clients with a server-side session send only its id and the new
+    # message. Sending the whole history is still accepted; only its newest
+    # CHAT_MAX_HISTORY_MESSAGES items are used.
+    sessionId = serializers.UUIDField(required=False)
     history = ChatHistoryItemSerializer(
         many=True,
         required=False,
@@ -41,4 +60,23 @@ class ChatbotRequestSerializer(serializers.Serializer):
         max_length=4096,
         allow_blank=False,
         trim_whitespace=True
-    )
\ No newline at end of file
+    )
+
+    def validate_history(self, history):
+        return trim_history(history, getattr(settings, 'CHAT_MAX_HISTORY_MESSAGES', 40))
+
+    def validate(self, attrs):
+        if attrs.get('sessionId') and attrs.get('history'):
+            raise serializers.ValidationError("Send either sessionId or history, not both.")
+        return attrs
+
+class ChatMessageSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ChatMessage
+        fields = ['id', 'role', 'text', 'created_at']
+
+class ChatSessionSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ChatSession
+        fields = ['id', 'summary', 'message_count', 'created_at', 'updated_at']
+        read_only_fields = fields
\ No newline at end of file
@@ -0,0 +1,238 @@
+# plant_doctor_ai/services/admission.py
+"""
+Admission control for the inference path.
+
+At most `max_in_flight` requests decode and classify images at once; up to
+`max_queue` more wait, first come first served, for at most `queue_timeout`
+seconds. Anything beyond that is rejected immediately with an estimated
+Retry-After, so a burst gets fast 503s instead of every request slowing
+down together and the process running out of memory.
+
+Each process (e.g. each gunicorn worker) has its own controller.
+"""
+
+import asyncio
+import math
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+
+from django.conf import settings
+from django.utils.functional import SimpleLazyObject
+
+from .metrics import registry
+from .providers import lazy_service
+
+# Weight of the newest observation in the average service time.
+SERVICE_TIME_SMOOTHING = 0.2
+MAX_RETRY_AFTER_SECONDS = 60
+
+
+class AdmissionRejected(RuntimeError):
+    """Raised when a request cannot be admitted; carries the Retry-After in seconds."""
+
+    def __init__(self, name, reason, retry_after):
+        super().__init__(f"'{name}' rejected a request ({reason}); retry in {retry_after}s.")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class _Waiter:
+    """A queued request, woken by the release that hands it a slot."""
+
+    def __init__(self):
+        self.event = threading.Event()
+
+    def wake(self):
+        self.event.set()
+
+
+class _AsyncWaiter:
+    def __init__(self):
+        self.loop = asyncio.get_running_loop()
+        self.future = self.loop.create_future()
+
+    def wake(self):
+        self.loop.call_soon_threadsafe(self._resolve)
+
+    def _resolve(self):
+        if not self.future.done():
+            self.future.set_result(True)
+
+
+class AdmissionController:
+    """
+    A bounded semaphore with a bounded FIFO queue, usable from threads and
+    from the event loop alike.
+
+    A release hands its slot directly to the oldest waiter, so queued
+    requests are never overtaken by new arrivals. Whether a waiter got a slot
+    is decided under the lock by its presence in the queue, which keeps
+    timeouts and cancellations from leaking or double-counting slots.
+
+    A max_in_flight of 0 disables admission control.
+    """
+
+    def __init__(self, name, max_in_flight, max_queue, queue_timeout):
+        self.name = name
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._waiters = deque()
+        self._service_time = None
+
+        self.in_flight_gauge = registry.gauge(
+            'plantdoc_admission_in_flight', 'Requests currently admitted.', queue=name
+        )
+        self.queue_gauge = registry.gauge(
+            'plantdoc_admission_queue_depth', 'Requests waiting to be admitted.', queue=name
+        )
+        self.wait_histogram = registry.histogram(
+            'plantdoc_admission_wait_seconds', description='Time spent waiting to be admitted.', queue=name
+        )
+
+    @property
+    def enabled(self):
+        return self.max_in_flight > 0
+
+    def _update_gauges(self):
+        self.in_flight_gauge.set(self._in_flight)
+        self.queue_gauge.set(len(self._waiters))
+
+    def _retry_after(self):
+        """Seconds until the queue has likely drained, from the average service time."""
+        if not self._service_time:
+            return 1
+        backlog = (self._in_flight + len(self._waiters)) / self.max_in_flight
+        return max(1, min(MAX_RETRY_AFTER_SECONDS, math.ceil(self._service_time * backlog)))
+
+    def _reject(self, reason):
+        registry.counter(
+            'plantdoc_admission_rejections_total', 'Requests rejected by admission control, by reason.',
+            queue=self.name, reason=reason
+        ).inc()
+        return AdmissionRejected(self.name, reason, self._retry_after())
+
+    def _enter_or_enqueue(self, waiter):
+        """Takes a free slot (True) or queues the waiter (False). Caller holds the lock."""
+        if self._in_flight < self.max_in_flight and not self._waiters:
+            self._in_flight += 1
+            self._update_gauges()
+            return True
+        if len(self._waiters) >= self.max_queue:
+            raise self._reject('queue_full')
+        self._waiters.append(waiter)
+        self._update_gauges()
+        return False
+
+    def _abandon(self, waiter):
+        """
+        Removes a waiter that timed out or was cancelled. Returns False if it
+        was handed a slot in the meantime, which the caller then owns.
+        """
+        with self._lock:
+            if waiter not in self._waiters:
+                return False
+            self._waiters.remove(waiter)
+            self._update_gauges()
+            return True
+
+    def check(self):
+        """
+        Raises AdmissionRejected if a new request could not even be queued,
+        e.g. before spending time on reading its upload.
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            if self._in_flight >= self.max_in_flight and len(self._waiters) >= self.max_queue:
+                raise self._reject('queue_full')
+
+    def acquire(self):
+        started = time.perf_counter()
+        waiter = _Waiter()
+        with self._lock:
+            admitted = self._enter_or_enqueue(waiter)
+        if not admitted and not waiter.event.wait(self.queue_timeout) and self._abandon(waiter):
+            with self._lock:
+                raise self._reject('queue_timeout')
+        self.wait_histogram.observe(time.perf_counter() - started)
+
+    async def aacquire(self):
+        started = time.perf_counter()
+        waiter = _AsyncWaiter()
+        with self._lock:
+            admitted = self._enter_or_enqueue(waiter)
+        if not admitted:
+            try:
+                await asyncio.wait_for(waiter.future, self.queue_timeout)
+            except asyncio.TimeoutError:
+                if self._abandon(waiter):
+                    with self._lock:
+                        raise self._reject('queue_timeout')
+            except asyncio.CancelledError:
+                if not self._abandon(waiter):
+                    self.release()
+                raise
+        self.wait_histogram.observe(time.perf_counter() - started)
+
+    def release(self, service_time=None):
+        with self._lock:
+            if service_time is not None:
+                if self._service_time is None:
+                    self._service_time = service_time
+                else:
+                    self._service_time += SERVICE_TIME_SMOOTHING * (service_time - self._service_time)
+            if self._waiters:
+                # Hand the slot over; the in-flight count stays the same.
+                self._waiters.popleft().wake()
+            else:
+                self._in_flight -= 1
+            self._update_gauges()
+
+    @contextmanager
+    def admit(self):
+        """
+        Holds a slot for the duration of the block.
+
+        Raises:
+            AdmissionRejected: The queue is full, or the wait timed out.
+        """
+        if not self.enabled:
+            yield
+            return
+        self.acquire()
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.release(time.perf_counter() - started)
+
+    @asynccontextmanager
+    async def aadmit(self):
+        """Async variant of admit(); waiting does not block the event loop."""
+        if not self.enabled:
+            yield
+            return
+        await self.aacquire()
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.release(time.perf_counter() - started)
+
+
+def _build_inference_admission():
+    return AdmissionController(
+        'inference',
+        max_in_flight=getattr(settings, 'INFERENCE_MAX_IN_FLIGHT', 8),
+        max_queue=getattr(settings, 'INFERENCE_MAX_QUEUE', 16),
+        queue_timeout=getattr(settings, 'INFERENCE_QUEUE_TIMEOUT_SECONDS', 10),
+    )
+
+
+# lazy_service: every request thread must see the same controller.
+inference_admission = SimpleLazyObject(lazy_service(_build_inference_admission))
@@ -0,0 +1,110 @@
+# plant_doctor_ai/services/analytics.py
+
+from django.db import transaction
+from django.db.models import Count, Sum
+
+from ..models import AnalysisResult, AnalyticsRollup
+
+
+def record_analyses(user, analyses):
+    """
+    Adds newly saved analyses to the user's rollup.
+
+    Must be called inside the transaction that inserted them. The row is
+    locked with select_for_update() so concurrent saves for the same user
+    apply their increments one after the other (on SQLite the preceding
+    insert already holds the database write lock).
+
+    A user without a rollup yet (e.g. one whose analyses predate the rollup
+    table) gets one built from their whole history, which already includes
+    the new rows.
+    """
+    rollup = AnalyticsRollup.objects.select_for_update().filter(user_id=user.pk).first()
+    if rollup is None:
+        rollup, created = AnalyticsRollup.objects.get_or_create(
+            user_id=user.pk, defaults=aggregate_analyses(user)
+        )
+        if created:
+            return rollup
+        # Another transaction created it first, without our rows.
+        rollup = AnalyticsRollup.objects.select_for_update().get(user_id=user.pk)
+    rollup.add(analyses)
+    rollup.save()
+    return rollup
+
+
+def forget_analyses(user_id, analyses):
+    """
+    Takes deleted analyses out of the user's rollup, if it has one. Users
+    without a rollup get theirs built from the remaining rows on next read.
+    """
+    with transaction.atomic():
+        rollup = AnalyticsRollup.objects.select_for_update().filter(user_id=user_id).first()
+        if rollup is None:
+            return None
+        rollup.remove(analyses)
+        rollup.save(update_fields=['total_analyzed', 'confidence_sum', 'disease_counts', 'severity_counts', 'updated_at'])
+    return rollup
+
+
+def aggregate_analyses(user):
+    """
+    Computes the rollup figures from the raw AnalysisResult rows.
+
+    Returns:
+        dict: total_analyzed, confidence_sum, disease_counts and severity_counts.
+    """
+    queryset = AnalysisResult.objects.filter(user_id=user.pk)
+    totals = queryset.aggregate(total=Count('id'), confidence_sum=Sum('confidence'))
+    return {
+        "total_analyzed": totals['total'],
+        "confidence_sum": totals['confidence_sum'] or 0.0,
+        "disease_counts": dict(
+            queryset.order_by().values_list('disease_name').annotate(count=Count('id'))
+        ),
+        "severity_counts": dict(
+            queryset.order_by().values_list('severity').annotate(count=Count('id'))
+        ),
+    }
+
+
+def rebuild_rollup(user):
+    """Recomputes a user's rollup from scratch and stores it."""
+    with transaction.atomic():
+        rollup, _ = AnalyticsRollup.objects.select_for_update().get_or_create(user_id=user.pk)
+        for field, value in aggregate_analyses(user).items():
+            setattr(rollup, field, value)
+        rollup.save()
+    return rollup
+
+
+def get_rollup(user):
+    """
+    Returns the user's rollup, building it once from the raw rows for users
+    whose analyses predate the rollup table.
+    """
+    rollup = AnalyticsRollup.objects.filter(user_id=user.pk).first()
+    if rollup is None:
+        rollup = rebuild_rollup(user)
+    return rollup
+
+
+def rollup_differences(rollup, expected, tolerance=1e-6):
+    """
+    Compares a stored rollup with aggregate_analyses() output.
+
+    Returns:
+        list: The names of the fields that disagree (empty if consistent).
+    """
+    differences = []
+    for field, value in expected.items():
+        stored = getattr(rollup, field)
+        if field == 'confidence_sum':
+            if abs(stored - value) > tolerance * max(1.0, abs(value)):
+                differences.append(field)
+        elif field.endswith('_counts'):
+            if {k: v for k, v in stored.items() if v} != value:
+                differences.append(field)
+        elif stored != value:
+            differences.append(field)
+    return differences
@@ -0,0 +1,113 @@
+# plant_doctor_ai/services/batching.py
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from .metrics import registry
+
+
+class MicroBatcher:
+    """
+    Collects concurrent requests into small batches and runs them together.
+
+    Callers submit one item at a time and block on their own Future. A single
+    background thread pulls the first waiting item, then keeps collecting
+    until either `max_batch_size` items are gathered or `max_wait_ms` has
+    passed since that first item arrived. The whole batch is handed to
+    `run_batch`, which must return one result per item, in order.
+    """
+
+    def __init__(self, run_batch, max_batch_size=8, max_wait_ms=10, name='model'):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1.")
+        self.run_batch = run_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.name = name
+
+        self.batch_size_histogram = registry.histogram(
+            f'plantdoc_{name}_batch_size',
+            buckets=[1, 2, 4, 8, 16, 32, 64],
+            description='Number of requests executed per batch.'
+        )
+        self.queue_wait_histogram = registry.histogram(
+            f'plantdoc_{name}_batch_queue_wait_seconds',
+            buckets=[0.0005, 0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.25, 1],
+            description='Time a request spent queued before its batch ran.'
+        )
+
+        self._queue = queue.Queue()
+        self._worker = None
+        self._lock = threading.Lock()
+
+    def submit(self, item):
+        """Queues a single item and returns a Future for its result."""
+        self._ensure_worker()
+        future = Future()
+        self._queue.put((item, future, time.perf_counter()))
+        return future
+
+    def __call__(self, item):
+        """Submits an item and blocks until its result is ready."""
+        return self.submit(item).result()
+
+    def stats(self):
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0,
+            "batch_size": self.batch_size_histogram.snapshot(),
+            "queue_wait_seconds": self.queue_wait_histogram.snapshot(),
+        }
+
+    def _ensure_worker(self):
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(
+                    target=self._run, name=f'{self.name}-batcher', daemon=True
+                )
+                self._worker.start()
+
+    def _collect(self):
+        # Block for the first item, then keep draining until the batch is
+        # full or the wait window that started with the first item closes.
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            started = time.perf_counter()
+            for _, _, enqueued_at in batch:
+                self.queue_wait_histogram.observe(started - enqueued_at)
+            self.batch_size_histogram.observe(len(batch))
+
+            items = [item for item, _, _ in batch]
+            try:
+                results = list(self.run_batch(items))
+                if len(results) != len(batch):
+                    raise RuntimeError(
+                        f"'{self.name}' batch returned {len(results)} results for {len(batch)} items."
+                    )
+            except Exception as e:
+                # Every caller is blocked on its future, so all of them must
+                # be resolved, or they would wait forever.
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            for (_, future, _), result in zip(batch, results):
+                future.set_result(result)
@@ -0,0 +1,245 @@
+# plant_doctor_ai/services/chat_intents.py
+"""
+The curated intent set behind the chat pre-filter (services.chat_prefilter).
+
+Every intent has example phrasings in each supported language. Intents with
+`answers` are answered locally from those templates; 'plant' marks genuine
+plant-health questions, which always go to Gemini. Answers may use the
+{formats} and {max_size} placeholders, filled in from the upload limits
+when the answer is given.
+
+When adding examples, prefer short, typical phrasings: the classifier
+compares messages with each example, so one good example per way of asking
+is enough.
+"""
+
+# Words for plant parts, symptoms and remedies. A message containing one is
+# never refused as off-topic, and needs a stronger match to get an FAQ
+# answer, because it is most likely about the user's plant.
+PLANT_TERMS = {
+    'en': ["leaf", "leaves", "root", "roots", "stem", "fruit", "flower", "seed", "soil", "spot", "spots",
+           "blight", "mildew", "mold", "mould", "rot", "rust", "fungus", "fungal", "pest", "pests", "insect",
+           "insects", "bug", "bugs", "aphid", "aphids", "mealybug", "mealybugs", "whitefly", "whiteflies", "mite",
+           "mites", "thrips", "caterpillar", "caterpillars", "beetle", "beetles", "slug", "slugs", "snail", "snails",
+           "disease", "wilt", "wilting", "wilted", "drooping", "dying", "dead", "yellow", "yellowing", "brown",
+           "curling", "fertilizer", "pesticide", "insecticide", "neem", "prune", "water", "watering",
+           "apple", "blueberry", "cherry", "corn", "grape", "orange", "peach", "pepper", "potato", "potatoes",
+           "raspberry", "soybean", "squash", "strawberry", "tomato", "tomatoes"],
+    'hi': ["पत्ती", "पत्तियाँ", "पत्तियों", "जड़", "तना", "फल", "फूल", "बीज", "मिट्टी", "धब्बे", "फफूंद",
+           "कीट", "कीड़े", "माहू", "सफेद", "मक्खी", "बीमारी", "रोग", "मुरझा", "सूख", "खाद", "कीटनाशक", "पानी",
+           "टमाटर", "आलू", "सेब", "मक्का", "अंगूर", "मिर्च"],
+    'es': ["hoja", "hojas", "raíz", "raíces", "tallo", "fruto", "flor", "semilla", "suelo", "manchas", "tizón",
+           "oídio", "moho", "podredumbre", "roya", "hongo", "hongos", "plaga", "plagas", "insectos", "pulgón",
+           "pulgones", "cochinilla", "cochinillas", "mosca", "ácaros", "oruga", "orugas", "enfermedad", "marchita",
+           "muriendo", "seca", "fertilizante", "pesticida", "insecticida", "riego", "tomate", "tomates", "papa",
+           "papas", "patata", "patatas", "manzano", "maíz", "uva", "pimiento"],
+    'fr': ["feuille", "feuilles", "racine", "racines", "tige", "fruit", "fleur", "graine", "sol", "taches",
+           "mildiou", "oïdium", "moisissure", "pourriture", "rouille", "champignon", "ravageur", "ravageurs",
+           "insectes", "puceron", "pucerons", "cochenille", "cochenilles", "aleurode", "aleurodes", "acarien",
+           "acariens", "chenille", "chenilles", "maladie", "flétrit", "fanée", "meurt", "engrais", "pesticide",
+           "insecticide", "arrosage", "tomate", "tomates", "pomme", "pommes", "maïs", "vigne", "poivron"],
+}
+
+OFF_TOPIC_ANSWER = {
+    'en': "I'm sorry, I can only help with plant health and questions about the PlantDoc platform. "
+          "Feel free to ask me about plant diseases, treatments or plant care!",
+    'hi': "क्षमा करें, मैं केवल पौधों के स्वास्थ्य और PlantDoc प्लेटफ़ॉर्म से जुड़े प्रश्नों में मदद कर सकता हूँ। "
+          "आप मुझसे पौधों की बीमारियों, उपचार या देखभाल के बारे में पूछ सकते हैं!",
+    'es': "Lo siento, solo puedo ayudar con la salud de las plantas y preguntas sobre la plataforma PlantDoc. "
+          "¡Pregúntame sobre enfermedades de plantas, tratamientos o cuidados!",
+    'fr': "Désolé, je ne peux vous aider que pour la santé des plantes et les questions sur la plateforme PlantDoc. "
+          "N'hésitez pas à me poser des questions sur les maladies, les traitements ou l'entretien des plantes !",
+}
+
+INTENTS = {
+    'greeting': {
+        'examples': {
+            'en': ["hi", "hello", "hello there", "hey", "good morning"],
+            'hi': ["नमस्ते", "हेलो", "नमस्कार", "सुप्रभात"],
+            'es': ["hola", "buenos días", "buenas tardes"],
+            'fr': ["bonjour", "salut", "bonsoir"],
+        },
+        'answers': {
+            'en': "Hello! I'm PlantDoc Assistant. Ask me about plant diseases, treatments or plant care, "
+                  "or how to use the platform.",
+            'hi': "नमस्ते! मैं PlantDoc Assistant हूँ। मुझसे पौधों की बीमारियों, उपचार, देखभाल या प्लेटफ़ॉर्म "
+                  "के उपयोग के बारे में पूछें।",
+            'es': "¡Hola! Soy PlantDoc Assistant. Pregúntame sobre enfermedades de plantas, tratamientos, "
+                  "cuidados o cómo usar la plataforma.",
+            'fr': "Bonjour ! Je suis PlantDoc Assistant. Posez-moi vos questions sur les maladies des plantes, "
+                  "les traitements, l'entretien ou l'utilisation de la plateforme.",
+        },
+    },
+    'thanks': {
+        'examples': {
+            'en': ["thanks", "thank you", "thank you very much", "thanks a lot"],
+            'hi': ["धन्यवाद", "शुक्रिया", "बहुत धन्यवाद"],
+            'es': ["gracias", "muchas gracias"],
+            'fr': ["merci", "merci beaucoup"],
+        },
+        'answers': {
+            'en': "You're welcome! Ask me anytime if you have more questions about your plants.",
+            'hi': "आपका स्वागत है! अपने पौधों के बारे में कोई और प्रश्न हो तो कभी भी पूछें।",
+            'es': "¡De nada! Pregúntame cuando quieras si tienes más dudas sobre tus plantas.",
+            'fr': "Avec plaisir ! N'hésitez pas si vous avez d'autres questions sur vos plantes.",
+        },
+    },
+    'upload_photo': {
+        'examples': {
+            'en': ["how do I upload a photo", "how to upload an image of my plant", "how can I analyze my plant",
+                   "where do I upload a picture", "how do I scan a leaf", "what image formats are supported",
+                   "what is the maximum image size"],
+            'hi': ["फोटो कैसे अपलोड करें", "मैं अपने पौधे की तस्वीर कैसे अपलोड करूँ", "छवि कहाँ अपलोड करें",
+                   "पौधे की जाँच कैसे करें", "कौन से इमेज फॉर्मेट समर्थित हैं"],
+            'es': ["cómo subo una foto", "cómo subir una imagen de mi planta", "dónde subo una imagen",
+                   "cómo analizo mi planta", "qué formatos de imagen se admiten"],
+            'fr': ["comment télécharger une photo", "comment envoyer une image de ma plante",
+                   "où télécharger une image", "comment analyser ma plante", "quels formats d'image sont acceptés"],
+        },
+        'answers': {
+            'en': "Open 'Upload Image' in the sidebar, then drop a photo of the affected leaf or click "
+                  "'Choose File'. {formats} images up to {max_size} are supported. The diagnosis and treatment "
+                  "advice appear as soon as the analysis finishes.",
+            'hi': "साइडबार में 'छवि अपलोड करें' खोलें, फिर प्रभावित पत्ती की फोटो डालें या फ़ाइल चुनें। "
+                  "{max_size} तक की {formats} छवियाँ समर्थित हैं। विश्लेषण पूरा होते ही निदान और उपचार सलाह दिखाई देती है।",
+            'es': "Abre 'Subir Imagen' en la barra lateral y suelta una foto de la hoja afectada o haz clic en "
+                  "'Elegir archivo'. Se admiten imágenes {formats} de hasta {max_size}. El diagnóstico y el tratamiento "
+                  "aparecen en cuanto termina el análisis.",
+            'fr': "Ouvrez 'Télécharger Image' dans la barre latérale, puis déposez une photo de la feuille atteinte "
+                  "ou cliquez sur 'Choisir un fichier'. Les images {formats} jusqu'à {max_size} sont acceptées. "
+                  "Le diagnostic et les conseils de traitement s'affichent dès la fin de l'analyse.",
+        },
+    },
+    'view_history': {
+        'examples': {
+            'en': ["where is my history", "where can I see my past analyses", "show my previous scans",
+                   "how do I find my old results", "how do I delete an analysis"],
+            'hi': ["मेरा इतिहास कहाँ है", "पिछले विश्लेषण कहाँ देखें", "पुराने परिणाम कैसे देखें",
+                   "विश्लेषण कैसे हटाएँ"],
+            'es': ["dónde está mi historial", "dónde veo mis análisis anteriores", "cómo encuentro mis resultados antiguos",
+                   "cómo borro un análisis"],
+            'fr': ["où est mon historique", "où voir mes analyses précédentes", "comment retrouver mes anciens résultats",
+                   "comment supprimer une analyse"],
+        },
+        'answers': {
+            'en': "Open 'History' in the sidebar to see all your past analyses, newest first. Click one to see "
+                  "its full diagnosis and treatment advice, or delete it from there.",
+            'hi': "अपने सभी पिछले विश्लेषण देखने के लिए साइडबार में 'इतिहास' खोलें। पूरा निदान और उपचार देखने के लिए "
+                  "किसी पर क्लिक करें, या वहीं से उसे हटाएँ।",
+            'es': "Abre 'Historial' en la barra lateral para ver todos tus análisis anteriores, del más reciente al "
+                  "más antiguo. Haz clic en uno para ver el diagnóstico y el tratamiento, o bórralo desde allí.",
+            'fr': "Ouvrez 'Historique' dans la barre latérale pour voir toutes vos analyses, des plus récentes aux "
+                  "plus anciennes. Cliquez sur l'une d'elles pour voir le diagnostic et le traitement, ou supprimez-la.",
+        },
+    },
+    'analytics': {
+        'examples': {
+            'en': ["where are my statistics", "show my analytics dashboard", "how many plants have I analyzed",
+                   "what is my average confidence"],
+            'hi': ["मेरे आँकड़े कहाँ हैं", "विश्लेषण डैशबोर्ड दिखाएँ", "मैंने कितने पौधों की जाँच की"],
+            'es': ["dónde están mis estadísticas", "muestra mi panel de análisis", "cuántas plantas he analizado"],
+            'fr': ["où sont mes statistiques", "afficher mon tableau de bord", "combien de plantes ai-je analysées"],
+        },
+        'answers': {
+            'en': "Open 'Analytics' in the sidebar. It shows how many images you have analyzed, your average "
+                  "confidence, and how your results are distributed across diseases and severity levels.",
+            'hi': "साइडबार में 'विश्लेषण' खोलें। वहाँ आपके जाँचे गए चित्रों की संख्या, औसत विश्वास स्तर और बीमारियों "
+                  "तथा गंभीरता के अनुसार परिणाम दिखते हैं।",
+            'es': "Abre 'Análisis' en la barra lateral. Muestra cuántas imágenes has analizado, tu confianza media "
+                  "y cómo se reparten tus resultados por enfermedad y gravedad.",
+            'fr': "Ouvrez 'Analyses' dans la barre latérale. Vous y verrez le nombre d'images analysées, la confiance "
+                  "moyenne et la répartition de vos résultats par maladie et par gravité.",
+        },
+    },
+    'languages': {
+        'examples': {
+            'en': ["which languages are supported", "how do I change the language", "can you speak hindi"],
+            'hi': ["कौन सी भाषाएँ समर्थित हैं", "भाषा कैसे बदलें", "क्या आप हिंदी बोल सकते हैं"],
+            'es': ["qué idiomas se admiten", "cómo cambio el idioma", "hablas español"],
+            'fr': ["quelles langues sont disponibles", "comment changer la langue", "parlez-vous français"],
+        },
+        'answers': {
+            'en': "PlantDoc is available in English, हिंदी, Español and Français. Pick your language with the "
+                  "language selector; diagnoses, treatment advice and chat answers follow it.",
+            'hi': "PlantDoc अंग्रेज़ी, हिंदी, स्पैनिश और फ़्रेंच में उपलब्ध है। भाषा चयनकर्ता से अपनी भाषा चुनें; "
+                  "निदान, उपचार सलाह और चैट उत्तर उसी भाषा में मिलेंगे।",
+            'es': "PlantDoc está disponible en inglés, hindi, español y francés. Elige tu idioma con el selector "
+                  "de idioma; los diagnósticos, tratamientos y respuestas del chat lo seguirán.",
+            'fr': "PlantDoc est disponible en anglais, hindi, espagnol et français. Choisissez votre langue avec le "
+                  "sélecteur de langue ; diagnostics, traitements et réponses du chat la suivront.",
+        },
+    },
+    'contact': {
+        'examples': {
+            'en': ["how do I contact support", "I need to talk to someone", "how can I report a problem"],
+            'hi': ["सहायता से कैसे संपर्क करें", "समस्या की शिकायत कैसे करें"],
+            'es': ["cómo contacto con soporte", "cómo informo de un problema"],
+            'fr': ["comment contacter le support", "comment signaler un problème"],
+        },
+        'answers': {
+            'en': "Open 'Contact Us' in the sidebar to reach the PlantDoc team.",
+            'hi': "PlantDoc टीम से संपर्क करने के लिए साइडबार में 'संपर्क करें' खोलें।",
+            'es': "Abre 'Contáctanos' en la barra lateral para escribir al equipo de PlantDoc.",
+            'fr': "Ouvrez 'Nous Contacter' dans la barre latérale pour joindre l'équipe PlantDoc.",
+        },
+    },
+    'account': {
+        'examples': {
+            'en': ["how do I change my name", "how do I edit my profile", "how do I change my email",
+                   "how can I delete my account", "how do I sign out", "where are my account settings"],
+            'hi': ["प्रोफ़ाइल कैसे बदलें", "मेरा नाम कैसे बदलें", "साइन आउट कैसे करें", "खाता कैसे हटाएँ"],
+            'es': ["cómo edito mi perfil", "cómo cambio mi nombre", "cómo cierro sesión", "cómo elimino mi cuenta"],
+            'fr': ["comment modifier mon profil", "comment changer mon nom", "comment me déconnecter",
+                   "comment supprimer mon compte"],
+        },
+        'answers': {
+            'en': "Open 'Profile' in the sidebar to edit your name, email and photo, or to sign out. "
+                  "To close your account, write to the PlantDoc team from 'Contact Us'.",
+            'hi': "अपना नाम, ईमेल और फोटो बदलने या साइन आउट करने के लिए साइडबार में 'प्रोफ़ाइल' खोलें। "
+                  "खाता बंद करने के लिए 'संपर्क करें' से PlantDoc टीम को लिखें।",
+            'es': "Abre 'Perfil' en la barra lateral para editar tu nombre, correo y foto, o para cerrar sesión. "
+                  "Para cerrar tu cuenta, escribe al equipo de PlantDoc desde 'Contáctanos'.",
+            'fr': "Ouvrez 'Profil' dans la barre latérale pour modifier votre nom, votre e-mail et votre photo, "
+                  "ou pour vous déconnecter. Pour fermer votre compte, écrivez à l'équipe PlantDoc depuis "
+                  "'Nous Contacter'.",
+        },
+    },
+    'off_topic': {
+        'examples': {
+            'en': ["what is 2 plus 2", "solve this equation", "tell me a joke", "who won the football match",
+                   "who is the president", "write a python program", "recommend a movie",
+                   "what is the capital of france", "write me a poem about love", "what's the bitcoin price"],
+            'hi': ["मुझे एक चुटकुला सुनाओ", "क्रिकेट मैच किसने जीता", "प्रधानमंत्री कौन है", "एक कविता लिखो",
+                   "गणित का सवाल हल करो", "कोई फिल्म सुझाओ"],
+            'es': ["cuéntame un chiste", "quién ganó el partido", "quién es el presidente", "resuelve esta ecuación",
+                   "escribe un programa en python", "recomiéndame una película"],
+            'fr': ["raconte-moi une blague", "qui a gagné le match", "qui est le président", "résous cette équation",
+                   "écris un programme python", "recommande-moi un film"],
+        },
+        'answers': OFF_TOPIC_ANSWER,
+    },
+    'plant': {
+        # No answers: these always go to Gemini. They keep plant questions
+        # that share words with the intents above from being answered locally.
+        'examples': {
+            'en': ["my tomato leaves have brown spots", "how do I treat powdery mildew", "why are my leaves turning yellow",
+                   "what causes leaf blight", "how often should I water my plant", "is this disease contagious",
+                   "how do I prevent fungus on my plants", "what fertilizer should I use", "my plant is wilting",
+                   "how do I use neem oil", "what does the diagnosis mean", "is my plant healthy",
+                   "how do I get rid of pests on my plant", "how can I kill the bugs on my plant",
+                   "there are aphids on my roses", "my plant has mealybugs", "how do I control whiteflies",
+                   "how do I treat spider mites", "my plant is dying, how can I save it", "why is my plant drooping"],
+            'hi': ["मेरे टमाटर की पत्तियों पर भूरे धब्बे हैं", "पत्तियाँ पीली क्यों हो रही हैं", "इस बीमारी का इलाज कैसे करें",
+                   "पौधे को कितना पानी दें", "फफूंद से कैसे बचाएँ", "कौन सी खाद डालें", "नीम का तेल कैसे इस्तेमाल करें",
+                   "पौधे से कीड़े कैसे हटाएँ", "मेरा पौधा मर रहा है, उसे कैसे बचाएँ"],
+            'es': ["mis hojas de tomate tienen manchas marrones", "por qué se ponen amarillas las hojas",
+                   "cómo trato el oídio", "cada cuánto riego mi planta", "cómo prevengo los hongos", "qué fertilizante uso",
+                   "mi planta se está marchitando", "cómo me deshago de las plagas de mi planta",
+                   "mi planta se está muriendo, cómo la salvo"],
+            'fr': ["mes feuilles de tomate ont des taches brunes", "pourquoi mes feuilles jaunissent",
+                   "comment traiter l'oïdium", "à quelle fréquence arroser ma plante", "comment prévenir les champignons",
+                   "quel engrais utiliser", "ma plante flétrit", "comment éliminer les ravageurs de ma plante",
+                   "ma plante est en train de mourir, comment la sauver"],
+        },
+    },
+}
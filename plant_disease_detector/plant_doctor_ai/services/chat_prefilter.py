@@ -0,0 +1,177 @@
+# plant_doctor_ai/services/chat_prefilter.py
+"""
+A local classification stage in front of the Gemini chat call.
+
+Platform FAQs, greetings and clearly off-topic prompts are recognised with a
+small TF-IDF model over character n-grams of the curated examples in
+services.chat_intents, and answered instantly from their templates. Anything
+else, in particular every plant-health question, still goes to Gemini.
+
+Character n-grams need no tokenizer or stemmer, so one model covers all four
+supported languages, including Devanagari, and tolerates typos and
+inflections. The model is built once per process, in a few milliseconds.
+"""
+
+import math
+import re
+import unicodedata
+from collections import Counter
+
+from django.conf import settings
+
+from ..upload_handlers import IMAGE_FORMATS, megabytes
+from .chat_intents import INTENTS, PLANT_TERMS
+from .gemini_service import normalize_language
+from .metrics import registry, timed
+
+NGRAM_SIZES = (3, 4)
+# \w misses Devanagari vowel signs, so that block is kept explicitly.
+NON_WORD = re.compile(r"[^\w\u0900-\u097F]+")
+
+# Greetings and thanks are only answered locally when they are the whole
+# message ("thanks, and how do I stop the mildew?" goes to Gemini).
+GREETING_MAX_WORDS = 4
+SHORT_INTENTS = {'greeting', 'thanks'}
+
+# Extra score an FAQ match needs when the message mentions PLANT_TERMS.
+PLANT_TERM_PENALTY = 0.25
+
+
+def normalize(text):
+    return NON_WORD.sub(' ', unicodedata.normalize('NFKC', text).lower()).strip()
+
+
+def ngrams(text):
+    """Character n-grams of every word, padded with spaces so word edges count."""
+    counts = Counter()
+    for word in normalize(text).split():
+        padded = f" {word} "
+        for n in NGRAM_SIZES:
+            for start in range(max(1, len(padded) - n + 1)):
+                counts[padded[start:start + n]] += 1
+    return counts
+
+
+class IntentClassifier:
+    """
+    Scores a message against every intent: the cosine similarity between its
+    TF-IDF vector and the closest example of that intent.
+    """
+
+    def __init__(self, intents=INTENTS):
+        examples = [
+            (intent, ngrams(text))
+            for intent, spec in intents.items()
+            for phrases in spec['examples'].values()
+            for text in phrases
+        ]
+        document_frequency = Counter(gram for _, counts in examples for gram in counts)
+        total = len(examples)
+        self.idf = {gram: math.log((1 + total) / (1 + df)) + 1 for gram, df in document_frequency.items()}
+        self.examples = [(intent, self.vector(counts)) for intent, counts in examples]
+
+    def vector(self, counts):
+        weights = {gram: count * self.idf.get(gram, 0.0) for gram, count in counts.items()}
+        norm = math.sqrt(sum(weight * weight for weight in weights.values()))
+        return {gram: weight / norm for gram, weight in weights.items()} if norm else {}
+
+    def scores(self, text):
+        """
+        Returns:
+            dict: The best similarity per intent, e.g. {"upload_photo": 0.71, "plant": 0.12, ...}
+        """
+        query = self.vector(ngrams(text))
+        best = {}
+        for intent, example in self.examples:
+            if len(example) < len(query):
+                score = sum(weight * query.get(gram, 0.0) for gram, weight in example.items())
+            else:
+                score = sum(weight * example.get(gram, 0.0) for gram, weight in query.items())
+            if score > best.get(intent, 0.0):
+                best[intent] = score
+        return best
+
+
+class ChatPrefilter:
+    """
+    Decides whether a chat message can be answered locally.
+
+    A message is answered locally when its best intent has template answers,
+    scores at least CHAT_PREFILTER_THRESHOLD, and beats the 'plant' intent
+    by CHAT_PREFILTER_MARGIN. Messages that mention plant parts or symptoms
+    are never refused as off-topic and need a stronger FAQ match. Everything
+    else goes to Gemini.
+    """
+
+    def __init__(self, intents=INTENTS, plant_terms=PLANT_TERMS):
+        self.intents = intents
+        self.plant_terms = {normalize(term) for terms in plant_terms.values() for term in terms}
+        self._classifier = None
+
+    @property
+    def classifier(self):
+        if self._classifier is None:
+            self._classifier = IntentClassifier(self.intents)
+        return self._classifier
+
+    def classify(self, message):
+        """
+        Returns:
+            tuple: (intent, score) for a message that can be answered locally,
+                   or (None, score of the best intent) otherwise.
+        """
+        scores = self.classifier.scores(message)
+        if not scores:
+            return None, 0.0
+        intent, score = max(scores.items(), key=lambda item: item[1])
+
+        if 'answers' not in self.intents[intent]:
+            return None, score
+        words = normalize(message).split()
+        if intent in SHORT_INTENTS and len(words) > GREETING_MAX_WORDS:
+            return None, score
+
+        threshold = getattr(settings, 'CHAT_PREFILTER_THRESHOLD', 0.5)
+        if self.plant_terms.intersection(words):
+            if intent == 'off_topic':
+                return None, score
+            threshold += PLANT_TERM_PENALTY
+        if score < threshold:
+            return None, score
+        if score - scores.get('plant', 0.0) < getattr(settings, 'CHAT_PREFILTER_MARGIN', 0.1):
+            return None, score
+        return intent, score
+
+    def answer(self, message, language='en'):
+        """
+        Returns the templated answer for a message, or None if it should go
+        to Gemini. Both outcomes are counted in plantdoc_chat_prefilter_total.
+        """
+        if not getattr(settings, 'CHAT_PREFILTER_ENABLED', True):
+            return None
+
+        with timed('plantdoc_chat_prefilter_seconds', 'Time spent classifying a chat message locally.'):
+            intent, score = self.classify(message)
+
+        registry.counter(
+            'plantdoc_chat_prefilter_total', 'Chat messages by pre-filter outcome (an intent, or gemini).',
+            result=intent or 'gemini'
+        ).inc()
+        if intent is None:
+            return None
+        template = self.intents[intent]['answers'][normalize_language(language)]
+        return template.format(**answer_context())
+
+
+def answer_context():
+    """
+    Values for the placeholders in answer templates, read from the settings
+    so the answers match what the upload endpoint actually accepts.
+    """
+    return {
+        'formats': ', '.join(sorted(IMAGE_FORMATS)),
+        'max_size': megabytes(getattr(settings, 'IMAGE_UPLOAD_MAX_BYTES', 10 * 1024 * 1024)),
+    }
+
+
+chat_prefilter = ChatPrefilter()
@@ -0,0 +1,196 @@
+# plant_doctor_ai/services/chat_sessions.py
+"""
+Server-side chat history with a bounded context.
+
+Every turn is stored as two ChatMessage rows. The history sent to Gemini is
+the session's rolling summary (if any) followed by the messages after it.
+When those messages exceed CHAT_CONTEXT_TOKEN_BUDGET, all but the most
+recent CHAT_KEEP_RECENT_MESSAGES are folded into the summary. That takes a
+Gemini call, so it runs on a background thread after the turn is stored.
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.functional import SimpleLazyObject
+
+from ..models import ChatMessage, ChatSession
+from .metrics import registry
+from .providers import gemini_service, lazy_service
+
+SUMMARY_PREAMBLE = "Summary of our conversation so far: "
+SUMMARY_ACKNOWLEDGEMENT = "Understood. I will keep that in mind."
+
+
+def estimate_tokens(text):
+    """A rough token count (about 4 characters per token), good enough for budgeting."""
+    return max(1, (len(text) + 3) // 4)
+
+
+def context_budget():
+    return getattr(settings, 'CHAT_CONTEXT_TOKEN_BUDGET', 3000)
+
+
+def get_session(user, session_id):
+    """Returns the user's session with that id, or None."""
+    return ChatSession.objects.filter(user=user, id=session_id).first()
+
+
+def recent_messages(session):
+    """The messages not yet folded into the summary, oldest first."""
+    return list(session.messages.filter(id__gt=session.summarized_until).order_by('id'))
+
+
+def build_history(session):
+    """
+    The chat history to send to Gemini for the next message, in the
+    {"role", "parts"} format: the summary as an opening exchange, then the
+    recent messages verbatim.
+    """
+    history = []
+    if session.summary:
+        history.append({"role": "user", "parts": [{"text": SUMMARY_PREAMBLE + session.summary}]})
+        history.append({"role": "model", "parts": [{"text": SUMMARY_ACKNOWLEDGEMENT}]})
+    history.extend(message.as_history_item() for message in recent_messages(session))
+    return history
+
+
+def trim_history(history, max_messages):
+    """
+    The newest `max_messages` items of a history sent by the client, for
+    clients that resend the whole conversation. The result starts with a
+    user message, as a Gemini chat history must.
+    """
+    trimmed = history[-max_messages:] if max_messages > 0 else []
+    while trimmed and trimmed[0]['role'] != 'user':
+        trimmed = trimmed[1:]
+    if len(trimmed) < len(history):
+        registry.counter(
+            'plantdoc_chat_history_trimmed_total', 'Client-sent chat histories cut down to their newest messages.'
+        ).inc()
+    return trimmed
+
+
+def append_turn(session, user_text, model_text):
+    """
+    Stores one exchange. If the session is now over budget, it is compacted
+    in the background; until then Gemini gets a somewhat longer context.
+    """
+    messages = [
+        ChatMessage(session=session, role=ChatMessage.Role.USER, text=user_text, tokens=estimate_tokens(user_text)),
+        ChatMessage(session=session, role=ChatMessage.Role.MODEL, text=model_text, tokens=estimate_tokens(model_text)),
+    ]
+    tokens = sum(message.tokens for message in messages)
+    with transaction.atomic():
+        ChatMessage.objects.bulk_create(messages)
+        ChatSession.objects.filter(id=session.id).update(
+            context_tokens=F('context_tokens') + tokens,
+            message_count=F('message_count') + len(messages),
+            updated_at=timezone.now(),
+        )
+    session.refresh_from_db(fields=['context_tokens', 'message_count', 'updated_at'])
+
+    if session.context_tokens > context_budget():
+        schedule_compaction(session.id)
+    return messages
+
+
+def _build_compaction_executor():
+    return ThreadPoolExecutor(
+        max_workers=getattr(settings, 'CHAT_COMPACTION_WORKERS', 2), thread_name_prefix='chat-compaction'
+    )
+
+
+compaction_executor = SimpleLazyObject(lazy_service(_build_compaction_executor))
+_compacting = set()
+_compacting_lock = threading.Lock()
+
+
+def schedule_compaction(session_id):
+    """
+    Compacts a session on a background thread, unless that is already
+    queued in this process.
+
+    Returns:
+        Future or None: The queued compaction, or None if one was pending.
+    """
+    with _compacting_lock:
+        if session_id in _compacting:
+            return None
+        _compacting.add(session_id)
+    return compaction_executor.submit(_compact_in_background, session_id)
+
+
+def _compact_in_background(session_id):
+    close_old_connections()
+    try:
+        session = ChatSession.objects.filter(id=session_id).first()
+        if session is not None and session.context_tokens > context_budget():
+            return compact(session)
+        return 0
+    except Exception as e:
+        print(f"Error compacting chat session {session_id}: {e}")
+        return 0
+    finally:
+        close_old_connections()
+        with _compacting_lock:
+            _compacting.discard(session_id)
+
+
+def local_summary(summary, messages, max_tokens):
+    """
+    Used when Gemini cannot summarize: appends the first sentence of each
+    message to the summary and keeps the most recent part that fits.
+    """
+    lines = [summary] if summary else []
+    lines += [f"{message.role}: {message.text.split('. ')[0][:200]}" for message in messages]
+    text = "\n".join(lines)
+    return text[-max_tokens * 4:]
+
+
+def compact(session):
+    """
+    Folds all but the most recent messages into the session summary.
+
+    Turns stored while the summary is being written are kept: the session
+    is updated only if no other compaction got there first, and its token
+    count is reduced by the folded messages rather than overwritten.
+
+    Returns:
+        int: The number of messages folded (0 if there was nothing to fold).
+    """
+    keep = getattr(settings, 'CHAT_KEEP_RECENT_MESSAGES', 6)
+    max_tokens = getattr(settings, 'CHAT_SUMMARY_MAX_TOKENS', 400)
+
+    messages = recent_messages(session)
+    cut = max(0, len(messages) - keep)
+    # The kept messages follow the summary acknowledgement (a model turn),
+    # so they must start with a user turn: with an odd `keep`, keep one more.
+    while 0 < cut < len(messages) and messages[cut].role != ChatMessage.Role.USER:
+        cut -= 1
+    folded = messages[:cut]
+    if not folded:
+        return 0
+
+    try:
+        summary = gemini_service.summarize_chat(session.summary, folded, max_words=max_tokens * 3 // 4)
+    except Exception as e:
+        print(f"Error summarizing chat session {session.id}: {e}")
+        summary = local_summary(session.summary, folded, max_tokens)
+    summary = summary[:max_tokens * 4]
+
+    updated = ChatSession.objects.filter(id=session.id, summarized_until=session.summarized_until).update(
+        summary=summary,
+        summarized_until=folded[-1].id,
+        context_tokens=F('context_tokens') - sum(message.tokens for message in folded),
+        updated_at=timezone.now(),
+    )
+    if not updated:
+        return 0
+    session.refresh_from_db(fields=['summary', 'summarized_until', 'context_tokens', 'updated_at'])
+    registry.counter('plantdoc_chat_compactions_total', 'Chat sessions whose older turns were summarized.').inc()
+    return len(folded)
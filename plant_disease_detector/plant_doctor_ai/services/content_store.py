@@ -0,0 +1,265 @@
+# plant_doctor_ai/services/content_store.py
+"""
+Content-addressed storage for uploaded images and memoized predictions.
+
+Every upload is identified by the SHA-256 of its bytes. Identical uploads
+share a single ImageBlob (and file on disk), and the model's prediction for
+a blob is memoized per model version, so a repeat upload skips both the
+storage write and inference.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from PIL import Image
+
+from ..models import AnalysisResult, ImageBlob, PredictionMemo
+from .derivatives import FORMATS, VARIANTS, derivative_name, queue_derivatives
+from .metrics import registry
+from .preprocessing import ImageDecodeError, decode_image
+
+DHASH_SIZE = 8
+
+# Two perceptual hashes at most this many bits apart count as the same photo.
+# The hash is split into PERCEPTUAL_HASH_MAX_DISTANCE + 1 bands; two hashes
+# within that distance must agree exactly on at least one band, so candidates
+# can be found with plain equality lookups on the indexed ImageBlob.hash_band*
+# columns (one per band).
+PERCEPTUAL_HASH_MAX_DISTANCE = 3
+PERCEPTUAL_HASH_BANDS = PERCEPTUAL_HASH_MAX_DISTANCE + 1
+
+
+def content_hash(image_file):
+    """
+    Returns the SHA-256 hex digest of an uploaded file.
+
+    The hashing upload handlers compute this while the request body streams
+    in; files that did not go through them are hashed here in chunks.
+    """
+    digest = getattr(image_file, 'sha256', None)
+    if digest:
+        return digest
+
+    hasher = hashlib.sha256()
+    for chunk in image_file.chunks():
+        hasher.update(chunk)
+    image_file.seek(0)
+    image_file.sha256 = hasher.hexdigest()
+    return image_file.sha256
+
+
+def perceptual_hash(image_file):
+    """
+    Computes a 64-bit difference hash (dHash) as 16 hex characters.
+
+    The image is shrunk to a 9x8 grayscale thumbnail and each bit records
+    whether a pixel is brighter than its right-hand neighbour. Re-encoded,
+    resized or lightly recompressed copies of a photo hash to the same value.
+    """
+    try:
+        image = Image.open(image_file)
+        image.draft('L', (DHASH_SIZE * 8, DHASH_SIZE * 8))
+        pixels = list(image.convert('L').resize((DHASH_SIZE + 1, DHASH_SIZE), Image.BILINEAR).getdata())
+    except (OSError, SyntaxError, ValueError, Image.DecompressionBombError) as e:
+        raise ImageDecodeError(f"'{getattr(image_file, 'name', image_file)}' could not be decoded: {e}") from e
+    finally:
+        image_file.seek(0)
+
+    bits = 0
+    for row in range(DHASH_SIZE):
+        for col in range(DHASH_SIZE):
+            left = pixels[row * (DHASH_SIZE + 1) + col]
+            right = pixels[row * (DHASH_SIZE + 1) + col + 1]
+            bits = (bits << 1) | (left > right)
+    return f"{bits:016x}"
+
+
+def set_perceptual_hash(blob, value):
+    """Sets a blob's perceptual hash and its band columns (does not save)."""
+    band_width = len(value) // PERCEPTUAL_HASH_BANDS
+    blob.perceptual_hash = value
+    for band in range(PERCEPTUAL_HASH_BANDS):
+        setattr(blob, f'hash_band{band}', value[band * band_width:(band + 1) * band_width])
+
+
+def similar_blobs(blob):
+    """Returns the sha256 of other blobs whose perceptual hash is near this one's."""
+    if not blob.perceptual_hash:
+        return []
+
+    # Each band lookup is an index scan; the exact distance is checked below.
+    bands = Q()
+    for band in range(PERCEPTUAL_HASH_BANDS):
+        field = f'hash_band{band}'
+        bands |= Q(**{field: getattr(blob, field)})
+
+    candidates = ImageBlob.objects.exclude(pk=blob.pk).exclude(perceptual_hash='').filter(
+        bands
+    ).values_list('sha256', 'perceptual_hash')
+
+    target = int(blob.perceptual_hash, 16)
+    return [
+        sha256 for sha256, phash in candidates
+        if bin(target ^ int(phash, 16)).count('1') <= PERCEPTUAL_HASH_MAX_DISTANCE
+    ]
+
+
+def store_blob(image_file):
+    """
+    Returns the ImageBlob for an upload, writing the file to storage (and
+    queueing its thumbnail/preview derivatives) only if these exact bytes
+    have not been stored before.
+    """
+    digest = content_hash(image_file)
+    use_perceptual_hash = getattr(settings, 'IMAGE_DEDUPE_PERCEPTUAL_HASH', False)
+    blob = ImageBlob.objects.filter(sha256=digest).first()
+    if blob is not None:
+        # Blobs stored before perceptual hashing was enabled get one now.
+        if use_perceptual_hash and not blob.perceptual_hash:
+            set_perceptual_hash(blob, perceptual_hash(image_file))
+            blob.save(update_fields=['perceptual_hash'] + [f'hash_band{band}' for band in range(PERCEPTUAL_HASH_BANDS)])
+        return blob
+
+    blob = ImageBlob(sha256=digest, size=image_file.size)
+    if use_perceptual_hash:
+        set_perceptual_hash(blob, perceptual_hash(image_file))
+    blob.file.save(image_file.name, image_file, save=False)
+
+    try:
+        with transaction.atomic():
+            blob.save()
+    except IntegrityError:
+        # A concurrent request stored the same bytes first; keep theirs.
+        blob.file.delete(save=False)
+        return ImageBlob.objects.get(sha256=digest)
+
+    if getattr(settings, 'IMAGE_DERIVATIVES_ON_INGEST', True):
+        queue_derivatives(blob.file.name, blob.file.storage)
+    return blob
+
+
+def discard_blob(blob):
+    """
+    Deletes a blob, with its file and any derivatives, unless an analysis or
+    a memoized prediction refers to it. Used for uploads that were stored
+    but then turned out not to decode.
+    """
+    if (AnalysisResult.objects.filter(image=blob.file.name).exists()
+            or PredictionMemo.objects.filter(sha256=blob.sha256).exists()):
+        return False
+    storage = blob.file.storage
+    for variant in VARIANTS:
+        for fmt in FORMATS:
+            name = derivative_name(blob.file.name, variant, fmt)
+            if storage.exists(name):
+                storage.delete(name)
+    blob.file.delete(save=False)
+    blob.delete()
+    return True
+
+
+def discard_undecodable(blob, image_file):
+    """
+    Discards the blob of an upload that does not decode (see discard_blob).
+
+    Returns:
+        bool: Whether the upload failed to decode.
+    """
+    try:
+        decode_image(image_file)
+    except ImageDecodeError:
+        discard_blob(blob)
+        return True
+    finally:
+        image_file.seek(0)
+    return False
+
+
+class PredictionMemoCache:
+    """
+    (sha256, model version) -> prediction, as an in-process LRU in front of
+    the PredictionMemo table.
+
+    Keying on the model version means that deploying new weights or
+    switching MODEL_BACKEND never serves a prediction from the old model.
+    """
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def capacity(self):
+        return getattr(settings, 'PREDICTION_MEMO_LRU_SIZE', 2048)
+
+    def _count(self, result):
+        registry.counter(
+            'plantdoc_prediction_memo_lookups_total', 'Prediction memo lookups.', result=result
+        ).inc()
+
+    def _remember_locally(self, key, prediction):
+        with self._lock:
+            self._entries[key] = prediction
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+
+    def get(self, blob, model_version):
+        """
+        Returns the memoized prediction for a blob, or None on a miss.
+
+        With IMAGE_DEDUPE_PERCEPTUAL_HASH enabled, a prediction for another
+        blob with a near-identical perceptual hash counts as a hit.
+        """
+        key = (blob.sha256, model_version)
+        with self._lock:
+            prediction = self._entries.get(key)
+            if prediction is not None:
+                self._entries.move_to_end(key)
+        if prediction is not None:
+            self._count('hit')
+            return dict(prediction)
+
+        memo = PredictionMemo.objects.filter(sha256=blob.sha256, model_version=model_version).first()
+        if memo is None and blob.perceptual_hash and getattr(settings, 'IMAGE_DEDUPE_PERCEPTUAL_HASH', False):
+            memo = PredictionMemo.objects.filter(
+                sha256__in=similar_blobs(blob), model_version=model_version
+            ).first()
+        if memo is None:
+            self._count('miss')
+            return None
+
+        self._count('hit')
+        prediction = memo.as_prediction()
+        self._remember_locally(key, prediction)
+        return dict(prediction)
+
+    def set(self, blob, model_version, prediction):
+        # One INSERT ... ON CONFLICT DO UPDATE. Reading first and writing
+        # afterwards (update_or_create) makes concurrent SQLite transactions
+        # fail with "database is locked" when they upgrade to a write lock.
+        PredictionMemo.objects.bulk_create(
+            [PredictionMemo(
+                sha256=blob.sha256,
+                model_version=model_version,
+                disease_name=prediction['disease'],
+                confidence=prediction['confidence'],
+                top_predictions=prediction.get('top_k', []),
+            )],
+            update_conflicts=True,
+            unique_fields=['sha256', 'model_version'],
+            update_fields=['disease_name', 'confidence', 'top_predictions'],
+        )
+        self._remember_locally((blob.sha256, model_version), dict(prediction))
+
+    def clear(self):
+        """Drops the in-process entries (the table is left untouched)."""
+        with self._lock:
+            self._entries.clear()
+
+
+prediction_memo = PredictionMemoCache()
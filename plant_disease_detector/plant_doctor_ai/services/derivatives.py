@@ -0,0 +1,148 @@
+# plant_doctor_ai/services/derivatives.py
+"""
+Downscaled copies of analysis images for the history grid and previews.
+
+Every stored image gets a small thumbnail and a medium preview, each as
+JPEG and WebP, under analyses/derivatives/. They are generated on a
+background thread after ingest, or by `manage.py generate_derivatives`
+for images that predate this, and then served from storage like any other
+media file. Only PIL is used, so the backfill command can run this in
+worker processes that never import torch.
+"""
+
+import io
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.utils.functional import SimpleLazyObject
+from PIL import Image, ImageOps
+
+from .providers import lazy_service
+
+DERIVATIVES_DIR = 'analyses/derivatives'
+
+# Variant name -> longest side in pixels.
+VARIANTS = {
+    'thumb': 256,
+    'preview': 1024,
+}
+
+# Format name -> (file extension, PIL save options).
+FORMATS = {
+    'jpeg': ('.jpg', {'format': 'JPEG', 'quality': 85, 'optimize': True, 'progressive': True}),
+    'webp': ('.webp', {'format': 'WEBP', 'quality': 80, 'method': 4}),
+}
+
+
+def derivative_name(source_name, variant, fmt):
+    """
+    Storage name of one derivative, e.g. for 'analyses/blobs/2c/7d/2c7d...jpg':
+    'analyses/derivatives/thumb/blobs/2c/7d/2c7d....webp'
+    """
+    stem = os.path.splitext(source_name)[0]
+    if stem.startswith('analyses/'):
+        stem = stem[len('analyses/'):]
+    return f"{DERIVATIVES_DIR}/{variant}/{stem}{FORMATS[fmt][0]}"
+
+
+def is_derivative(name):
+    return name.startswith(DERIVATIVES_DIR + '/')
+
+
+def generate_derivatives(source_name, storage=default_storage, force=False):
+    """
+    Writes every missing variant/format of a stored image.
+
+    The source is decoded once, at a reduced JPEG scale where possible,
+    and the thumbnail is made from the preview rather than the original.
+
+    Args:
+        source_name: Storage name of the original image.
+        force: Regenerate derivatives that already exist.
+
+    Returns:
+        int: The number of files written.
+    """
+    wanted = [
+        (variant, fmt) for variant in VARIANTS for fmt in FORMATS
+        if force or not storage.exists(derivative_name(source_name, variant, fmt))
+    ]
+    if not wanted:
+        return 0
+
+    largest = max(VARIANTS.values())
+    with storage.open(source_name, 'rb') as source:
+        image = Image.open(source)
+        image.draft('RGB', (largest, largest))
+        image = ImageOps.exif_transpose(image).convert('RGB')
+
+    written = 0
+    # Largest variant first, so each smaller one is resized from the previous.
+    for variant, size in sorted(VARIANTS.items(), key=lambda item: -item[1]):
+        image.thumbnail((size, size), Image.LANCZOS)
+        for fmt, (_, save_options) in FORMATS.items():
+            if (variant, fmt) not in wanted:
+                continue
+            name = derivative_name(source_name, variant, fmt)
+            buffer = io.BytesIO()
+            image.save(buffer, **save_options)
+            if storage.exists(name):
+                storage.delete(name)
+            storage.save(name, ContentFile(buffer.getvalue()))
+            written += 1
+    return written
+
+
+def generate_logged(source_name, storage=default_storage):
+    """generate_derivatives() for a background thread: failures are logged, not raised."""
+    try:
+        generate_derivatives(source_name, storage)
+    except (OSError, ValueError) as e:
+        # Not fatal: the image is served without derivatives until the
+        # backfill command creates them.
+        print(f"Could not generate derivatives for {source_name}: {e}")
+
+
+def _build_derivative_executor():
+    return ThreadPoolExecutor(
+        max_workers=getattr(settings, 'IMAGE_DERIVATIVE_WORKERS', 1), thread_name_prefix='image-derivatives'
+    )
+
+
+derivative_executor = SimpleLazyObject(lazy_service(_build_derivative_executor))
+
+
+def queue_derivatives(source_name, storage=default_storage):
+    """
+    Generates the derivatives of a newly stored image on a background
+    thread, so the upload that stored it does not wait for the resizing.
+    """
+    derivative_executor.submit(generate_logged, source_name, storage)
+
+
+def derivative_urls(image_field, request=None):
+    """
+    Returns {variant: {format: url}} for an image field, or an empty dict
+    if its derivatives have not been generated (yet). Nothing is generated
+    here: this runs for every row of a history page.
+    """
+    if not image_field:
+        return {}
+
+    source_name = image_field.name
+    storage = image_field.storage
+    # One existence check per image: the small WebP thumbnail is written last.
+    if not storage.exists(derivative_name(source_name, 'thumb', 'webp')):
+        return {}
+
+    def url(name):
+        url = storage.url(name)
+        return request.build_absolute_uri(url) if request is not None else url
+
+    return {
+        variant: {fmt: url(derivative_name(source_name, variant, fmt)) for fmt in FORMATS}
+        for variant in VARIANTS
+    }
@@ -0,0 +1,130 @@
+# plant_doctor_ai/services/enrichment.py
+"""
+Background treatment enrichment.
+
+In background mode, analyze responses return as soon as the model has
+answered: the AnalysisResult is saved with enrichment_status 'pending' and
+its treatment fields are filled in afterwards by a small in-process thread
+pool, which goes through the treatment cache like the inline path does.
+Clients poll analysis/<id>/ or subscribe to it as an event stream.
+
+Jobs live in process memory only. Analyses left pending by a restart are
+picked up again by `manage.py enrich_pending_analyses`.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils.functional import SimpleLazyObject
+
+from ..models import AnalysisResult
+from .gemini_service import FALLBACK_TREATMENT_INFO, normalize_language
+from .metrics import registry
+from .providers import lazy_service
+from .treatment_cache import treatment_cache
+
+ENRICHMENT_MODES = ('inline', 'background')
+
+
+def enrichment_mode(requested=None):
+    """
+    The enrichment mode of a request: `requested` (e.g. from ?enrichment=)
+    if it is a known mode, the TREATMENT_ENRICHMENT_MODE setting otherwise.
+    """
+    if requested in ENRICHMENT_MODES:
+        return requested
+    return getattr(settings, 'TREATMENT_ENRICHMENT_MODE', 'inline')
+
+
+def apply_treatment(analysis_ids, treatment_info):
+    """
+    Writes treatment info to pending analyses.
+
+    Returns:
+        str: The enrichment status that was set.
+    """
+    failed = treatment_info.get('recommended_treatment') == FALLBACK_TREATMENT_INFO['recommended_treatment']
+    status = AnalysisResult.EnrichmentStatus.FAILED if failed else AnalysisResult.EnrichmentStatus.COMPLETE
+    AnalysisResult.objects.filter(
+        pk__in=analysis_ids, enrichment_status=AnalysisResult.EnrichmentStatus.PENDING
+    ).update(
+        recommended_treatment=treatment_info.get('recommended_treatment', 'N/A'),
+        prevention_tips=treatment_info.get('prevention_tips', []),
+        expected_recovery_time=treatment_info.get('expected_recovery_time', 'Varies'),
+        enrichment_status=status,
+    )
+    return status
+
+
+class EnrichmentQueue:
+    """
+    Fills in the treatment of pending analyses on a bounded thread pool.
+
+    One job covers every analysis of one (disease, language) pair from the
+    same request, and concurrent jobs for the same pair share one Gemini
+    call through the treatment cache's single-flight.
+    """
+
+    def __init__(self, max_workers):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='treatment-enrichment')
+        self._lock = threading.Lock()
+        self._pending = {}
+
+        self.depth_gauge = registry.gauge(
+            'plantdoc_enrichment_queue_depth', 'Analyses waiting for, or undergoing, background enrichment.'
+        )
+        self.latency = registry.histogram(
+            'plantdoc_enrichment_seconds', description='Time from queueing an analysis to its treatment being saved.'
+        )
+
+    def submit(self, analysis_ids, disease_name, language):
+        """Queues the enrichment of analyses that were saved as pending."""
+        events = {analysis_id: threading.Event() for analysis_id in analysis_ids}
+        with self._lock:
+            self._pending.update(events)
+            self.depth_gauge.set(len(self._pending))
+        self.executor.submit(self.enrich, list(events), disease_name, normalize_language(language), time.perf_counter())
+
+    def enrich(self, analysis_ids, disease_name, language, queued_at):
+        close_old_connections()
+        try:
+            treatment_info = treatment_cache.get_treatment_info(disease_name, language=language)
+            result = apply_treatment(analysis_ids, treatment_info)
+        except Exception as e:
+            print(f"Error enriching analyses {analysis_ids}: {e}")
+            result = 'error'
+        finally:
+            close_old_connections()
+            with self._lock:
+                events = [self._pending.pop(analysis_id, None) for analysis_id in analysis_ids]
+                self.depth_gauge.set(len(self._pending))
+            for event in events:
+                if event is not None:
+                    event.set()
+
+        self.latency.observe(time.perf_counter() - queued_at)
+        registry.counter(
+            'plantdoc_enrichments_total', 'Background enrichment jobs by outcome.', result=result
+        ).inc()
+
+    def wait(self, analysis_id, timeout):
+        """
+        Waits up to `timeout` seconds for an analysis queued in this process
+        to be enriched. Analyses queued elsewhere (e.g. by another worker
+        process) cannot be observed, so this simply sleeps for them.
+        """
+        event = self._pending.get(analysis_id)
+        if event is None:
+            time.sleep(timeout)
+        else:
+            event.wait(timeout)
+
+
+def _build_enrichment_queue():
+    return EnrichmentQueue(max_workers=getattr(settings, 'TREATMENT_ENRICHMENT_WORKERS', 4))
+
+
+enrichment_queue = SimpleLazyObject(lazy_service(_build_enrichment_queue))
@@ -0,0 +1,144 @@
+# plant_doctor_ai/services/fake_gemini.py
+
+import asyncio
+import random
+import threading
+import time
+
+from .gemini_service import (
+    normalize_language, gemini_policy, record_fallback, CHAT_ERROR_MESSAGE, FALLBACK_TREATMENT_INFO
+)
+
+
+class FakeGeminiError(ConnectionError):
+    """An injected, transient upstream failure."""
+
+
+class FakeGeminiService:
+    """
+    A local stand-in for GeminiService that never touches the network.
+
+    It returns canned answers after a configurable delay, which makes it
+    possible to measure how the request path behaves under LLM latency
+    without an API key.
+
+    Calls go through the same timeout / retry / circuit breaker policy as
+    the real client. A fraction `error_rate` of attempts fails with
+    FakeGeminiError, and an attempt whose latency exceeds its timeout fails
+    with TimeoutError once the timeout has passed, so degraded upstreams can
+    be simulated too.
+    """
+
+    def __init__(self, latency_ms=0, error_rate=0.0, seed=None, policy=None):
+        self.latency = latency_ms / 1000.0
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.policy = policy or gemini_policy()
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def _attempt(self, timeout):
+        """Counts an upstream attempt; returns how long it takes, or raises an injected error."""
+        with self._lock:
+            self.calls += 1
+            failing = self.error_rate and self.random.random() < self.error_rate
+        if failing:
+            raise FakeGeminiError("Injected Gemini failure.")
+        return min(self.latency, timeout)
+
+    def _wait(self, timeout):
+        delay = self._attempt(timeout)
+        if delay:
+            time.sleep(delay)
+        if self.latency > timeout:
+            raise TimeoutError(f"Gemini did not answer within {timeout:.1f}s.")
+
+    async def _await(self, timeout):
+        delay = self._attempt(timeout)
+        if delay:
+            await asyncio.sleep(delay)
+        if self.latency > timeout:
+            raise TimeoutError(f"Gemini did not answer within {timeout:.1f}s.")
+
+    def _treatment(self, disease_name, language):
+        language = normalize_language(language)
+        return {
+            "recommended_treatment": f"[{language}] Remove affected leaves and treat {disease_name} with a suitable fungicide.",
+            "prevention_tips": [
+                "Maintain proper air circulation around plants.",
+                "Water at the soil level, not on the leaves.",
+            ],
+        }
+
+    def _answer(self, new_message, language):
+        return f"[{normalize_language(language)}] Thanks for your question about: {new_message}"
+
+    def _generate_treatment(self, disease_name, language, timeout):
+        self._wait(timeout)
+        return self._treatment(disease_name, language)
+
+    async def _agenerate_treatment(self, disease_name, language, timeout):
+        await self._await(timeout)
+        return self._treatment(disease_name, language)
+
+    def _send_chat(self, new_message, language, timeout):
+        self._wait(timeout)
+        return self._answer(new_message, language)
+
+    async def _asend_chat(self, new_message, language, timeout):
+        await self._await(timeout)
+        return self._answer(new_message, language)
+
+    def fetch_treatment_info(self, disease_name, language='en'):
+        return self.policy.call('treatment', self._generate_treatment, disease_name, language)
+
+    async def afetch_treatment_info(self, disease_name, language='en'):
+        return await self.policy.acall('treatment', self._agenerate_treatment, disease_name, language)
+
+    def get_treatment_info(self, disease_name, language='en'):
+        try:
+            return self.fetch_treatment_info(disease_name, language=language)
+        except Exception:
+            record_fallback('treatment')
+            return dict(FALLBACK_TREATMENT_INFO)
+
+    async def aget_treatment_info(self, disease_name, language='en'):
+        try:
+            return await self.afetch_treatment_info(disease_name, language=language)
+        except Exception:
+            record_fallback('treatment')
+            return dict(FALLBACK_TREATMENT_INFO)
+
+    def process_chat(self, history, new_message, language='en'):
+        try:
+            return self.policy.call('chat', self._send_chat, new_message, language)
+        except Exception:
+            record_fallback('chat')
+            return CHAT_ERROR_MESSAGE
+
+    def _generate_summary(self, summary, messages, max_words, timeout):
+        self._wait(timeout)
+        # Keeps the most recent words, which is enough to exercise compaction.
+        transcript = " ".join([summary] + [f"{message.role}: {message.text}" for message in messages])
+        return " ".join(transcript.split()[-max_words:])
+
+    def summarize_chat(self, summary, messages, max_words=300):
+        return self.policy.call('summary', self._generate_summary, summary, messages, max_words)
+
+    def stream_chat(self, history, new_message, language='en'):
+        # The configured latency is spread over the words of the answer, so
+        # the first chunk arrives long before the whole answer would.
+        with self.policy.guard('chat_stream') as timeout:
+            self._attempt(timeout)
+            words = self._answer(new_message, language).split(' ')
+            for index, word in enumerate(words):
+                if self.latency:
+                    time.sleep(self.latency / len(words))
+                yield word if index == 0 else ' ' + word
+
+    async def aprocess_chat(self, history, new_message, language='en'):
+        try:
+            return await self.policy.acall('chat', self._asend_chat, new_message, language)
+        except Exception:
+            record_fallback('chat')
+            return CHAT_ERROR_MESSAGE
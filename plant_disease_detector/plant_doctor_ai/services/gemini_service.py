@@ -1,7 +1,12 @@
 # plant_doctor_ai/services/gemini_service.py
 import os
-import google.generativeai as genai
 import json
+from contextlib import contextmanager
+
+from django.conf import settings
+
+from .metrics import registry, timed
+from .resilience import CallPolicy, CircuitBreaker
 
 CHATBOT_SYSTEM_PROMPT = """
 You are "PlantDoc Assistant," an AI specialized in plant health, diseases, and treatments.
@@ -26,21 +31,123 @@ TONE:
 - Professional, helpful, and encouraging.
 """
 
+SUPPORTED_LANGUAGES = ['en', 'hi', 'es', 'fr']
+
+FALLBACK_TREATMENT_INFO = {
+    "recommended_treatment": "Could not retrieve treatment information at this time. Please consult a local gardening expert.",
+    "prevention_tips": ["Ensure your plant has adequate light, water, and nutrients to build its natural defenses."]
+}
+
+CHAT_ERROR_MESSAGE = "I'm sorry, I encountered an error. Please try asking again later."
+
+SUMMARY_PROMPT = """
+Update the running summary of a conversation between a user and PlantDoc Assistant.
+Keep the plants, diseases, symptoms, treatments and user details that later answers may need.
+Write at most {max_words} words, in plain prose, in the language of the conversation.
+
+Current summary:
+{summary}
+
+New messages:
+{transcript}
+"""
+
+
+@contextmanager
+def gemini_call(operation):
+    """
+    Counts and times one Gemini API call; exceptions are counted as errors
+    and re-raised.
+
+    Args:
+        operation: 'treatment', 'chat' or 'chat_stream'.
+    """
+    registry.counter(
+        'plantdoc_gemini_requests_total', 'Gemini API calls.', operation=operation
+    ).inc()
+    try:
+        with timed('plantdoc_gemini_request_seconds', 'Gemini API call duration.', operation=operation):
+            yield
+    except Exception:
+        registry.counter(
+            'plantdoc_gemini_errors_total', 'Gemini API calls that raised.', operation=operation
+        ).inc()
+        raise
+
+
+def record_fallback(operation):
+    """Counts a response that was replaced by the canned fallback text."""
+    registry.counter(
+        'plantdoc_gemini_fallbacks_total', 'Responses served from the fallback text after a Gemini error.',
+        operation=operation
+    ).inc()
+
+def is_transient_error(exc):
+    """
+    True for errors worth retrying: timeouts, connection problems and the
+    API's overload / unavailable responses. Bad answers (e.g. invalid JSON)
+    are not retried.
+    """
+    if isinstance(exc, (TimeoutError, ConnectionError)):
+        return True
+    try:
+        from google.api_core import exceptions as api_exceptions
+    except ImportError:
+        return False
+    return isinstance(exc, (
+        api_exceptions.DeadlineExceeded,
+        api_exceptions.ServiceUnavailable,
+        api_exceptions.TooManyRequests,
+        api_exceptions.InternalServerError,
+    ))
+
+
+def gemini_policy():
+    """The timeout, retry and circuit breaker policy for Gemini calls, from settings."""
+    return CallPolicy(
+        'gemini',
+        CircuitBreaker(
+            'gemini',
+            failure_threshold=getattr(settings, 'GEMINI_CIRCUIT_FAILURE_THRESHOLD', 5),
+            reset_timeout=getattr(settings, 'GEMINI_CIRCUIT_RESET_SECONDS', 30),
+        ),
+        timeout=getattr(settings, 'GEMINI_TIMEOUT_SECONDS', 15),
+        deadline=getattr(settings, 'GEMINI_DEADLINE_SECONDS', 30),
+        max_retries=getattr(settings, 'GEMINI_MAX_RETRIES', 2),
+        base_delay=getattr(settings, 'GEMINI_RETRY_BASE_DELAY_MS', 250) / 1000.0,
+        max_delay=getattr(settings, 'GEMINI_RETRY_MAX_DELAY_MS', 2000) / 1000.0,
+        is_retryable=is_transient_error,
+        instrument=gemini_call,
+    )
+
+def normalize_language(language):
+    """
+    Maps a 'Language' header value onto one of the supported language codes.
+    Anything missing or unsupported falls back to English.
+    """
+    code = (language or 'en').split('-')[0].strip().lower()
+    return code if code in SUPPORTED_LANGUAGES else 'en'
+
 class GeminiService:
     def __init__(self):
         api_key = os.getenv('GEMINI_API_KEY')
         if not api_key:
             raise ValueError("GEMINI_API_KEY not found in environment variables.")
+
+        # Imported here rather than at module level so that importing this
+        # module (e.g. for its constants) does not pull in the gRPC stack.
+        import google.generativeai as genai
         genai.configure(api_key=api_key)
         self.model = genai.GenerativeModel(
             'models/gemini-2.5-pro',
             system_instruction=CHATBOT_SYSTEM_PROMPT
         )
         self.structured_model = genai.GenerativeModel('models/gemini-2.5-pro')
+        self.policy = gemini_policy()
         print("✅ Gemini Service initialized.")
 
-    def get_treatment_info(self, disease_name, language='en'):
-        prompt = f"""
+    def _treatment_prompt(self, disease_name, language):
+        return f"""
         You are an expert botanist and plant pathologist named PlantDoc.
         A plant has been diagnosed with: "{disease_name}".
 
@@ -70,24 +177,112 @@ class GeminiService:
         And You have to generate the response in {language}.
         """
 
+    def _parse_treatment(self, response):
+        cleaned_text = response.text.strip().replace('```json', '').replace('```', '').strip()
+        return json.loads(cleaned_text)
+
+    def _chat_message(self, new_message, language):
+        return new_message + f"You have to give the response in language {language}"
+
+    def _generate_treatment(self, prompt, timeout):
+        response = self.structured_model.generate_content(prompt, request_options={"timeout": timeout})
+        return self._parse_treatment(response)
+
+    async def _agenerate_treatment(self, prompt, timeout):
+        response = await self.structured_model.generate_content_async(prompt, request_options={"timeout": timeout})
+        return self._parse_treatment(response)
+
+    def _send_chat(self, history, message, timeout):
+        chat = self.model.start_chat(history=history)
+        return chat.send_message(message, request_options={"timeout": timeout}).text.strip()
+
+    async def _asend_chat(self, history, message, timeout):
+        chat = self.model.start_chat(history=history)
+        response = await chat.send_message_async(message, request_options={"timeout": timeout})
+        return response.text.strip()
+
+    def fetch_treatment_info(self, disease_name, language='en'):
+        """
+        Asks Gemini for treatment info. Unlike get_treatment_info(), errors are
+        raised to the caller instead of being replaced by the fallback text,
+        so that only genuine answers end up in the treatment cache.
+
+        Transient errors are retried within the call's deadline, and while
+        the circuit is open this raises CircuitOpenError without calling Gemini.
+        """
+        prompt = self._treatment_prompt(disease_name, language)
+        return self.policy.call('treatment', self._generate_treatment, prompt)
+
+    async def afetch_treatment_info(self, disease_name, language='en'):
+        """Async variant of fetch_treatment_info() that awaits the Gemini client."""
+        prompt = self._treatment_prompt(disease_name, language)
+        return await self.policy.acall('treatment', self._agenerate_treatment, prompt)
+
+    def get_treatment_info(self, disease_name, language='en'):
         try:
-            response = self.structured_model.generate_content(prompt)
-            cleaned_text = response.text.strip().replace('```json', '').replace('```', '').strip()
-            return json.loads(cleaned_text)
+            return self.fetch_treatment_info(disease_name, language=language)
         except Exception as e:
             print(f"Error calling Gemini API for treatment info: {e}")
-            return {
-                "recommended_treatment": "Could not retrieve treatment information at this time. Please consult a local gardening expert.",
-                "prevention_tips": ["Ensure your plant has adequate light, water, and nutrients to build its natural defenses."]
-            }
+            record_fallback('treatment')
+            return dict(FALLBACK_TREATMENT_INFO)
+
+    async def aget_treatment_info(self, disease_name, language='en'):
+        try:
+            return await self.afetch_treatment_info(disease_name, language=language)
+        except Exception as e:
+            print(f"Error calling Gemini API for treatment info: {e}")
+            record_fallback('treatment')
+            return dict(FALLBACK_TREATMENT_INFO)
 
     def process_chat(self, history, new_message, language='en'):
         try:
-            chat = self.model.start_chat(history=history)
-            response = chat.send_message(new_message + f"You have to give the response in language {language}")
-            return response.text.strip()
+            return self.policy.call('chat', self._send_chat, history, self._chat_message(new_message, language))
         except Exception as e:
             print(f"Error during Gemini chat processing: {e}")
-            return "I'm sorry, I encountered an error. Please try asking again later."
+            record_fallback('chat')
+            return CHAT_ERROR_MESSAGE
+
+    def _generate_summary(self, prompt, timeout):
+        response = self.structured_model.generate_content(prompt, request_options={"timeout": timeout})
+        return response.text.strip()
 
-gemini_service = GeminiService()
\ No newline at end of file
+    def summarize_chat(self, summary, messages, max_words=300):
+        """
+        Folds older chat messages into the running summary of a chat session.
+        Errors are raised; the caller falls back to a local summary.
+
+        Args:
+            summary: The current summary ('' for none).
+            messages: ChatMessage objects, oldest first.
+        """
+        transcript = "\n".join(f"{message.role}: {message.text}" for message in messages)
+        prompt = SUMMARY_PROMPT.format(max_words=max_words, summary=summary or "(none)", transcript=transcript)
+        return self.policy.call('summary', self._generate_summary, prompt)
+
+    def stream_chat(self, history, new_message, language='en'):
+        """
+        Yields the chat answer as text chunks, as soon as Gemini produces them.
+
+        Errors are not swallowed here: part of the answer may already have
+        been sent, so the caller decides how to surface the fallback message.
+        For the same reason a streamed answer is never retried.
+        """
+        with self.policy.guard('chat_stream') as timeout:
+            chat = self.model.start_chat(history=history)
+            response = chat.send_message(
+                self._chat_message(new_message, language), stream=True, request_options={"timeout": timeout}
+            )
+            for chunk in response:
+                if chunk.text:
+                    yield chunk.text
+
+    async def aprocess_chat(self, history, new_message, language='en'):
+        """Async variant of process_chat() that awaits the Gemini client."""
+        try:
+            return await self.policy.acall(
+                'chat', self._asend_chat, history, self._chat_message(new_message, language)
+            )
+        except Exception as e:
+            print(f"Error during Gemini chat processing: {e}")
+            record_fallback('chat')
+            return CHAT_ERROR_MESSAGE
@@ -0,0 +1,143 @@
+# plant_doctor_ai/services/inference_backends.py
+
+import hashlib
+import os
+
+import torch
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+# Artifact file names inside 'deployment_artifacts', per backend.
+# The TorchScript and ONNX files are produced by `manage.py export_model`,
+# the INT8 model by `manage.py quantize_model`.
+ARTIFACT_FILENAMES = {
+    'eager': 'plant_disease_model.pth',
+    'torchscript': 'plant_disease_model.torchscript.pt',
+    'onnxruntime': 'plant_disease_model.onnx',
+    'quantized': 'plant_disease_model.int8.pt',
+}
+
+
+class EagerBackend:
+    """Runs the CNN_NeuralNet module directly with PyTorch."""
+    name = 'eager'
+
+    def __init__(self, model, device):
+        self.model = model
+        self.device = device
+
+    def __call__(self, batch):
+        with torch.no_grad():
+            return self.model(batch.to(self.device, non_blocking=True))
+
+
+class TorchScriptBackend:
+    """Runs a traced TorchScript graph, avoiding per-layer Python dispatch."""
+    name = 'torchscript'
+
+    def __init__(self, path, device):
+        self.device = device
+        self.model = torch.jit.load(path, map_location=device)
+        self.model.eval()
+
+    def __call__(self, batch):
+        with torch.no_grad():
+            return self.model(batch.to(self.device, non_blocking=True))
+
+
+class QuantizedBackend(TorchScriptBackend):
+    """Runs the INT8 statically quantized model. Quantized kernels are CPU-only."""
+    name = 'quantized'
+
+    def __init__(self, path):
+        from .quantization import quantized_engine
+        torch.backends.quantized.engine = quantized_engine()
+        super().__init__(path, torch.device('cpu'))
+
+
+class OnnxRuntimeBackend:
+    """Runs the exported ONNX graph with ONNX Runtime on the CPU."""
+    name = 'onnxruntime'
+
+    def __init__(self, path, intra_op_threads=None):
+        try:
+            import onnxruntime
+        except ImportError:
+            raise ImproperlyConfigured(
+                "MODEL_BACKEND='onnxruntime' requires the onnxruntime package (pip install onnxruntime)."
+            )
+        options = onnxruntime.SessionOptions()
+        if intra_op_threads:
+            options.intra_op_num_threads = intra_op_threads
+        self.session = onnxruntime.InferenceSession(path, options, providers=['CPUExecutionProvider'])
+        self.input_name = self.session.get_inputs()[0].name
+
+    def __call__(self, batch):
+        logits, = self.session.run(None, {self.input_name: batch.cpu().numpy()})
+        return torch.from_numpy(logits)
+
+
+def artifacts_directory():
+    """The MODEL_ARTIFACTS_DIR setting, by default 'deployment_artifacts' next to manage.py."""
+    return getattr(settings, 'MODEL_ARTIFACTS_DIR', os.path.join(settings.BASE_DIR, 'deployment_artifacts'))
+
+
+def artifact_path(artifacts_dir, backend):
+    return os.path.join(artifacts_dir, ARTIFACT_FILENAMES[backend])
+
+
+def artifact_version(artifacts_dir, backend):
+    """
+    Identifies the exact model that will serve predictions: the backend name
+    plus a digest of its artifact file, e.g. 'eager-3fa9c1d2e4b5a6f7'.
+    """
+    hasher = hashlib.sha256()
+    with open(artifact_path(artifacts_dir, backend), 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            hasher.update(chunk)
+    return f"{backend}-{hasher.hexdigest()[:16]}"
+
+
+def load_eager_model(model_path, num_classes, device):
+    """Builds CNN_NeuralNet and loads the trained state dict into it."""
+    from .model_service import CNN_NeuralNet
+
+    model = CNN_NeuralNet(in_channels=3, num_diseases=num_classes)
+    try:
+        model.load_state_dict(torch.load(model_path, map_location=device))
+    except FileNotFoundError:
+        raise RuntimeError(f"Model state_dict not found at {model_path}")
+    model.to(device)
+    model.eval()
+    return model
+
+
+def load_backend(backend, artifacts_dir, num_classes, device):
+    """
+    Creates the inference backend selected by the MODEL_BACKEND setting.
+
+    Args:
+        backend: One of 'eager', 'torchscript', 'onnxruntime' or 'quantized'.
+        artifacts_dir: The 'deployment_artifacts' directory.
+        num_classes: Number of output classes (only needed for 'eager').
+        device: The torch device to run on.
+    """
+    if backend not in ARTIFACT_FILENAMES:
+        raise ImproperlyConfigured(
+            f"Unknown MODEL_BACKEND '{backend}'. Choose one of: {', '.join(ARTIFACT_FILENAMES)}."
+        )
+
+    path = artifact_path(artifacts_dir, backend)
+    if backend == 'eager':
+        return EagerBackend(load_eager_model(path, num_classes, device), device)
+
+    if not os.path.exists(path):
+        command = 'quantize_model' if backend == 'quantized' else 'export_model'
+        raise RuntimeError(
+            f"{backend} model not found at {path}. Run `python manage.py {command}` first."
+        )
+    if backend == 'torchscript':
+        return TorchScriptBackend(path, device)
+    if backend == 'quantized':
+        return QuantizedBackend(path)
+    return OnnxRuntimeBackend(path, intra_op_threads=torch.get_num_threads())
@@ -0,0 +1,82 @@
+# plant_doctor_ai/services/inference_client.py
+"""
+Client side of the inference worker pool (see services.inference_pool).
+
+With MODEL_INFERENCE_MODE='pool', web processes decode uploads themselves
+and send the uint8 arrays to the pool over a local socket. They never
+import torch or load the weights.
+"""
+
+import hashlib
+from multiprocessing.connection import Client
+
+from django.conf import settings
+
+from .metrics import timed
+from .predictor import BatchedPredictor, MODEL_STAGE_METRIC, MODEL_STAGE_DESCRIPTION
+
+
+def pool_address():
+    return settings.MODEL_POOL_ADDRESS
+
+
+def pool_authkey():
+    """Shared secret for the pool's connection handshake, derived from SECRET_KEY."""
+    return hashlib.sha256(f"inference-pool:{settings.SECRET_KEY}".encode()).digest()
+
+
+class PoolModelService(BatchedPredictor):
+    """
+    A ModelService stand-in that runs predictions in the inference pool.
+
+    Concurrent predict() calls are still micro-batched here, so a burst of
+    uploads costs one round trip. Each round trip uses its own connection,
+    which any idle pool worker can accept.
+    """
+
+    def __init__(self):
+        self.address = pool_address()
+        self.authkey = pool_authkey()
+        self.timeout = getattr(settings, 'MODEL_POOL_TIMEOUT', 30)
+
+        info = self.request('info')
+        self.model_version = info['model_version']
+        self.top_k = info['top_k']
+        self.backend_name = info['backend']
+        print(f"✅ Connected to inference pool at {self.address} (version: {self.model_version})")
+
+        self.setup_batching()
+
+    def request(self, *message):
+        """
+        Sends one request to the pool and waits for its reply.
+
+        Raises:
+            RuntimeError: If the pool is unreachable or the worker failed.
+            TimeoutError: If no reply arrived within MODEL_POOL_TIMEOUT seconds.
+        """
+        try:
+            connection = Client(self.address, family='AF_UNIX', authkey=self.authkey)
+        except (FileNotFoundError, ConnectionRefusedError) as e:
+            raise RuntimeError(
+                f"Inference pool is not reachable at {self.address}. "
+                "Start it with `python manage.py run_inference_pool`."
+            ) from e
+
+        with connection:
+            connection.send(message)
+            if not connection.poll(self.timeout):
+                raise TimeoutError(f"Inference pool did not answer within {self.timeout}s.")
+            status, payload = connection.recv()
+
+        if status != 'ok':
+            raise RuntimeError(f"Inference pool error: {payload}")
+        return payload
+
+    def warmup(self):
+        """Checks that the pool answers; its workers warm themselves up on start."""
+        self.request('info')
+
+    def predict_arrays(self, arrays):
+        with timed(MODEL_STAGE_METRIC, MODEL_STAGE_DESCRIPTION, stage='remote'):
+            return self.request('predict', arrays)
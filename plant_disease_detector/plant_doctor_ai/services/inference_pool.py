@@ -0,0 +1,169 @@
+# plant_doctor_ai/services/inference_pool.py
+"""
+A dedicated pool of inference processes, served over a local Unix socket.
+
+The parent process loads the model once and then forks the workers, so they
+all map the same weight pages instead of each holding a copy. (Eager models
+are additionally moved to shared memory.) Each worker pins its own torch
+thread count, and optionally its CPU cores, so that workers do not
+oversubscribe the machine.
+
+Start it with `python manage.py run_inference_pool`; web processes talk to
+it through services.inference_client.PoolModelService.
+"""
+
+import multiprocessing
+import os
+import signal
+from multiprocessing.connection import Listener, wait
+
+import torch
+
+from .inference_client import pool_address, pool_authkey
+from .model_service import ModelService
+
+# Models that cannot safely be forked after loading.
+UNSUPPORTED_BACKENDS = ('onnxruntime',)
+
+
+def pin_worker(index, threads, pin_cores):
+    """Limits a worker to `threads` torch threads and, optionally, its own cores."""
+    torch.set_num_threads(threads)
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        # Already set (inter-op threads can only be configured once per process).
+        pass
+
+    if pin_cores and hasattr(os, 'sched_setaffinity'):
+        available = sorted(os.sched_getaffinity(0))
+        cores = available[index * threads:(index + 1) * threads]
+        if cores:
+            os.sched_setaffinity(0, cores)
+
+
+def handle(service, message):
+    """Answers one request from a PoolModelService."""
+    command, *args = message
+    if command == 'predict':
+        return service.predict_arrays(*args)
+    if command == 'info':
+        return {
+            "model_version": service.model_version,
+            "top_k": service.top_k,
+            "backend": service.backend.name,
+        }
+    raise ValueError(f"Unknown command '{command}'")
+
+
+def serve(listener, service, index, threads, pin_cores):
+    """Worker loop: accepts one connection at a time and answers its request."""
+    # The parent handles Ctrl+C and terminates the workers on shutdown, so
+    # they must not inherit its handlers.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    pin_worker(index, threads, pin_cores)
+    service.warmup()
+    print(f"✅ Inference worker {index} ready (pid {os.getpid()}, {threads} thread(s))")
+
+    while True:
+        try:
+            connection = listener.accept()
+        except (OSError, EOFError, multiprocessing.AuthenticationError):
+            continue
+
+        with connection:
+            try:
+                message = connection.recv()
+            except (OSError, EOFError):
+                continue
+            try:
+                reply = ('ok', handle(service, message))
+            except Exception as e:
+                reply = ('error', str(e) or e.__class__.__name__)
+            try:
+                connection.send(reply)
+            except OSError:
+                pass
+
+
+class InferencePool:
+    """
+    Loads the model, forks the workers and restarts any worker that dies.
+
+    Args:
+        workers: Number of worker processes.
+        threads: Torch threads per worker.
+        address: Unix socket path (MODEL_POOL_ADDRESS by default).
+        pin_cores: Pin each worker to its own `threads` CPU cores.
+    """
+
+    def __init__(self, workers, threads, address=None, pin_cores=True):
+        self.workers = workers
+        self.threads = threads
+        self.address = address or pool_address()
+        self.pin_cores = pin_cores
+        self.context = multiprocessing.get_context('fork')
+        self.processes = {}
+        self.stopping = False
+
+    def load(self):
+        # No forward pass may run here: the intra-op thread pool it would
+        # start does not survive fork().
+        self.service = ModelService()
+        if self.service.backend.name in UNSUPPORTED_BACKENDS:
+            raise RuntimeError(
+                f"MODEL_BACKEND='{self.service.backend.name}' cannot be used with the inference pool; "
+                "use 'eager', 'torchscript' or 'quantized'."
+            )
+        if self.service.backend.name == 'eager':
+            self.service.backend.model.share_memory()
+
+    def start_worker(self, index):
+        process = self.context.Process(
+            target=serve,
+            args=(self.listener, self.service, index, self.threads, self.pin_cores),
+            name=f'inference-worker-{index}',
+            daemon=True,
+        )
+        process.start()
+        self.processes[index] = process
+
+    def stop(self, *args):
+        self.stopping = True
+
+    def run(self):
+        self.load()
+
+        if os.path.exists(self.address):
+            os.unlink(self.address)
+        self.listener = Listener(self.address, family='AF_UNIX', authkey=pool_authkey())
+        os.chmod(self.address, 0o600)
+
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+        try:
+            for index in range(self.workers):
+                self.start_worker(index)
+
+            while not self.stopping:
+                sentinels = {process.sentinel: index for index, process in self.processes.items()}
+                for sentinel in wait(list(sentinels), timeout=1):
+                    index = sentinels[sentinel]
+                    if self.stopping:
+                        break
+                    self.processes[index].join()
+                    print(f"Inference worker {index} exited with code {self.processes[index].exitcode}; restarting.")
+                    self.start_worker(index)
+        finally:
+            for process in self.processes.values():
+                process.terminate()
+            for process in self.processes.values():
+                process.join(timeout=5)
+                if process.is_alive():
+                    process.kill()
+                    process.join()
+            self.listener.close()
+            if os.path.exists(self.address):
+                os.unlink(self.address)
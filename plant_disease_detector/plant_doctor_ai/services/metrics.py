@@ -0,0 +1,199 @@
+# plant_doctor_ai/services/metrics.py
+"""
+In-process metrics: histograms, counters and gauges kept in a registry and
+rendered in the Prometheus text format by the metrics/ endpoint.
+
+Each process (e.g. each gunicorn worker) keeps its own values.
+"""
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+# Upper bounds, in seconds, for request and stage durations.
+LATENCY_BUCKETS = [0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30]
+
+
+class Histogram:
+    """
+    A small thread-safe, fixed-bucket histogram kept in process memory.
+
+    Buckets are upper bounds (inclusive), in the same spirit as Prometheus
+    histograms. Observations larger than the last bucket land in "+Inf".
+    """
+
+    kind = 'histogram'
+
+    def __init__(self, name, buckets, description='', labels=None):
+        self.name = name
+        self.description = description
+        self.labels = dict(labels or {})
+        self.buckets = sorted(buckets)
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._counts = [0] * (len(self.buckets) + 1)
+            self._sum = 0.0
+            self._count = 0
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+            self._count += 1
+
+    def snapshot(self):
+        """
+        Returns:
+            dict: Cumulative bucket counts plus the total count and sum.
+                  e.g., {"count": 3, "sum": 12.0, "buckets": {"1": 1, "8": 3, "+Inf": 3}}
+        """
+        with self._lock:
+            counts = list(self._counts)
+            total, count = self._sum, self._count
+
+        cumulative = {}
+        running = 0
+        for bound, bucket_count in zip(self.buckets + ['+Inf'], counts):
+            running += bucket_count
+            cumulative[str(bound)] = running
+
+        return {
+            "count": count,
+            "sum": round(total, 6),
+            "mean": round(total / count, 6) if count else 0.0,
+            "buckets": cumulative,
+        }
+
+    def render(self):
+        """Prometheus text lines for this series (without HELP/TYPE)."""
+        snapshot = self.snapshot()
+        lines = [
+            f"{self.name}_bucket{format_labels(self.labels, le=bound)} {count}"
+            for bound, count in snapshot['buckets'].items()
+        ]
+        lines.append(f"{self.name}_sum{format_labels(self.labels)} {snapshot['sum']}")
+        lines.append(f"{self.name}_count{format_labels(self.labels)} {snapshot['count']}")
+        return lines
+
+
+class Counter:
+    """A monotonically increasing, thread-safe count."""
+    kind = 'counter'
+
+    def __init__(self, name, description='', labels=None):
+        self.name = name
+        self.description = description
+        self.labels = dict(labels or {})
+        self._lock = threading.Lock()
+        self.value = 0
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def render(self):
+        return [f"{self.name}{format_labels(self.labels)} {self.value}"]
+
+
+class Gauge:
+    """A value that is set rather than accumulated, e.g. a load time."""
+    kind = 'gauge'
+
+    def __init__(self, name, description='', labels=None):
+        self.name = name
+        self.description = description
+        self.labels = dict(labels or {})
+        self.value = 0
+
+    def set(self, value):
+        self.value = value
+
+    def render(self):
+        return [f"{self.name}{format_labels(self.labels)} {self.value}"]
+
+
+def escape_label_value(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_labels(labels, **extra):
+    """Renders labels as {key="value",...}, or '' when there are none."""
+    labels = {**labels, **extra}
+    if not labels:
+        return ''
+    pairs = ','.join(f'{key}="{escape_label_value(value)}"' for key, value in sorted(labels.items()))
+    return '{' + pairs + '}'
+
+
+class Registry:
+    """
+    Holds every metric series of the process, keyed by name and labels.
+
+    The accessors create a series on first use and return the existing one
+    afterwards, so call sites can simply ask for the metric they record.
+    """
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name, description, labels, **kwargs):
+        key = (name, tuple(sorted(labels.items())))
+        metric = self._metrics.get(key)
+        if metric is None:
+            with self._lock:
+                metric = self._metrics.get(key)
+                if metric is None:
+                    metric = cls(name, description=description, labels=labels, **kwargs)
+                    self._metrics[key] = metric
+        return metric
+
+    def histogram(self, name, buckets=LATENCY_BUCKETS, description='', **labels):
+        return self._get(Histogram, name, description, labels, buckets=buckets)
+
+    def counter(self, name, description='', **labels):
+        return self._get(Counter, name, description, labels)
+
+    def gauge(self, name, description='', **labels):
+        return self._get(Gauge, name, description, labels)
+
+    def render(self):
+        """Returns every metric in the Prometheus text exposition format (0.0.4)."""
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda metric: metric.name)
+
+        lines = []
+        previous_name = None
+        for metric in metrics:
+            if metric.name != previous_name:
+                if metric.description:
+                    lines.append(f"# HELP {metric.name} {metric.description}")
+                lines.append(f"# TYPE {metric.name} {metric.kind}")
+                previous_name = metric.name
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+
+@contextmanager
+def timed(name, description='', **labels):
+    """
+    Records the duration of the block, in seconds, in a latency histogram.
+
+    Example:
+        with timed('plantdoc_analyze_stage_seconds', stage='predict'):
+            prediction = model_service.predict(image_file)
+    """
+    histogram = registry.histogram(name, LATENCY_BUCKETS, description, **labels)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        histogram.observe(time.perf_counter() - started)
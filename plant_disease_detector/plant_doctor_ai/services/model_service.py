@@ -3,12 +3,17 @@
 import torch
 import torch.nn as nn
 import torch.nn.functional as F
-import torchvision.transforms as transforms
-from PIL import Image
 import json
 import os
+import threading
+import time
 from django.conf import settings # Import Django settings
 
+from .metrics import registry, timed
+from .predictor import BatchedPredictor, MODEL_STAGE_METRIC, MODEL_STAGE_DESCRIPTION
+from .inference_backends import artifact_version, artifacts_directory, load_backend
+from .preprocessing import INPUT_SIZE, decode_image
+
 # =====================================================================================
 # === Step 1: Model Class Definitions ===
 # These must exactly match the definitions in your training/saving script.
@@ -56,31 +61,71 @@ class CNN_NeuralNet(ImageClassificationBase):
         out = self.classifier(out)
         return out
 
+def preprocess_image(image_file):
+    """Transforms an uploaded image file into a (1, 3, 256, 256) tensor for the model."""
+    array = decode_image(image_file)
+    return torch.from_numpy(array).permute(2, 0, 1).float().div_(255).unsqueeze(0)
+
+class InputBuffers(threading.local):
+    """
+    Preallocated (batch, 3, 256, 256) float input tensors, one set per thread.
+
+    Decoded uint8 images are written straight into their batch slot, which
+    converts HWC uint8 to CHW float in a single copy, and then scaled in
+    place. Nothing is allocated per request for batches of up to `capacity`
+    images (the batcher's max_batch_size); a larger batch gets a temporary
+    tensor instead, so the per-thread buffer never grows past `capacity`.
+    The buffer is pinned when a GPU is present so the host-to-device copy
+    can be asynchronous.
+    """
+
+    def __init__(self, capacity=8):
+        self.capacity = capacity
+        self.buffer = None
+
+    def fill(self, arrays):
+        if len(arrays) > self.capacity:
+            # Pinning a one-off tensor would cost more than the copy it speeds up.
+            batch = torch.empty((len(arrays), 3, INPUT_SIZE, INPUT_SIZE), dtype=torch.float32)
+        else:
+            if self.buffer is None:
+                self.buffer = torch.empty((self.capacity, 3, INPUT_SIZE, INPUT_SIZE), dtype=torch.float32)
+                if torch.cuda.is_available():
+                    self.buffer = self.buffer.pin_memory()
+            batch = self.buffer[:len(arrays)]
+        for slot, array in zip(batch, arrays):
+            slot.copy_(torch.from_numpy(array).permute(2, 0, 1))
+        return batch.div_(255)
+
 # =====================================================================================
 # === Step 2: The Model Service (Singleton Pattern) ===
 # This class handles loading and inference using Django's settings.
+# The shared instance is created lazily by services.providers.
 # =====================================================================================
 
-class ModelService:
+class ModelService(BatchedPredictor):
     _instance = None
+    _lock = threading.Lock()
 
     def __new__(cls):
-        if cls._instance is None:
-            cls._instance = super(ModelService, cls).__new__(cls)
-            cls._instance.initialize()
+        with cls._lock:
+            if cls._instance is None:
+                instance = super(ModelService, cls).__new__(cls)
+                instance.initialize()
+                cls._instance = instance
         return cls._instance
 
     def initialize(self):
         """
         Loads model artifacts from the 'deployment_artifacts' folder
-        in the project's base directory.
+        in the project's base directory (or MODEL_ARTIFACTS_DIR).
         """
         print("Initializing model service...")
+        started = time.perf_counter()
         self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
         
         # --- KEY CHANGE: Use settings.BASE_DIR to build the path ---
-        artifacts_dir = os.path.join(settings.BASE_DIR, 'deployment_artifacts')
-        model_path = os.path.join(artifacts_dir, 'plant_disease_model.pth')
+        artifacts_dir = artifacts_directory()
         classes_path = os.path.join(artifacts_dir, 'class_names.json')
 
         # Check if the artifact directory exists
@@ -99,75 +144,74 @@ class ModelService:
         except FileNotFoundError:
             raise RuntimeError(f"Class names file not found at {classes_path}")
 
-        # Instantiate the model architecture
-        self.model = CNN_NeuralNet(in_channels=3, num_diseases=num_classes)
-        
-        # Load the saved state dictionary into the model
-        try:
-            self.model.load_state_dict(torch.load(model_path, map_location=self.device))
-        except FileNotFoundError:
-             raise RuntimeError(f"Model state_dict not found at {model_path}")
-
-        # Set the model to the correct device and evaluation mode
-        self.model.to(self.device)
-        self.model.eval()
-        
-        print(f"✅ Model loaded successfully on device: {self.device}")
-
-    def _preprocess_image(self, image_file):
-        """Transforms an uploaded image file into a tensor for the model."""
-        transform = transforms.Compose([
-            transforms.Resize((256, 256)),
-            transforms.ToTensor()
-        ])
-        image = Image.open(image_file).convert('RGB')
-        return transform(image).unsqueeze(0)
-
-    def predict(self, image_file):
+        # Load the model with the runtime selected by MODEL_BACKEND
+        # (eager PyTorch, TorchScript, ONNX Runtime or INT8 quantized)
+        self.artifacts_dir = artifacts_dir
+        backend_name = getattr(settings, 'MODEL_BACKEND', 'eager')
+        self.backend = load_backend(backend_name, artifacts_dir, num_classes, self.device)
+
+        # How many ranked alternatives each prediction carries, and the
+        # temperature the logits are divided by before the softmax.
+        self.top_k = min(getattr(settings, 'MODEL_TOP_K', 3), num_classes)
+        self.temperature = getattr(settings, 'MODEL_CALIBRATION_TEMPERATURE', 1.0)
+
+        # Memoized predictions are keyed by this, so new weights, another
+        # backend or different calibration never reuse older predictions.
+        self.model_version = (
+            f"{artifact_version(artifacts_dir, backend_name)}-k{self.top_k}-t{self.temperature:g}"
+        )
+
+        load_seconds = time.perf_counter() - started
+        registry.gauge(
+            'plantdoc_model_load_seconds', 'Time taken to load the model when the service was created.'
+        ).set(round(load_seconds, 4))
+        print(
+            f"✅ Model loaded successfully on device: {self.device} "
+            f"(version: {self.model_version}) in {load_seconds:.2f}s"
+        )
+
+        self.setup_batching()
+        self.input_buffers = InputBuffers(capacity=self.max_batch_size)
+
+    def warmup(self):
+        """Runs one dummy forward pass so the first real request is not the slowest."""
+        self.backend(torch.zeros((1, 3, INPUT_SIZE, INPUT_SIZE)))
+
+    def predict_arrays(self, arrays):
         """
-        Performs inference on a single image file.
+        Runs one forward pass over several decoded images.
+
+        The top-k alternatives and the temperature-scaled probabilities are
+        all computed from the logits of that single pass.
 
         Args:
-            image_file: A file-like object (e.g., from request.FILES).
+            arrays: A list of (256, 256, 3) uint8 arrays from decode_image().
 
         Returns:
-            dict: A dictionary containing the predicted disease name and the
-                  confidence score as a float.
-                  e.g., {"disease": "Tomato___Late_blight", "confidence": 0.89}
+            list: One prediction dictionary per image, in order, e.g.
+                  {"disease": "Tomato___Late_blight", "confidence": 0.89,
+                   "top_k": [{"disease": "Tomato___Late_blight", "confidence": 0.89},
+                             {"disease": "Tomato___Early_blight", "confidence": 0.07}, ...]}
         """
-        # Preprocess the image and get the tensor
-        tensor = self._preprocess_image(image_file).to(self.device)
+        batch = self.input_buffers.fill(arrays)
 
-        with torch.no_grad():
-            # 1. Get the raw model output (logits)
-            outputs = self.model(tensor)
-
-            # 2. Apply Softmax to get probabilities
-            # The outputs are raw scores (logits). Softmax converts them to probabilities.
-            probabilities = F.softmax(outputs, dim=1)
-            
-            # 3. Get the top probability and its corresponding class index
-            # torch.max returns a tuple of (max_value, max_indices)
-            confidence, predicted_idx = torch.max(probabilities, 1)
-
-            # 4. Map the index to the class name
-            predicted_class = self.class_names[predicted_idx.item()]
-            
-            # 5. Format the confidence score
-            # .item() extracts the scalar value from the tensor
-            # We round it to 4 decimal places for a cleaner output
-            confidence_score = round(confidence.item(), 4)
-
-        # 6. Create the result dictionary
-        prediction = {
-            "disease": predicted_class,
-            "confidence": confidence_score
-        }
-        
-        return prediction
+        # 1. Get the raw model output (logits) for the whole batch
+        with timed(MODEL_STAGE_METRIC, MODEL_STAGE_DESCRIPTION, stage='forward'):
+            outputs = self.backend(batch)
 
-# =====================================================================================
-# === Step 3: Instantiate the Service ===
-# This creates the single, shared instance when Django starts.
-# =====================================================================================
-model_service = ModelService()
\ No newline at end of file
+        with torch.no_grad():
+            # 2. Apply temperature scaling and Softmax to get calibrated probabilities
+            probabilities = F.softmax(outputs / self.temperature, dim=1)
+
+            # 3. Get the k most likely classes for every row, best first
+            confidences, predicted_idx = torch.topk(probabilities, self.top_k, dim=1)
+
+        # 4. Map each index to its class name and round the confidences
+        predictions = []
+        for row_confidences, row_indices in zip(confidences.tolist(), predicted_idx.tolist()):
+            top_k = [
+                {"disease": self.class_names[idx], "confidence": round(conf, 4)}
+                for conf, idx in zip(row_confidences, row_indices)
+            ]
+            predictions.append({**top_k[0], "top_k": top_k})
+        return predictions
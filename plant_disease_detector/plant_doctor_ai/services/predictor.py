@@ -0,0 +1,92 @@
+# plant_doctor_ai/services/predictor.py
+"""
+The prediction API shared by the in-process ModelService and the client of
+the inference worker pool. Nothing here imports torch.
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+from .batching import MicroBatcher
+from .metrics import timed
+from .preprocessing import decode_image
+
+MODEL_STAGE_METRIC = 'plantdoc_model_stage_seconds'
+MODEL_STAGE_DESCRIPTION = 'Time spent in each model stage (decode per call, forward per batch).'
+
+
+class BatchedPredictor:
+    """
+    Decodes images on the calling thread and runs them through
+    predict_arrays(), which subclasses implement.
+
+    Subclasses call setup_batching() once their predict_arrays() is usable.
+    """
+
+    def setup_batching(self):
+        # Concurrent predict() calls are funnelled through a micro-batcher so
+        # that bursts of uploads share one forward pass.
+        self.max_batch_size = getattr(settings, 'MODEL_BATCH_MAX_SIZE', 8)
+        self.batcher = MicroBatcher(
+            self.predict_arrays,
+            max_batch_size=self.max_batch_size,
+            max_wait_ms=getattr(settings, 'MODEL_BATCH_MAX_WAIT_MS', 10),
+        )
+
+        # Async views hand decoding and inference to this bounded pool, so the
+        # event loop stays free and only a fixed number of images are being
+        # decoded at any one time.
+        self.executor = ThreadPoolExecutor(
+            max_workers=getattr(settings, 'MODEL_INFERENCE_WORKERS', 4),
+            thread_name_prefix='model-inference'
+        )
+
+    def predict_arrays(self, arrays):
+        raise NotImplementedError
+
+    def predict(self, image_file):
+        """
+        Performs inference on a single image file.
+
+        The image is decoded on the calling thread and then queued on the
+        micro-batcher, which may run it together with other concurrent calls.
+
+        Args:
+            image_file: A file-like object (e.g., from request.FILES).
+
+        Returns:
+            dict: A dictionary containing the predicted disease name and the
+                  confidence score as a float.
+                  e.g., {"disease": "Tomato___Late_blight", "confidence": 0.89}
+        """
+        with timed(MODEL_STAGE_METRIC, MODEL_STAGE_DESCRIPTION, stage='decode'):
+            array = decode_image(image_file)
+        return self.batcher(array)
+
+    async def apredict(self, image_file):
+        """Async variant of predict() that runs on the bounded inference executor."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self.predict, image_file)
+
+    def predict_many(self, image_files):
+        """
+        Performs inference on several image files with a single forward pass.
+
+        Unlike predict(), this bypasses the micro-batcher: the caller already
+        holds the whole batch, so there is nothing to wait for.
+
+        Args:
+            image_files: A list of file-like objects (e.g., from request.FILES).
+
+        Returns:
+            list: One prediction dictionary per image, in order.
+        """
+        with timed(MODEL_STAGE_METRIC, MODEL_STAGE_DESCRIPTION, stage='decode'):
+            arrays = [decode_image(image_file) for image_file in image_files]
+        return self.predict_arrays(arrays)
+
+    def batch_stats(self):
+        """Returns the batch-size and queue-wait histograms of the batcher."""
+        return self.batcher.stats()
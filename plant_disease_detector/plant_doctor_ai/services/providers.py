@@ -0,0 +1,83 @@
+# plant_doctor_ai/services/providers.py
+"""
+Lazily constructed, process-wide service instances.
+
+Importing this module is cheap: torch and the Gemini SDK are only imported,
+and the model weights only loaded, the first time a service is actually
+used (or when warmup() is called explicitly). This keeps manage.py commands
+such as migrate, shell and check fast, and lets them run without a
+GEMINI_API_KEY.
+"""
+
+import threading
+import time
+
+from django.conf import settings
+from django.utils.functional import SimpleLazyObject
+
+
+def lazy_service(factory):
+    """
+    Wraps a factory so that it runs at most once, even if several request
+    threads hit the service for the first time simultaneously.
+    """
+    lock = threading.Lock()
+    instance = []
+
+    def get():
+        if not instance:
+            with lock:
+                if not instance:
+                    instance.append(factory())
+        return instance[0]
+
+    return get
+
+
+def _build_model_service():
+    if getattr(settings, 'MODEL_INFERENCE_MODE', 'local') == 'pool':
+        from .inference_client import PoolModelService
+        return PoolModelService()
+
+    from .model_service import ModelService
+    return ModelService()
+
+
+def _build_gemini_service():
+    if getattr(settings, 'GEMINI_BACKEND', 'gemini') == 'fake':
+        from .fake_gemini import FakeGeminiService
+        return FakeGeminiService(
+            latency_ms=getattr(settings, 'GEMINI_FAKE_LATENCY_MS', 0),
+            error_rate=getattr(settings, 'GEMINI_FAKE_ERROR_RATE', 0),
+        )
+
+    from .gemini_service import GeminiService
+    return GeminiService()
+
+
+get_model_service = lazy_service(_build_model_service)
+get_gemini_service = lazy_service(_build_gemini_service)
+
+model_service = SimpleLazyObject(get_model_service)
+gemini_service = SimpleLazyObject(get_gemini_service)
+
+
+def warmup(model=True, gemini=True):
+    """
+    Builds the services up front and primes the model with one dummy forward
+    pass, so that the first real request does not pay for it.
+
+    Returns:
+        dict: Seconds spent warming each service.
+              e.g., {"model": 1.84, "gemini": 0.12}
+    """
+    timings = {}
+    if model:
+        started = time.perf_counter()
+        get_model_service().warmup()
+        timings['model'] = round(time.perf_counter() - started, 4)
+    if gemini:
+        started = time.perf_counter()
+        get_gemini_service()
+        timings['gemini'] = round(time.perf_counter() - started, 4)
+    return timings
@@ -0,0 +1,82 @@
+# plant_doctor_ai/services/quantization.py
+
+import torch
+import torch.nn as nn
+from torch.ao import quantization
+
+from .model_service import CNN_NeuralNet
+
+
+def quantized_engine():
+    """Picks the best INT8 kernel library available on this CPU."""
+    for engine in ('x86', 'fbgemm', 'qnnpack'):
+        if engine in torch.backends.quantized.supported_engines:
+            return engine
+    raise RuntimeError("This PyTorch build has no quantized CPU engine.")
+
+
+class QuantizableCNN_NeuralNet(CNN_NeuralNet):
+    """
+    CNN_NeuralNet with the stubs static quantization needs.
+
+    Inputs are quantized once on the way in and logits dequantized on the
+    way out, and the two residual additions go through FloatFunctional so
+    they can run on quantized tensors. The layer names are unchanged, so the
+    trained FP32 state dict loads as-is.
+    """
+
+    def __init__(self, in_channels, num_diseases):
+        super().__init__(in_channels, num_diseases)
+        self.quant = quantization.QuantStub()
+        self.dequant = quantization.DeQuantStub()
+        self.res1_add = nn.quantized.FloatFunctional()
+        self.res2_add = nn.quantized.FloatFunctional()
+
+    def forward(self, x):
+        out = self.quant(x)
+        out = self.conv1(out)
+        out = self.conv2(out)
+        out = self.res1_add.add(self.res1(out), out)
+        out = self.conv3(out)
+        out = self.conv4(out)
+        out = self.res2_add.add(self.res2(out), out)
+        out = self.classifier(out)
+        return self.dequant(out)
+
+    def fuse_model(self):
+        """Fuses every ConvBlock's Conv2d + BatchNorm2d + ReLU into one module."""
+        blocks = [self.conv1, self.conv2, self.conv3, self.conv4,
+                  self.res1[0], self.res1[1], self.res2[0], self.res2[1]]
+        for block in blocks:
+            quantization.fuse_modules(block, ['0', '1', '2'], inplace=True)
+
+
+def quantize_model(fp32_model, calibration_batches):
+    """
+    Post-training static quantization of a trained CNN_NeuralNet.
+
+    Args:
+        fp32_model: The eager model with trained weights loaded.
+        calibration_batches: An iterable of (N, 3, 256, 256) float tensors used
+            to observe activation ranges.
+
+    Returns:
+        torch.nn.Module: The converted INT8 model, on the CPU.
+    """
+    engine = quantized_engine()
+    torch.backends.quantized.engine = engine
+
+    num_classes = fp32_model.classifier[-1].out_features
+    model = QuantizableCNN_NeuralNet(in_channels=3, num_diseases=num_classes)
+    model.load_state_dict(fp32_model.state_dict())
+    model.eval()
+
+    model.fuse_model()
+    model.qconfig = quantization.get_default_qconfig(engine)
+    quantization.prepare(model, inplace=True)
+
+    with torch.no_grad():
+        for batch in calibration_batches:
+            model(batch)
+
+    return quantization.convert(model, inplace=True)
@@ -0,0 +1,286 @@
+# plant_doctor_ai/services/resilience.py
+"""
+Building blocks for calling a flaky upstream service (Gemini):
+
+- CallPolicy: a per-attempt timeout, an overall deadline and a bounded
+  number of retries with exponential backoff and full jitter.
+- CircuitBreaker: after repeated failures, calls fail immediately for a
+  while instead of each one waiting for the upstream to time out.
+- SingleFlight / AsyncSingleFlight: concurrent calls for the same key share
+  one in-flight call.
+"""
+
+import asyncio
+import random
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager, nullcontext
+
+from .metrics import registry
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling the upstream while its circuit is open."""
+
+    def __init__(self, name, retry_after):
+        super().__init__(f"Circuit '{name}' is open; retry in {retry_after:.1f}s.")
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    A thread-safe circuit breaker.
+
+    closed:    calls go through; `failure_threshold` consecutive failures open it.
+    open:      calls raise CircuitOpenError until `reset_timeout` seconds pass.
+    half_open: a single trial call goes through; its success closes the
+               circuit again, its failure re-opens it.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+    STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=30.0, clock=time.monotonic):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_running = False
+
+        self.state_gauge = registry.gauge(
+            'plantdoc_circuit_state', 'Circuit breaker state (0 closed, 1 half open, 2 open).', circuit=name
+        )
+        self.rejections = registry.counter(
+            'plantdoc_circuit_rejections_total', 'Calls refused because the circuit was open.', circuit=name
+        )
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self):
+        if self._state == self.OPEN and self.clock() - self._opened_at >= self.reset_timeout:
+            self._set_state(self.HALF_OPEN)
+        return self._state
+
+    def _set_state(self, state):
+        self._state = state
+        self.state_gauge.set(self.STATE_VALUES[state])
+
+    def before_call(self):
+        """Raises CircuitOpenError unless a call may go through now."""
+        with self._lock:
+            state = self._current_state()
+            if state == self.CLOSED:
+                return
+            if state == self.HALF_OPEN and not self._trial_running:
+                self._trial_running = True
+                return
+            retry_after = max(0.0, self._opened_at + self.reset_timeout - self.clock())
+        self.rejections.inc()
+        raise CircuitOpenError(self.name, retry_after)
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._trial_running = False
+            self._set_state(self.CLOSED)
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_running = False
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self._opened_at = self.clock()
+                self._set_state(self.OPEN)
+
+
+def backoff_delay(attempt, base_delay, max_delay, rng=random):
+    """Exponential backoff with full jitter: uniform(0, min(max_delay, base_delay * 2**attempt))."""
+    return rng.uniform(0, min(max_delay, base_delay * (2 ** attempt)))
+
+
+class CallPolicy:
+    """
+    Runs calls to one upstream with timeouts, retries and a circuit breaker.
+
+    The wrapped function is called with a `timeout` keyword argument: the
+    time left for that attempt, never more than `timeout` and never past
+    the overall `deadline` of the call.
+
+    Args:
+        name: Used for the circuit breaker and the metric labels.
+        breaker: The CircuitBreaker shared by every call to the upstream.
+        timeout: Seconds allowed per attempt.
+        deadline: Seconds allowed for the call including all retries.
+        max_retries: Retries after the first attempt.
+        base_delay, max_delay: Backoff bounds in seconds.
+        is_retryable: Decides whether an exception is a transient upstream
+            failure. Other exceptions are raised at once and do not count
+            against the circuit.
+        instrument: Optional context manager factory wrapped around every
+            attempt, called with the operation name.
+    """
+
+    def __init__(self, name, breaker, timeout=10.0, deadline=30.0, max_retries=2,
+                 base_delay=0.25, max_delay=2.0, is_retryable=None, instrument=None):
+        self.name = name
+        self.breaker = breaker
+        self.timeout = timeout
+        self.deadline = deadline
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.is_retryable = is_retryable or (lambda exc: isinstance(exc, (TimeoutError, ConnectionError)))
+        self.instrument = instrument or (lambda operation: nullcontext())
+
+    def _count_retry(self, operation):
+        registry.counter(
+            'plantdoc_upstream_retries_total', 'Upstream calls retried after a transient failure.',
+            upstream=self.name, operation=operation
+        ).inc()
+
+    def _next_delay(self, attempt, exc, expires_at):
+        """
+        Seconds to wait before the next attempt, or None when the error is
+        final (not retryable, out of retries, or past the deadline).
+        """
+        if not self.is_retryable(exc):
+            # The upstream answered; a bad answer says nothing about its health.
+            self.breaker.record_success()
+            return None
+        delay = backoff_delay(attempt, self.base_delay, self.max_delay)
+        if attempt >= self.max_retries or time.monotonic() + delay >= expires_at:
+            self.breaker.record_failure()
+            return None
+        return delay
+
+    def call(self, operation, func, *args, **kwargs):
+        """Calls func(*args, timeout=..., **kwargs) under the policy."""
+        self.breaker.before_call()
+        expires_at = time.monotonic() + self.deadline
+        attempt = 0
+        while True:
+            timeout = min(self.timeout, expires_at - time.monotonic())
+            try:
+                with self.instrument(operation):
+                    result = func(*args, timeout=timeout, **kwargs)
+            except Exception as e:
+                delay = self._next_delay(attempt, e, expires_at)
+                if delay is None:
+                    raise
+                self._count_retry(operation)
+                time.sleep(delay)
+                attempt += 1
+            else:
+                self.breaker.record_success()
+                return result
+
+    async def acall(self, operation, func, *args, **kwargs):
+        """Async variant of call() for a coroutine function."""
+        self.breaker.before_call()
+        expires_at = time.monotonic() + self.deadline
+        attempt = 0
+        while True:
+            timeout = min(self.timeout, expires_at - time.monotonic())
+            try:
+                with self.instrument(operation):
+                    result = await asyncio.wait_for(func(*args, timeout=timeout, **kwargs), timeout)
+            except Exception as e:
+                if isinstance(e, asyncio.TimeoutError):
+                    e = TimeoutError(f"{self.name} {operation} timed out after {timeout:.1f}s")
+                delay = self._next_delay(attempt, e, expires_at)
+                if delay is None:
+                    raise e
+                self._count_retry(operation)
+                await asyncio.sleep(delay)
+                attempt += 1
+            else:
+                self.breaker.record_success()
+                return result
+
+    @contextmanager
+    def guard(self, operation):
+        """
+        Circuit breaker only, for calls that cannot be retried once they have
+        started producing output (e.g. streamed answers).
+        """
+        self.breaker.before_call()
+        try:
+            with self.instrument(operation):
+                yield min(self.timeout, self.deadline)
+        except Exception as e:
+            if self.is_retryable(e):
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+            raise
+        except BaseException:
+            # e.g. the consumer stopped reading a stream; the upstream was answering.
+            self.breaker.record_success()
+            raise
+        else:
+            self.breaker.record_success()
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls: while a call for a key is running, other
+    callers with the same key wait for its result instead of repeating it.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def _count_coalesced(self):
+        registry.counter(
+            'plantdoc_singleflight_coalesced_total', 'Calls that waited for an identical in-flight call.',
+            group=self.name
+        ).inc()
+
+    def do(self, key, func, *args, **kwargs):
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+
+        if not leader:
+            self._count_coalesced()
+            return future.result()
+
+        try:
+            result = func(*args, **kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+
+class AsyncSingleFlight(SingleFlight):
+    """SingleFlight for coroutine functions. Calls are shared within one event loop."""
+
+    async def ado(self, key, func, *args, **kwargs):
+        key = (id(asyncio.get_running_loop()), key)
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func(*args, **kwargs))
+            self._calls[key] = task
+            task.add_done_callback(lambda _: self._calls.pop(key, None))
+        else:
+            self._count_coalesced()
+        # shield() so that one cancelled caller does not cancel the call for the others.
+        return await asyncio.shield(task)
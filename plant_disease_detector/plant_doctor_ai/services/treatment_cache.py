@@ -0,0 +1,144 @@
+# plant_doctor_ai/services/treatment_cache.py
+
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.utils import timezone
+
+from ..models import TreatmentCacheEntry
+from .gemini_service import normalize_language, record_fallback, FALLBACK_TREATMENT_INFO
+from .metrics import registry
+from .providers import gemini_service
+from .resilience import AsyncSingleFlight, SingleFlight
+
+
+class TreatmentCache:
+    """
+    Persistent (disease class, language) -> treatment info cache.
+
+    There are only len(class_names) x len(SUPPORTED_LANGUAGES) possible
+    answers, so they are stored in the database once and served from there.
+    Gemini is only called on a miss, a stale entry, or a version bump.
+
+    Concurrent misses for the same (disease, language) share one Gemini
+    call. When that call fails (or the Gemini circuit is open), an outdated
+    entry is served if there is one, and the fallback text otherwise.
+    """
+
+    def __init__(self):
+        self.inflight = SingleFlight('treatment')
+        self.ainflight = AsyncSingleFlight('treatment')
+
+    @property
+    def version(self):
+        return getattr(settings, 'TREATMENT_CACHE_VERSION', 1)
+
+    @property
+    def ttl(self):
+        days = getattr(settings, 'TREATMENT_CACHE_TTL_DAYS', 30)
+        return timedelta(days=days) if days else None
+
+    def is_fresh(self, entry):
+        if entry.version != self.version:
+            return False
+        return self.ttl is None or entry.updated_at >= timezone.now() - self.ttl
+
+    def get(self, disease_name, language='en'):
+        """Returns the cached treatment info, or None on a miss or stale entry."""
+        language = normalize_language(language)
+        entry = TreatmentCacheEntry.objects.filter(
+            disease_name=disease_name, language=language
+        ).first()
+        hit = entry is not None and self.is_fresh(entry)
+        registry.counter(
+            'plantdoc_treatment_cache_lookups_total', 'Treatment cache lookups.', result='hit' if hit else 'miss'
+        ).inc()
+        return entry.as_treatment_info() if hit else None
+
+    def get_stale(self, disease_name, language='en'):
+        """Returns any stored answer, however old, or None."""
+        entry = TreatmentCacheEntry.objects.filter(
+            disease_name=disease_name, language=normalize_language(language)
+        ).first()
+        if entry is None:
+            return None
+        registry.counter(
+            'plantdoc_treatment_cache_lookups_total', 'Treatment cache lookups.', result='stale'
+        ).inc()
+        return entry.as_treatment_info()
+
+    def fallback(self, disease_name, language, error):
+        """The answer served when Gemini could not be reached."""
+        print(f"Error calling Gemini API for treatment info: {error}")
+        stale = self.get_stale(disease_name, language)
+        if stale is not None:
+            return stale
+        record_fallback('treatment')
+        return dict(FALLBACK_TREATMENT_INFO)
+
+    def set(self, disease_name, language, treatment_info):
+        # One INSERT ... ON CONFLICT DO UPDATE, so that request threads and
+        # enrichment threads storing answers at the same time never hit
+        # SQLite's "database is locked" (as update_or_create's read-then-write can).
+        TreatmentCacheEntry.objects.bulk_create(
+            [TreatmentCacheEntry(
+                disease_name=disease_name,
+                language=normalize_language(language),
+                version=self.version,
+                recommended_treatment=treatment_info.get('recommended_treatment', 'N/A'),
+                prevention_tips=treatment_info.get('prevention_tips', []),
+                expected_recovery_time=treatment_info.get('expected_recovery_time', 'Varies'),
+            )],
+            update_conflicts=True,
+            unique_fields=['disease_name', 'language'],
+            update_fields=[
+                'version', 'recommended_treatment', 'prevention_tips', 'expected_recovery_time', 'updated_at'
+            ],
+        )
+
+    def refresh(self, disease_name, language='en'):
+        """
+        Fetches a fresh answer from Gemini and stores it. Errors propagate so
+        that callers (e.g. the warm-up command) can report them.
+        """
+        language = normalize_language(language)
+        treatment_info = gemini_service.fetch_treatment_info(disease_name, language=language)
+        self.set(disease_name, language, treatment_info)
+        return treatment_info
+
+    def get_treatment_info(self, disease_name, language='en'):
+        """
+        Drop-in replacement for GeminiService.get_treatment_info that serves
+        from the cache and only falls through to Gemini on a miss. A failed
+        Gemini call is not cached.
+        """
+        cached = self.get(disease_name, language)
+        if cached is not None:
+            return cached
+
+        language = normalize_language(language)
+        try:
+            return self.inflight.do((disease_name, language), self.refresh, disease_name, language)
+        except Exception as e:
+            return self.fallback(disease_name, language, e)
+
+    async def arefresh(self, disease_name, language):
+        treatment_info = await gemini_service.afetch_treatment_info(disease_name, language=language)
+        await sync_to_async(self.set)(disease_name, language, treatment_info)
+        return treatment_info
+
+    async def aget_treatment_info(self, disease_name, language='en'):
+        """Async variant of get_treatment_info() that awaits Gemini on a miss."""
+        cached = await sync_to_async(self.get)(disease_name, language)
+        if cached is not None:
+            return cached
+
+        language = normalize_language(language)
+        try:
+            return await self.ainflight.ado((disease_name, language), self.arefresh, disease_name, language)
+        except Exception as e:
+            return await sync_to_async(self.fallback)(disease_name, language, e)
+
+
+treatment_cache = TreatmentCache()
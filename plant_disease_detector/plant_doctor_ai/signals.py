@@ -0,0 +1,12 @@
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from .models import AnalysisResult
+from .services.analytics import forget_analyses
+
+
+@receiver(post_delete, sender=AnalysisResult)
+def remove_from_rollup(sender, instance, **kwargs):
+    # Deleting a user deletes their rollup along with their analyses; if the
+    # rollup went first there is nothing left to update.
+    forget_analyses(instance.user_id, [instance])
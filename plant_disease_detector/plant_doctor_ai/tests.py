@@ -1,3 +1,1378 @@
-from django.test import TestCase
+import asyncio
+import io
+import itertools
+import json
+import os
+import random
+import shutil
+import struct
+import tempfile
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection, connections
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from django.utils.functional import SimpleLazyObject
+from PIL import Image
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from users.models import User
+
+from .benchmarking import latency_summary, percentile
+from .management.commands.eval_chat_prefilter import LABELLED_MESSAGES
+from .models import (
+    AnalysisResult, AnalyticsRollup, ChatMessage, ChatSession, ImageBlob, PredictionMemo, TreatmentCacheEntry
+)
+from .pagination import HistoryCursorPagination
+from .services.admission import AdmissionController, AdmissionRejected
+from .services.analytics import aggregate_analyses, rollup_differences
+from .services.batching import MicroBatcher
+from .services.chat_intents import INTENTS
+from .services.chat_prefilter import ChatPrefilter
+from .services.chat_sessions import append_turn, build_history, compact, schedule_compaction, trim_history
+from .services.content_store import prediction_memo
+from .services.derivatives import derivative_executor
+from .services.fake_gemini import FakeGeminiError, FakeGeminiService
+from .services.gemini_service import CHAT_ERROR_MESSAGE, FALLBACK_TREATMENT_INFO, is_transient_error
+from .services.metrics import registry
+from .services.predictor import BatchedPredictor
+from .services.resilience import AsyncSingleFlight, CallPolicy, CircuitBreaker, CircuitOpenError, SingleFlight
+from .services.treatment_cache import TreatmentCache
+from .throttling import AnalyzeRateThrottle
+from .views import save_analyses
+
+API = '/api/plant_doctor_ai'
+DISEASE = 'Tomato___Leaf_Mold'
+
+
+def image_upload(seed, name='leaf.jpg'):
+    """
+    A small JPEG of random noise. Different seeds give images that differ
+    in both content hash and perceptual hash, so none is deduplicated.
+    """
+    pixels = random.Random(seed).randbytes(64 * 64 * 3)
+    buffer = io.BytesIO()
+    Image.frombytes('RGB', (64, 64), pixels).save(buffer, 'JPEG')
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/jpeg')
+
+
+class FakePredictor(BatchedPredictor):
+    """Runs the real decoding and micro-batching, but predicts DISEASE for every image."""
+
+    model_version = 'test'
+
+    def __init__(self):
+        self.batch_sizes = []
+        self.setup_batching()
+
+    def predict_arrays(self, arrays):
+        self.batch_sizes.append(len(arrays))
+        top_k = [{"disease": DISEASE, "confidence": 0.91}, {"disease": 'Tomato___healthy', "confidence": 0.05}]
+        return [{**top_k[0], "top_k": top_k} for _ in arrays]
+
+
+def fast_policy(timeout=0.2, deadline=1.0, max_retries=2, failure_threshold=5, reset_timeout=30.0):
+    """A Gemini call policy with millisecond backoff, so retries do not slow the tests down."""
+    return CallPolicy(
+        'gemini-test',
+        CircuitBreaker('gemini-test', failure_threshold=failure_threshold, reset_timeout=reset_timeout),
+        timeout=timeout, deadline=deadline, max_retries=max_retries,
+        base_delay=0.001, max_delay=0.005, is_retryable=is_transient_error,
+    )
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class RecordingGeminiService(FakeGeminiService):
+    """Records how many atomic blocks were open on the connection during each treatment call."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.atomic_depths = []
+
+    def fetch_treatment_info(self, disease_name, language='en'):
+        self.atomic_depths.append(len(connection.atomic_blocks))
+        return super().fetch_treatment_info(disease_name, language=language)
+
+
+class RecordingChatGeminiService(FakeGeminiService):
+    """Keeps the history of every chat call."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.histories = []
+
+    def process_chat(self, history, new_message, language='en'):
+        self.histories.append(history)
+        return super().process_chat(history, new_message, language=language)
+
+
+def history_items(count):
+    """A client-side chat history of `count` alternating user/model messages."""
+    return [
+        {"role": 'user' if index % 2 == 0 else 'model', "parts": [{"text": f"Message {index} about my tomatoes."}]}
+        for index in range(count)
+    ]
+
+
+class DistinctDiseasePredictor(FakePredictor):
+    """Predicts a different disease for every image, so each one needs its own treatment."""
+
+    def __init__(self):
+        super().__init__()
+        self.diseases = itertools.count()
+
+    def predict_arrays(self, arrays):
+        predictions = super().predict_arrays(arrays)
+        for prediction in predictions:
+            prediction['disease'] = f"{DISEASE}_{next(self.diseases)}"
+            prediction['top_k'] = [{"disease": prediction['disease'], "confidence": prediction['confidence']}]
+        return predictions
+
+
+class AnalyzeTestMixin:
+    """Runs the analyze views with a fake model and a fake Gemini, against a temporary MEDIA_ROOT."""
+
+    predictor_class = FakePredictor
+    gemini_latency_ms = 0
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp(prefix='plantdoc-test-')
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(
+            MEDIA_ROOT=media_root, ANALYZE_RATE_LIMIT_PER_MINUTE=0, TREATMENT_ENRICHMENT_MODE='inline'
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        # Thumbnails are written on a background thread; let it finish before MEDIA_ROOT goes.
+        self.addCleanup(lambda: derivative_executor.submit(lambda: None).result())
+
+        # Memoized predictions are also kept in memory, where the test rollback cannot reach them.
+        self.addCleanup(prediction_memo.clear)
+
+        self.predictor = self.predictor_class()
+        self.gemini = RecordingGeminiService(latency_ms=self.gemini_latency_ms)
+        for target, service in [
+            ('plant_doctor_ai.views.model_service', self.predictor),
+            ('plant_doctor_ai.async_views.model_service', self.predictor),
+            ('plant_doctor_ai.services.treatment_cache.gemini_service', self.gemini),
+        ]:
+            patcher = mock.patch(target, service)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        self.user = User.objects.create_user('grower@example.com', 'Grower', 'password')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        # Atomic blocks opened by TestCase itself; anything above this was opened by the view.
+        self.test_atomic_depth = len(connection.atomic_blocks)
+
+
+class AnalyzeTestCase(AnalyzeTestMixin, TestCase):
+    pass
+
+
+class AnalyzePlantViewTests(AnalyzeTestCase):
+
+    def test_analyze_returns_prediction_and_treatment(self):
+        response = self.client.post(f'{API}/analyze/', {'image': image_upload(1)}, format='multipart')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['disease'], 'Tomato Leaf Mold')
+        self.assertEqual(response.data['severity'], 'High')
+        self.assertIn('Tomato___Leaf_Mold', response.data['cure'])
+        self.assertEqual(response.data['enrichmentStatus'], AnalysisResult.EnrichmentStatus.COMPLETE)
+        self.user.refresh_from_db()
+        self.assertEqual((self.user.total_uploads, self.user.total_analyzed), (1, 1))
+
+    def test_gemini_is_called_outside_the_transaction(self):
+        self.client.post(f'{API}/analyze/', {'image': image_upload(1)}, format='multipart')
+        self.client.post(f'{API}/analyze/batch/', {'images': [image_upload(2)]}, format='multipart')
+
+        self.assertEqual(self.gemini.calls, 1)
+        self.assertEqual(self.gemini.atomic_depths, [self.test_atomic_depth])
+
+    def test_repeated_image_reuses_prediction_and_treatment(self):
+        for _ in range(2):
+            response = self.client.post(f'{API}/analyze/', {'image': image_upload(1)}, format='multipart')
+            self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(self.predictor.batch_sizes, [1])
+        self.assertEqual(self.gemini.calls, 1)
+        self.assertEqual(AnalysisResult.objects.filter(user=self.user).count(), 2)
+
+    def test_batch_runs_one_forward_pass_and_one_treatment_lookup(self):
+        images = [image_upload(seed, f'leaf_{seed}.jpg') for seed in range(3)]
+        response = self.client.post(f'{API}/analyze/batch/', {'images': images}, format='multipart')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 3)
+        self.assertEqual(self.predictor.batch_sizes, [3])
+        self.assertEqual(self.gemini.calls, 1)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.total_uploads, 3)
+
+    def test_analyze_without_image_is_rejected(self):
+        response = self.client.post(f'{API}/analyze/', {}, format='multipart')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(AnalysisResult.objects.exists())
+
+
+def png_chunk(kind, data):
+    return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+
+
+def png_bomb(width, height):
+    """A PNG that claims the given dimensions but carries only a few bytes of pixel data."""
+    header = struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)
+    return b'\x89PNG\r\n\x1a\n' + png_chunk(b'IHDR', header) + png_chunk(b'IDAT', zlib.compress(bytes(64)))
+
+
+class UploadValidationTests(AnalyzeTestCase):
+
+    def analyze(self, upload):
+        return self.client.post(f'{API}/analyze/', {'image': upload}, format='multipart')
+
+    def assertRejected(self, response, status_code, reason, before):
+        self.assertEqual(response.status_code, status_code)
+        self.assertIn('error', response.data)
+        self.assertEqual(registry.counter('plantdoc_upload_rejections_total', reason=reason).value, before + 1)
+        self.assertEqual(self.predictor.batch_sizes, [])
+        self.assertFalse(ImageBlob.objects.exists())
+
+    def rejections(self, reason):
+        return registry.counter('plantdoc_upload_rejections_total', reason=reason).value
+
+    @override_settings(IMAGE_UPLOAD_MAX_BYTES=1024)
+    def test_oversize_image_is_rejected_while_streaming(self):
+        before = self.rejections('bytes')
+        upload = image_upload(1)
+        # Small enough to pass the Content-Length check, so the handler has to catch it.
+        self.assertLess(upload.size, 64 * 1024)
+
+        self.assertRejected(self.analyze(upload), 413, 'bytes', before)
+
+    def test_file_that_is_not_an_image_is_rejected(self):
+        before = self.rejections('format')
+
+        response = self.analyze(SimpleUploadedFile('leaf.gif', b'GIF89a' + bytes(64), content_type='image/gif'))
+
+        self.assertRejected(response, 415, 'format', before)
+
+    def test_pixel_bomb_is_rejected_from_its_header(self):
+        # Over IMAGE_UPLOAD_MAX_PIXELS, and so large that Pillow itself refuses to open it.
+        for width, height in [(8000, 8000), (100_000, 100_000)]:
+            with self.subTest(width=width, height=height):
+                before = self.rejections('pixels')
+
+                response = self.analyze(SimpleUploadedFile('leaf.png', png_bomb(width, height)))
+
+                self.assertRejected(response, 413, 'pixels', before)
+
+    @override_settings(IMAGE_UPLOAD_MAX_PIXELS=1000)
+    def test_image_with_too_many_pixels_is_rejected(self):
+        before = self.rejections('pixels')
+
+        self.assertRejected(self.analyze(image_upload(1)), 413, 'pixels', before)
+
+    def test_truncated_image_is_rejected(self):
+        before = self.rejections('header')
+        truncated = image_upload(1).read()[:20]
+
+        response = self.analyze(SimpleUploadedFile('leaf.jpg', truncated, content_type='image/jpeg'))
+
+        self.assertRejected(response, 400, 'header', before)
+
+    def test_batch_rejects_a_bad_image(self):
+        response = self.client.post(
+            f'{API}/analyze/batch/',
+            {'images': [image_upload(1), SimpleUploadedFile('notes.txt', b'not an image')]}, format='multipart'
+        )
+
+        self.assertEqual(response.status_code, 415)
+
+    async def test_async_view_rejects_a_bad_image(self):
+        response = await self.async_client.post(
+            f'{API}/async/analyze/', {'image': SimpleUploadedFile('notes.txt', b'not an image')},
+            headers={'Authorization': f'Bearer {AccessToken.for_user(self.user)}'}
+        )
+
+        self.assertEqual(response.status_code, 415)
+
+    def test_other_endpoints_accept_any_file(self):
+        with mock.patch('plant_doctor_ai.views.gemini_service', RecordingChatGeminiService()):
+            response = self.client.post(
+                f'{API}/chat/', {'newMessage': "hello!", 'attachment': SimpleUploadedFile('notes.txt', b'not an image')},
+                format='multipart'
+            )
+
+        self.assertEqual(response.status_code, 200)
+
+
+class ConcurrentAnalyzeTests(AnalyzeTestMixin, TransactionTestCase):
+    """
+    Parallel analyses on request threads, through the real treatment cache.
+    The threads need committed rows, hence TransactionTestCase.
+    """
+
+    predictor_class = DistinctDiseasePredictor
+    gemini_latency_ms = 300
+
+    def analyze(self, seed):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        try:
+            return client.post(f'{API}/analyze/', {'image': image_upload(seed)}, format='multipart').status_code
+        finally:
+            connections.close_all()
+
+    def test_parallel_analyses_overlap_their_gemini_calls(self):
+        requests = 6
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=requests) as executor:
+            statuses = list(executor.map(self.analyze, range(requests)))
+        elapsed = time.perf_counter() - started
+
+        self.assertEqual(statuses, [200] * requests)
+        # Every analysis has its own disease, so each makes its own Gemini call and cache write.
+        self.assertEqual(self.gemini.calls, requests)
+        self.assertEqual(TreatmentCacheEntry.objects.count(), requests)
+        # Serialized behind one another, the calls alone would take requests x 300 ms.
+        self.assertLess(elapsed, requests * self.gemini_latency_ms / 1000 / 2)
+        self.user.refresh_from_db()
+        self.assertEqual((self.user.total_uploads, self.user.total_analyzed), (requests, requests))
+        self.assertEqual(
+            AnalysisResult.objects.filter(enrichment_status=AnalysisResult.EnrichmentStatus.COMPLETE).count(), requests
+        )
+
+
+def parse_events(body):
+    """The (event, data) pairs of a Server-Sent Events body; comments and retry hints are skipped."""
+    events = []
+    for block in body.split('\n\n'):
+        fields = dict(line.split(': ', 1) for line in block.splitlines() if not line.startswith(':'))
+        if 'data' in fields:
+            events.append((fields.get('event', 'message'), json.loads(fields['data'])))
+    return events
+
+
+class BackgroundEnrichmentTests(AnalyzeTestMixin, TransactionTestCase):
+    # Slow enough that the stream starts while the analysis is still pending.
+    gemini_latency_ms = 200
+
+    def analyze_in_background(self):
+        response = self.client.post(
+            f'{API}/analyze/?enrichment=background', {'image': image_upload(1)}, format='multipart'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['enrichmentStatus'], AnalysisResult.EnrichmentStatus.PENDING)
+        return response.data['id']
+
+    def stream(self, analysis_id):
+        response = self.client.get(f'{API}/analysis/{analysis_id}/?stream=true')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        return b''.join(response.streaming_content).decode()
+
+    def test_pending_analysis_is_completed_and_streamed(self):
+        analysis_id = self.analyze_in_background()
+
+        events = parse_events(self.stream(analysis_id))
+
+        self.assertEqual([event for event, _ in events], ['done'])
+        result = events[0][1]
+        self.assertEqual(result['id'], analysis_id)
+        self.assertEqual(result['enrichmentStatus'], AnalysisResult.EnrichmentStatus.COMPLETE)
+        self.assertIn(DISEASE, result['cure'])
+        self.assertEqual(self.gemini.calls, 1)
+        analysis = AnalysisResult.objects.get(pk=analysis_id)
+        self.assertEqual(analysis.enrichment_status, AnalysisResult.EnrichmentStatus.COMPLETE)
+
+    def test_gemini_outage_marks_the_analysis_failed(self):
+        self.gemini.error_rate = 1.0
+        self.gemini.policy = fast_policy(max_retries=0)
+        analysis_id = self.analyze_in_background()
+
+        events = parse_events(self.stream(analysis_id))
+
+        self.assertEqual([event for event, _ in events], ['done'])
+        self.assertEqual(events[0][1]['enrichmentStatus'], AnalysisResult.EnrichmentStatus.FAILED)
+        analysis = AnalysisResult.objects.get(pk=analysis_id)
+        self.assertEqual(analysis.enrichment_status, AnalysisResult.EnrichmentStatus.FAILED)
+        self.assertEqual(analysis.recommended_treatment, FALLBACK_TREATMENT_INFO['recommended_treatment'])
+
+    @override_settings(ENRICHMENT_STREAM_TIMEOUT_SECONDS=0.2, ENRICHMENT_POLL_INTERVAL_SECONDS=0.05)
+    def test_stream_times_out_while_still_pending(self):
+        # Not queued in this process, e.g. left pending by a restart.
+        analysis = AnalysisResult.objects.create(
+            user=self.user, disease_name=DISEASE, confidence=0.9, image='analyses/leaf.jpg',
+            enrichment_status=AnalysisResult.EnrichmentStatus.PENDING
+        )
+
+        started = time.monotonic()
+        body = self.stream(analysis.pk)
+
+        self.assertLess(time.monotonic() - started, 2)
+        self.assertTrue(body.startswith('retry: '))
+        self.assertEqual(
+            parse_events(body), [('timeout', {"id": analysis.pk, "enrichmentStatus": 'pending'})]
+        )
+
+    def test_poll_returns_the_analysis_without_a_stream(self):
+        analysis_id = self.analyze_in_background()
+        self.stream(analysis_id)
+
+        response = self.client.get(f'{API}/analysis/{analysis_id}/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['enrichmentStatus'], AnalysisResult.EnrichmentStatus.COMPLETE)
+
+
+class AsyncAnalyzePlantViewTests(AnalyzeTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.auth_headers = {'Authorization': f'Bearer {AccessToken.for_user(self.user)}'}
+
+    async def test_concurrent_analyses_are_all_saved(self):
+        responses = await asyncio.gather(*[
+            self.async_client.post(
+                f'{API}/async/analyze/', {'image': image_upload(seed, f'leaf_{seed}.jpg')}, headers=self.auth_headers
+            )
+            for seed in range(6)
+        ])
+
+        self.assertEqual([response.status_code for response in responses], [200] * 6)
+        self.assertEqual(sum(self.predictor.batch_sizes), 6)
+        # Concurrent misses for the same disease share one Gemini call, or hit the cache it filled.
+        self.assertEqual(self.gemini.calls, 1)
+        user = await User.objects.aget(pk=self.user.pk)
+        self.assertEqual((user.total_uploads, user.total_analyzed), (6, 6))
+        self.assertEqual(await AnalysisResult.objects.filter(user=self.user).acount(), 6)
+
+    async def test_model_service_is_built_off_the_event_loop(self):
+        built_on = []
+
+        def build():
+            built_on.append(threading.current_thread())
+            return self.predictor
+
+        with mock.patch('plant_doctor_ai.async_views.model_service', SimpleLazyObject(build)):
+            response = await self.async_client.post(
+                f'{API}/async/analyze/', {'image': image_upload(1)}, headers=self.auth_headers
+            )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(built_on), 1)
+        self.assertIsNot(built_on[0], threading.current_thread())
+
+    async def test_requires_a_token(self):
+        response = await self.async_client.post(f'{API}/async/analyze/', {'image': image_upload(1)})
+
+        self.assertEqual(response.status_code, 401)
+
+
+def wait_until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("Timed out waiting for a condition.")
+        time.sleep(0.005)
+
+
+class AdmissionControllerTests(TestCase):
+
+    def controller(self, max_in_flight=1, max_queue=1, queue_timeout=5):
+        return AdmissionController(
+            f'test-{self.id()}', max_in_flight=max_in_flight, max_queue=max_queue, queue_timeout=queue_timeout
+        )
+
+    def test_full_queue_is_rejected_with_a_retry_after_from_the_service_time(self):
+        controller = self.controller(max_in_flight=1, max_queue=0)
+        controller.acquire()
+        controller.release(service_time=2.5)
+        controller.acquire()
+
+        with self.assertRaises(AdmissionRejected) as rejected:
+            controller.acquire()
+
+        self.assertEqual(rejected.exception.reason, 'queue_full')
+        self.assertEqual(rejected.exception.retry_after, 3)
+        with self.assertRaises(AdmissionRejected):
+            controller.check()
+        self.assertEqual(controller.in_flight_gauge.value, 1)
+
+    def test_queued_request_times_out_without_taking_a_slot(self):
+        controller = self.controller(queue_timeout=0.05)
+        controller.acquire()
+
+        with self.assertRaises(AdmissionRejected) as rejected:
+            controller.acquire()
+
+        self.assertEqual(rejected.exception.reason, 'queue_timeout')
+        self.assertEqual((controller.in_flight_gauge.value, controller.queue_gauge.value), (1, 0))
+        controller.release()
+        self.assertEqual(controller.in_flight_gauge.value, 0)
+
+    def test_released_slots_go_to_waiters_in_arrival_order(self):
+        controller = self.controller(max_queue=3)
+        controller.acquire()
+        admitted = []
+
+        def request(number):
+            with controller.admit():
+                admitted.append(number)
+
+        threads = []
+        for number in range(3):
+            thread = threading.Thread(target=request, args=(number,))
+            thread.start()
+            threads.append(thread)
+            wait_until(lambda: controller.queue_gauge.value == number + 1)
+        controller.release()
+        for thread in threads:
+            thread.join(timeout=5)
+
+        self.assertEqual(admitted, [0, 1, 2])
+        self.assertEqual((controller.in_flight_gauge.value, controller.queue_gauge.value), (0, 0))
+
+    async def test_async_waiter_gets_the_released_slot(self):
+        controller = self.controller()
+        await controller.aacquire()
+        waiter = asyncio.ensure_future(controller.aacquire())
+        await asyncio.sleep(0.01)
+
+        self.assertFalse(waiter.done())
+        controller.release()
+        await asyncio.wait_for(waiter, 1)
+        self.assertEqual(controller.in_flight_gauge.value, 1)
+
+    def test_analyze_returns_503_with_retry_after_when_the_queue_is_full(self):
+        controller = self.controller(max_in_flight=1, max_queue=0)
+        controller.acquire()
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user('grower@example.com', 'Grower', 'password'))
+
+        with mock.patch('plant_doctor_ai.views.inference_admission', controller):
+            response = client.post(f'{API}/analyze/', {'image': image_upload(1)}, format='multipart')
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '1')
+
+
+@override_settings(ANALYZE_RATE_LIMIT_PER_MINUTE=6, ANALYZE_RATE_LIMIT_BURST=2)
+class AnalyzeRateThrottleTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.clock = FakeClock()
+        self.clock.now = 1000.0
+        patcher = mock.patch('plant_doctor_ai.throttling.time', mock.Mock(time=self.clock))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_empty_bucket_waits_for_the_next_token(self):
+        throttle = AnalyzeRateThrottle()
+
+        self.assertTrue(throttle.consume(1, view='analyze'))
+        self.assertTrue(throttle.consume(1, view='analyze'))
+        self.assertFalse(throttle.consume(1, view='analyze'))
+        # One token every 10 seconds at 6 per minute.
+        self.assertAlmostEqual(throttle.wait(), 10)
+
+        self.clock.now += 4
+        self.assertFalse(throttle.consume(1, view='analyze'))
+        self.assertAlmostEqual(throttle.wait(), 6)
+        self.clock.now += 6
+        self.assertTrue(throttle.consume(1, view='analyze'))
+
+    def test_buckets_are_per_user(self):
+        throttle = AnalyzeRateThrottle()
+        for _ in range(2):
+            throttle.consume(1, view='analyze')
+
+        self.assertTrue(throttle.consume(2, view='analyze'))
+
+    def test_analyze_returns_429_with_retry_after(self):
+        user = User.objects.create_user('grower@example.com', 'Grower', 'password')
+        client = APIClient()
+        client.force_authenticate(user)
+        rejected = registry.counter('plantdoc_rate_limited_total', view='analyze-plant')
+        before = rejected.value
+        throttle = AnalyzeRateThrottle()
+        for _ in range(2):
+            throttle.consume(user.pk, view='analyze-plant')
+
+        response = client.post(f'{API}/analyze/', {'image': image_upload(1)}, format='multipart')
+
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '10')
+        self.assertEqual(rejected.value, before + 1)
+
+class BenchmarkingTests(TestCase):
+
+    def test_percentile_uses_nearest_rank(self):
+        values = [5, 1, 4, 2, 3]
+        self.assertEqual(percentile(values, 50), 3)
+        self.assertEqual(percentile(values, 99), 5)
+        self.assertEqual(percentile(values, 0), 1)
+        self.assertEqual(percentile([], 50), 0.0)
+
+    def test_latency_summary_is_in_milliseconds(self):
+        summary = latency_summary([0.001, 0.002, 0.003])
+
+        self.assertEqual(summary, {"samples": 3, "p50_ms": 2.0, "p99_ms": 3.0, "mean_ms": 2.0})
+
+    def test_forward_benchmark_writes_a_json_report_and_compares_it(self):
+        workdir = tempfile.mkdtemp(prefix='plantdoc-test-')
+        self.addCleanup(shutil.rmtree, workdir, ignore_errors=True)
+        with open(os.path.join(workdir, 'class_names.json'), 'w') as f:
+            json.dump(['Tomato___healthy', DISEASE], f)
+        report_path = os.path.join(workdir, 'report.json')
+
+        with override_settings(MODEL_ARTIFACTS_DIR=workdir):
+            call_command(
+                'run_benchmarks', only=['forward'], batch_sizes=[1, 2], iterations=2,
+                output=report_path, stderr=io.StringIO()
+            )
+            with open(report_path) as f:
+                report = json.load(f)
+            self.assertEqual(set(report['results']), {'forward'})
+            self.assertEqual(set(report['results']['forward']), {'1', '2'})
+            self.assertEqual(report['results']['forward']['2']['samples'], 2)
+            self.assertEqual(report['meta']['iterations'], 2)
+
+            stderr = io.StringIO()
+            call_command(
+                'run_benchmarks', only=['forward'], batch_sizes=[1], iterations=1,
+                compare=report_path, stdout=io.StringIO(), stderr=stderr
+            )
+        self.assertIn('forward/1:', stderr.getvalue())
+        self.assertNotIn('forward/2:', stderr.getvalue())
+
+
+class MetricsTests(TestCase):
+
+    def test_metrics_are_disabled_without_a_token(self):
+        with override_settings(METRICS_TOKEN=''):
+            response = self.client.get(f'{API}/metrics/')
+
+        self.assertEqual(response.status_code, 404)
+
+    @override_settings(METRICS_TOKEN='scrape-me')
+    def test_metrics_require_the_token(self):
+        self.assertEqual(self.client.get(f'{API}/metrics/').status_code, 401)
+        self.assertEqual(
+            self.client.get(f'{API}/metrics/', headers={'Authorization': 'Bearer wrong'}).status_code, 401
+        )
+
+        response = self.client.get(f'{API}/metrics/', headers={'Authorization': 'Bearer scrape-me'})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('plantdoc_http_request_seconds', response.content.decode())
+
+    def test_requests_are_recorded_by_view_and_method(self):
+        responses = registry.counter('plantdoc_http_responses_total', view='metrics', method='GET', status=404)
+        unknown = registry.counter('plantdoc_http_responses_total', view='metrics', method='other', status=405)
+        responses_before, unknown_before = responses.value, unknown.value
+
+        with override_settings(METRICS_TOKEN=''):
+            self.client.get(f'{API}/metrics/')
+            self.client.generic('BREW', f'{API}/metrics/')
+            self.client.generic('PROPFIND', f'{API}/metrics/')
+
+        self.assertEqual(responses.value - responses_before, 1)
+        # Arbitrary client-sent verbs share one label instead of each creating a series.
+        self.assertEqual(unknown.value - unknown_before, 2)
+        self.assertNotIn('method="BREW"', registry.render())
+
+
+class CircuitBreakerTests(TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.breaker = CircuitBreaker('test', failure_threshold=3, reset_timeout=10, clock=self.clock)
+
+    def test_opens_after_consecutive_failures(self):
+        for _ in range(2):
+            self.breaker.record_failure()
+        self.breaker.record_success()
+        for _ in range(2):
+            self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        self.clock.now = 4
+        with self.assertRaises(CircuitOpenError) as raised:
+            self.breaker.before_call()
+        self.assertEqual(raised.exception.retry_after, 6)
+
+    def test_half_open_lets_one_trial_through(self):
+        for _ in range(3):
+            self.breaker.record_failure()
+        self.clock.now = 10
+        self.assertEqual(self.breaker.state, CircuitBreaker.HALF_OPEN)
+
+        self.breaker.before_call()
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.before_call()
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+
+    def test_failed_trial_reopens(self):
+        for _ in range(3):
+            self.breaker.record_failure()
+        self.clock.now = 10
+        self.breaker.before_call()
+        self.breaker.record_failure()
+
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        self.clock.now = 19
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+
+
+class CallPolicyTests(TestCase):
+
+    def flaky(self, failures, exc=ConnectionError):
+        """A function that raises `exc` for its first `failures` calls."""
+        calls = []
+
+        def call(timeout):
+            calls.append(timeout)
+            if len(calls) <= failures:
+                raise exc("upstream failed")
+            return 'answer'
+        return call, calls
+
+    def test_retries_transient_errors(self):
+        policy = fast_policy(max_retries=2)
+        call, calls = self.flaky(2)
+
+        self.assertEqual(policy.call('treatment', call), 'answer')
+        self.assertEqual(len(calls), 3)
+        self.assertTrue(all(0 < timeout <= policy.timeout for timeout in calls))
+        self.assertEqual(policy.breaker.state, CircuitBreaker.CLOSED)
+
+    def test_gives_up_after_the_last_retry(self):
+        policy = fast_policy(max_retries=2, failure_threshold=1)
+        call, calls = self.flaky(3)
+
+        with self.assertRaises(ConnectionError):
+            policy.call('treatment', call)
+        self.assertEqual(len(calls), 3)
+        self.assertEqual(policy.breaker.state, CircuitBreaker.OPEN)
+        with self.assertRaises(CircuitOpenError):
+            policy.call('treatment', call)
+        self.assertEqual(len(calls), 3)
+
+    def test_does_not_retry_bad_answers(self):
+        policy = fast_policy(failure_threshold=1)
+        call, calls = self.flaky(1, exc=ValueError)
+
+        with self.assertRaises(ValueError):
+            policy.call('treatment', call)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(policy.breaker.state, CircuitBreaker.CLOSED)
+
+    def test_async_calls_time_out(self):
+        async def hang(timeout):
+            await asyncio.sleep(10)
+
+        policy = fast_policy(timeout=0.02, deadline=0.1, max_retries=1)
+        started = time.monotonic()
+        with self.assertRaises(TimeoutError):
+            asyncio.run(policy.acall('chat', hang))
+        self.assertLess(time.monotonic() - started, 1)
+
+
+class FakeGeminiFaultTests(TestCase):
+
+    def test_slow_upstream_falls_back_within_the_deadline(self):
+        gemini = FakeGeminiService(latency_ms=2000, policy=fast_policy(timeout=0.05, deadline=0.2))
+
+        started = time.monotonic()
+        self.assertEqual(gemini.process_chat([], 'hello'), CHAT_ERROR_MESSAGE)
+        self.assertLess(time.monotonic() - started, 1)
+        self.assertGreater(gemini.calls, 1)
+
+    def test_flaky_upstream_is_retried(self):
+        gemini = FakeGeminiService(error_rate=0.3, seed=0, policy=fast_policy(max_retries=3))
+
+        answers = [gemini.get_treatment_info(DISEASE) for _ in range(50)]
+        fallbacks = sum(answer == FALLBACK_TREATMENT_INFO for answer in answers)
+        # With 3 retries a call only fails if 4 attempts in a row do (0.3^4, under 1%).
+        self.assertLessEqual(fallbacks, 2)
+        self.assertGreater(gemini.calls, 50)
+
+    def test_outage_opens_the_circuit(self):
+        gemini = FakeGeminiService(error_rate=1.0, policy=fast_policy(max_retries=1, failure_threshold=3))
+
+        answers = [gemini.get_treatment_info(DISEASE) for _ in range(10)]
+        self.assertEqual(answers, [FALLBACK_TREATMENT_INFO] * 10)
+        # Three calls of two attempts open the circuit; the other seven never reach the upstream.
+        self.assertEqual(gemini.calls, 6)
+        with self.assertRaises(CircuitOpenError):
+            gemini.fetch_treatment_info(DISEASE)
+
+
+class SingleFlightTests(TestCase):
+
+    def test_concurrent_calls_share_one_call(self):
+        flight = SingleFlight('test')
+        release = threading.Event()
+        calls = []
+
+        def slow_lookup(key):
+            calls.append(key)
+            release.wait(5)
+            return f'answer for {key}'
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(flight.do('tomato', slow_lookup, 'tomato')))
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        # Give the followers time to find the leader's call in flight.
+        time.sleep(0.1)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual(calls, ['tomato'])
+        self.assertEqual(results, ['answer for tomato'] * 5)
+
+    def test_async_calls_share_one_call_and_errors(self):
+        flight = AsyncSingleFlight('test')
+        calls = []
+
+        async def failing_lookup():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            raise FakeGeminiError("down")
+
+        async def run():
+            return await asyncio.gather(
+                *[flight.ado('tomato', failing_lookup) for _ in range(5)], return_exceptions=True
+            )
+
+        results = asyncio.run(run())
+        self.assertEqual(len(calls), 1)
+        self.assertTrue(all(isinstance(result, FakeGeminiError) for result in results))
+
+
+class TreatmentCacheFallbackTests(TestCase):
+
+    def setUp(self):
+        self.cache = TreatmentCache()
+
+    def lookup(self, gemini):
+        with mock.patch('plant_doctor_ai.services.treatment_cache.gemini_service', gemini):
+            return self.cache.get_treatment_info(DISEASE, language='en')
+
+    def test_outage_serves_an_outdated_entry(self):
+        TreatmentCacheEntry.objects.create(
+            disease_name=DISEASE, language='en', version=0, recommended_treatment='Last known treatment'
+        )
+
+        treatment = self.lookup(FakeGeminiService(error_rate=1.0, policy=fast_policy(max_retries=0)))
+        self.assertEqual(treatment['recommended_treatment'], 'Last known treatment')
+
+    def test_outage_without_an_entry_serves_the_fallback(self):
+        treatment = self.lookup(FakeGeminiService(error_rate=1.0, policy=fast_policy(max_retries=0)))
+
+        self.assertEqual(treatment, FALLBACK_TREATMENT_INFO)
+        self.assertFalse(TreatmentCacheEntry.objects.exists())
+
+    def test_refresh_overwrites_an_outdated_entry(self):
+        TreatmentCacheEntry.objects.create(
+            disease_name=DISEASE, language='en', version=0, recommended_treatment='Last known treatment'
+        )
+        TreatmentCacheEntry.objects.update(updated_at=timezone.now() - timedelta(days=365))
+        gemini = FakeGeminiService(policy=fast_policy())
+
+        treatment = self.lookup(gemini)
+        entry = TreatmentCacheEntry.objects.get()
+        self.assertEqual(entry.version, self.cache.version)
+        self.assertEqual(entry.recommended_treatment, treatment['recommended_treatment'])
+        self.assertTrue(self.cache.is_fresh(entry))
+        self.assertEqual(self.lookup(gemini), entry.as_treatment_info())
+        self.assertEqual(gemini.calls, 1)
+
+    def test_answers_are_cached(self):
+        gemini = FakeGeminiService(policy=fast_policy())
+        first, second = self.lookup(gemini), self.lookup(gemini)
+
+        self.assertEqual(first['recommended_treatment'], second['recommended_treatment'])
+        self.assertEqual(gemini.calls, 1)
+
+
+@override_settings(CHAT_CONTEXT_TOKEN_BUDGET=60, CHAT_KEEP_RECENT_MESSAGES=2, CHAT_SUMMARY_MAX_TOKENS=100)
+class ChatSessionTests(TestCase):
+
+    def setUp(self):
+        self.gemini = RecordingChatGeminiService()
+        patcher = mock.patch('plant_doctor_ai.services.chat_sessions.gemini_service', self.gemini)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        # Compaction is run directly here; ChatSessionBackgroundTests covers the thread.
+        patcher = mock.patch('plant_doctor_ai.services.chat_sessions.schedule_compaction')
+        self.schedule_compaction = patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.user = User.objects.create_user('grower@example.com', 'Grower', 'password')
+        self.session = ChatSession.objects.create(user=self.user)
+
+    def add_turns(self, count):
+        for index in range(count):
+            append_turn(
+                self.session, f"Why are the leaves of plant {index} turning yellow?",
+                f"Plant {index} probably needs less water. Check the drainage of its pot."
+            )
+
+    def unfolded_tokens(self):
+        return sum(self.session.messages.filter(id__gt=self.session.summarized_until).values_list('tokens', flat=True))
+
+    def test_over_budget_session_is_scheduled_for_compaction(self):
+        self.add_turns(1)
+        self.schedule_compaction.assert_not_called()
+
+        self.add_turns(2)
+        self.schedule_compaction.assert_called_with(self.session.id)
+        self.assertEqual(self.session.message_count, 6)
+
+    def test_compaction_folds_all_but_the_recent_messages(self):
+        self.add_turns(4)
+
+        self.assertEqual(compact(self.session), 6)
+        self.assertTrue(self.session.summary)
+        self.assertEqual(self.session.context_tokens, self.unfolded_tokens())
+        self.assertLessEqual(self.session.context_tokens, 60)
+
+        history = build_history(self.session)
+        self.assertEqual(len(history), 4)
+        self.assertTrue(history[0]['parts'][0]['text'].endswith(self.session.summary))
+        self.assertEqual(history[-1]['parts'][0]['text'], self.session.messages.last().text)
+        self.assertEqual(compact(self.session), 0)
+
+    @override_settings(CHAT_KEEP_RECENT_MESSAGES=3)
+    def test_kept_messages_start_with_a_user_turn(self):
+        self.add_turns(4)
+
+        self.assertEqual(compact(self.session), 4)
+        roles = [item['role'] for item in build_history(self.session)]
+        self.assertEqual(roles, ['user', 'model', 'user', 'model', 'user', 'model'])
+
+    def test_compaction_without_gemini_keeps_a_local_summary(self):
+        self.gemini.error_rate = 1.0
+        self.add_turns(4)
+
+        self.assertEqual(compact(self.session), 6)
+        self.assertIn("user: Why are the leaves of plant 0 turning yellow?", self.session.summary)
+        self.assertLessEqual(len(self.session.summary), 400)
+
+    def test_turns_stored_while_summarizing_are_kept(self):
+        self.add_turns(4)
+        summarize = self.gemini.summarize_chat
+
+        def summarize_during_a_turn(*args, **kwargs):
+            self.add_turns(1)
+            return summarize(*args, **kwargs)
+
+        with mock.patch.object(self.gemini, 'summarize_chat', summarize_during_a_turn):
+            compact(self.session)
+
+        self.assertEqual(self.session.context_tokens, self.unfolded_tokens())
+        self.assertEqual(len(build_history(self.session)), 6)
+
+    def test_only_one_of_two_racing_compactions_applies(self):
+        self.add_turns(4)
+        stale = ChatSession.objects.get(pk=self.session.pk)
+
+        self.assertEqual(compact(self.session), 6)
+        self.assertEqual(compact(stale), 0)
+        self.session.refresh_from_db()
+        self.assertEqual(self.session.context_tokens, self.unfolded_tokens())
+
+    def test_session_chat_sends_the_bounded_history(self):
+        self.add_turns(4)
+        compact(self.session)
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        with mock.patch('plant_doctor_ai.views.gemini_service', self.gemini):
+            response = client.post(
+                f'{API}/chat/', {'sessionId': str(self.session.id), 'newMessage': 'Should I repot my tomato?'},
+                format='json'
+            )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(self.gemini.histories[-1]), 4)
+        self.assertEqual(self.session.messages.count(), 10)
+
+
+class ChatHistoryTrimTests(TestCase):
+
+    def test_keeps_the_newest_messages_starting_with_a_user_message(self):
+        history = history_items(7)
+
+        self.assertEqual(trim_history(history, 10), history)
+        self.assertEqual(trim_history(history, 4), history[4:])
+        self.assertEqual(trim_history(history, 3), history[4:])
+        self.assertEqual(trim_history(history, 0), [])
+
+    @override_settings(CHAT_MAX_HISTORY_MESSAGES=40)
+    def test_long_client_history_is_trimmed_before_gemini(self):
+        gemini = RecordingChatGeminiService()
+        user = User.objects.create_user('grower@example.com', 'Grower', 'password')
+        client = APIClient()
+        client.force_authenticate(user)
+
+        with mock.patch('plant_doctor_ai.views.gemini_service', gemini):
+            response = client.post(
+                f'{API}/chat/', {'history': history_items(120), 'newMessage': 'How do I treat early blight?'},
+                format='json'
+            )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(gemini.histories[0]), 40)
+        self.assertEqual(gemini.histories[0][0]['role'], 'user')
+
+
+@override_settings(CHAT_CONTEXT_TOKEN_BUDGET=40, CHAT_KEEP_RECENT_MESSAGES=2)
+class ChatSessionBackgroundTests(TransactionTestCase):
+    """The compaction thread needs committed rows, hence TransactionTestCase."""
+
+    def test_compaction_runs_once_in_the_background(self):
+        gemini = FakeGeminiService(latency_ms=100)
+        user = User.objects.create_user('grower@example.com', 'Grower', 'password')
+        session = ChatSession.objects.create(user=user)
+        with mock.patch('plant_doctor_ai.services.chat_sessions.schedule_compaction'):
+            for index in range(4):
+                append_turn(session, f"Question {index} about my basil?", f"Answer {index}: water it less often.")
+
+        with mock.patch('plant_doctor_ai.services.chat_sessions.gemini_service', gemini):
+            future = schedule_compaction(session.id)
+            self.assertIsNone(schedule_compaction(session.id))
+            self.assertEqual(future.result(timeout=10), 6)
+
+            # Once done, the session can be scheduled again, and is now under budget.
+            self.assertEqual(schedule_compaction(session.id).result(timeout=10), 0)
+
+        session.refresh_from_db()
+        self.assertEqual(gemini.calls, 1)
+        self.assertEqual(ChatMessage.objects.filter(session=session, id__gt=session.summarized_until).count(), 2)
+
+
+class ChatPrefilterTests(TestCase):
+
+    def setUp(self):
+        self.prefilter = ChatPrefilter()
+
+    def test_pest_and_symptom_questions_reach_gemini(self):
+        for message in [
+            "How to get rid of aphids",
+            "how to get rid of mealybugs on my plant",
+            "How can I save my dying plant",
+            "what is the history of potato famine",
+        ]:
+            with self.subTest(message=message):
+                self.assertEqual(self.prefilter.classify(message)[0], None)
+
+    def test_account_questions_are_answered_locally(self):
+        self.assertEqual(self.prefilter.classify("how do I delete my account")[0], 'account')
+
+    def test_no_labelled_plant_question_is_kept_from_gemini(self):
+        for message, expected in LABELLED_MESSAGES:
+            if expected is None:
+                with self.subTest(message=message):
+                    self.assertEqual(self.prefilter.classify(message)[0], None)
+
+    def test_most_labelled_messages_are_routed_correctly(self):
+        correct = sum(self.prefilter.classify(message)[0] == expected for message, expected in LABELLED_MESSAGES)
+
+        self.assertGreaterEqual(correct / len(LABELLED_MESSAGES), 0.9)
+
+    def test_answers_are_in_the_requested_language(self):
+        self.assertEqual(self.prefilter.answer("hello!", 'es'), INTENTS['greeting']['answers']['es'])
+        self.assertEqual(self.prefilter.answer("hello!", 'xx'), INTENTS['greeting']['answers']['en'])
+        self.assertIsNone(self.prefilter.answer("My tomato leaves have yellow spots, what should I do?", 'en'))
+
+    def test_greeting_with_a_question_reaches_gemini(self):
+        self.assertEqual(self.prefilter.classify("hello, my pepper plant has curling leaves")[0], None)
+
+    def test_thanks_is_not_answered_with_a_greeting(self):
+        for message in ["thanks!", "merci beaucoup", "शुक्रिया"]:
+            with self.subTest(message=message):
+                self.assertEqual(self.prefilter.classify(message)[0], 'thanks')
+        self.assertEqual(self.prefilter.classify("thanks, and how do I stop the mildew on my roses?")[0], None)
+
+    @override_settings(IMAGE_UPLOAD_MAX_BYTES=5 * 1024 * 1024)
+    def test_upload_answer_follows_the_upload_limits(self):
+        answer = self.prefilter.answer("how do I upload a photo", 'en')
+
+        self.assertIn("JPEG, PNG, WEBP images up to 5MB", answer)
+        self.assertNotIn("{", answer)
+
+    @override_settings(CHAT_PREFILTER_ENABLED=False)
+    def test_can_be_disabled(self):
+        self.assertIsNone(self.prefilter.answer("tell me a funny joke"))
+
+    def test_eval_command_passes(self):
+        stdout = io.StringIO()
+        try:
+            call_command('eval_chat_prefilter', stdout=stdout)
+        except CommandError:
+            self.fail(f"Plant questions were kept from Gemini:\n{stdout.getvalue()}")
+        self.assertIn("0 plant question(s) kept from Gemini", stdout.getvalue())
+
+
+class ChatbotPrefilterViewTests(TestCase):
+
+    def setUp(self):
+        self.gemini = RecordingChatGeminiService()
+        patcher = mock.patch('plant_doctor_ai.views.gemini_service', self.gemini)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user('grower@example.com', 'Grower', 'password'))
+
+    def chat(self, message, language='en'):
+        return self.client.post(
+            f'{API}/chat/', {'newMessage': message}, format='json', headers={'Language': language}
+        )
+
+    def test_off_topic_message_is_answered_without_gemini(self):
+        response = self.chat("Write a python script to sort a list", 'fr')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['response'], INTENTS['off_topic']['answers']['fr'])
+        self.assertEqual(self.gemini.calls, 0)
+
+    def test_plant_question_goes_to_gemini(self):
+        response = self.chat("how do I kill spider mites")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("spider mites", response.data['response'])
+        self.assertEqual(self.gemini.calls, 1)
+
+
+class MicroBatcherTests(TestCase):
+
+    def batcher(self, run_batch=None, **kwargs):
+        self.batches = []
+
+        def record(items):
+            self.batches.append(list(items))
+            return [item * 10 for item in items]
+
+        return MicroBatcher(run_batch or record, name=f'test_{self._testMethodName}', **kwargs)
+
+    def test_concurrent_items_share_a_batch(self):
+        batcher = self.batcher(max_batch_size=4, max_wait_ms=500)
+
+        started = time.perf_counter()
+        futures = [batcher.submit(item) for item in range(4)]
+        self.assertEqual([future.result(timeout=5) for future in futures], [0, 10, 20, 30])
+        # A full batch runs at once rather than waiting out max_wait_ms.
+        self.assertLess(time.perf_counter() - started, 0.4)
+        self.assertEqual(self.batches, [[0, 1, 2, 3]])
+
+    def test_partial_batch_runs_after_the_wait(self):
+        batcher = self.batcher(max_batch_size=8, max_wait_ms=30)
+
+        started = time.perf_counter()
+        self.assertEqual(batcher(7), 70)
+        self.assertGreaterEqual(time.perf_counter() - started, 0.025)
+        self.assertEqual(self.batches, [[7]])
+
+        stats = batcher.stats()
+        self.assertEqual(stats['batch_size']['count'], 1)
+        self.assertEqual(stats['queue_wait_seconds']['count'], 1)
+        # Recorded in seconds, like the other latency histograms.
+        self.assertLess(stats['queue_wait_seconds']['sum'], 1)
+
+    def test_a_failed_batch_fails_every_waiter(self):
+        def broken(items):
+            raise ValueError("model crashed")
+
+        batcher = self.batcher(broken, max_batch_size=3, max_wait_ms=500)
+        futures = [batcher.submit(item) for item in range(3)]
+        for future in futures:
+            with self.assertRaises(ValueError):
+                future.result(timeout=5)
+
+    def test_a_short_result_list_fails_every_waiter(self):
+        calls = []
+
+        def short(items):
+            calls.append(len(items))
+            return [0] if len(calls) == 1 else [item for item in items]
+
+        batcher = self.batcher(short, max_batch_size=2, max_wait_ms=500)
+        futures = [batcher.submit(item) for item in range(2)]
+        for future in futures:
+            with self.assertRaises(RuntimeError):
+                future.result(timeout=5)
+        # The worker survives the failure and serves the next batch.
+        self.assertEqual(batcher.submit(5).result(timeout=5), 5)
+
+    def test_rejects_an_empty_batch_size(self):
+        with self.assertRaises(ValueError):
+            MicroBatcher(lambda items: items, max_batch_size=0)
+
+
+class PredictionMemoTests(TestCase):
+
+    def setUp(self):
+        self.addCleanup(prediction_memo.clear)
+        self.blob = ImageBlob(sha256='a' * 64, size=1)
+
+    def test_set_inserts_and_then_overwrites(self):
+        prediction_memo.set(self.blob, 'v1', {"disease": DISEASE, "confidence": 0.5})
+        prediction_memo.set(self.blob, 'v1', {"disease": 'Tomato___healthy', "confidence": 0.8, "top_k": []})
+        prediction_memo.set(self.blob, 'v2', {"disease": DISEASE, "confidence": 0.7})
+
+        self.assertEqual(PredictionMemo.objects.count(), 2)
+        prediction_memo.clear()
+        self.assertEqual(prediction_memo.get(self.blob, 'v1')['disease'], 'Tomato___healthy')
+        self.assertEqual(prediction_memo.get(self.blob, 'v2')['confidence'], 0.7)
+
+
+class AnalyticsRollupTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user('grower@example.com', 'Grower', 'password')
+
+    def save(self, *predictions):
+        return save_analyses(self.user, [
+            AnalysisResult(
+                user=self.user, disease_name=disease, confidence=confidence, severity=severity,
+                image=f'analyses/{disease}.jpg'
+            )
+            for disease, confidence, severity in predictions
+        ])
+
+    def assertRollupMatchesRows(self):
+        rollup = AnalyticsRollup.objects.get(user=self.user)
+        self.assertEqual(rollup_differences(rollup, aggregate_analyses(self.user)), [])
+        return rollup
+
+    def test_rollup_follows_added_and_deleted_analyses(self):
+        first = self.save(
+            (DISEASE, 0.95, AnalysisResult.Severity.HIGH),
+            ('Tomato___healthy', 0.6, AnalysisResult.Severity.LOW),
+        )
+        self.save(
+            (DISEASE, 0.8, AnalysisResult.Severity.MEDIUM),
+            ('Potato___Early_blight', 0.91, AnalysisResult.Severity.HIGH),
+        )
+        self.assertEqual(self.assertRollupMatchesRows().total_analyzed, 4)
+
+        first[1].delete()
+        rollup = self.assertRollupMatchesRows()
+        self.assertNotIn('Tomato___healthy', rollup.disease_counts)
+
+        AnalysisResult.objects.filter(disease_name=DISEASE).delete()
+        rollup = self.assertRollupMatchesRows()
+        self.assertEqual(rollup.disease_counts, {'Potato___Early_blight': 1})
+
+        AnalysisResult.objects.all().delete()
+        rollup = self.assertRollupMatchesRows()
+        self.assertEqual((rollup.total_analyzed, rollup.confidence_sum, rollup.severity_counts), (0, 0.0, {}))
+
+    def test_rollup_is_built_from_existing_rows(self):
+        AnalysisResult.objects.create(
+            user=self.user, disease_name=DISEASE, confidence=0.7, severity=AnalysisResult.Severity.LOW,
+            image='analyses/old.jpg'
+        )
+        self.assertFalse(AnalyticsRollup.objects.exists())
+
+        self.save((DISEASE, 0.9, AnalysisResult.Severity.MEDIUM))
+        self.assertEqual(self.assertRollupMatchesRows().total_analyzed, 2)
+
+    def test_deleting_the_user_deletes_the_rollup(self):
+        self.save((DISEASE, 0.9, AnalysisResult.Severity.MEDIUM))
+
+        self.user.delete()
+        self.assertFalse(AnalyticsRollup.objects.exists())
+        self.assertFalse(AnalysisResult.objects.exists())
+
+
+class HistoryPaginationTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user('grower@example.com', 'Grower', 'password')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        AnalysisResult.objects.bulk_create([
+            AnalysisResult(
+                user=self.user, disease_name=DISEASE, confidence=0.9, severity=AnalysisResult.Severity.MEDIUM,
+                image=f'analyses/leaf_{index}.jpg'
+            )
+            for index in range(25)
+        ])
+        # Half of the rows share one timestamp, as rows saved by one batch can.
+        now = timezone.now()
+        ids = list(AnalysisResult.objects.order_by('id').values_list('id', flat=True))
+        for offset, pk in enumerate(ids):
+            created_at = now - timedelta(minutes=offset if offset < 12 else 12)
+            AnalysisResult.objects.filter(pk=pk).update(created_at=created_at)
+
+    def history(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_pages_cover_every_row_once_newest_first(self):
+        seen = []
+        page = self.history(f'{API}/history/?page_size=10')
+        while True:
+            seen += [row['id'] for row in page['results']]
+            if not page['next']:
+                break
+            page = self.history(page['next'])
+
+        expected = list(
+            AnalysisResult.objects.order_by('-created_at', '-id').values_list('id', flat=True)
+        )
+        self.assertEqual(seen, expected)
+
+    def test_without_pagination_parameters_the_full_list_is_returned(self):
+        self.assertEqual(len(self.history(f'{API}/history/')), 25)
+
+    def test_tampered_cursor_is_a_bad_request(self):
+        response = self.client.get(f'{API}/history/', {'cursor': 'not-a-cursor'})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('cursor', response.data)
+
+    def test_non_numeric_page_size_uses_the_default(self):
+        with mock.patch.object(HistoryCursorPagination, 'page_size', 5):
+            page = self.history(f'{API}/history/?page_size=lots')
+
+        self.assertEqual(len(page['results']), 5)
+
+    def test_page_size_is_capped(self):
+        with mock.patch.object(HistoryCursorPagination, 'max_page_size', 7):
+            page = self.history(f'{API}/history/?page_size=1000')
+
+        self.assertEqual(len(page['results']), 7)
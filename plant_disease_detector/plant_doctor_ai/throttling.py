@@ -0,0 +1,61 @@
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.throttling import BaseThrottle
+
+from .services.metrics import registry
+
+
+class AnalyzeRateThrottle(BaseThrottle):
+    """
+    A per-user token bucket for the analyze endpoints.
+
+    Every user starts with ANALYZE_RATE_LIMIT_BURST tokens, which refill at
+    ANALYZE_RATE_LIMIT_PER_MINUTE. Each analyze request, single or batch,
+    takes one; without one it gets a 429 with Retry-After set to when the
+    next token arrives. The buckets live in the default cache, like DRF's
+    own throttles, so they are shared between processes when the cache is.
+    """
+    cache_format = 'throttle_analyze_%s'
+    # Serializes the read-modify-write of a bucket within this process.
+    lock = threading.Lock()
+
+    def __init__(self):
+        self.rate = getattr(settings, 'ANALYZE_RATE_LIMIT_PER_MINUTE', 30) / 60
+        self.burst = getattr(settings, 'ANALYZE_RATE_LIMIT_BURST', 10)
+        self.retry_after = None
+
+    def allow_request(self, request, view):
+        if not request.user or not request.user.is_authenticated:
+            return True
+        match = getattr(request, 'resolver_match', None)
+        return self.consume(request.user.pk, view=match.url_name if match else 'unmatched')
+
+    def consume(self, user_id, view):
+        """Takes a token from the user's bucket. Returns False if it is empty."""
+        if self.rate <= 0:
+            return True
+
+        key = self.cache_format % user_id
+        with self.lock:
+            now = time.time()
+            tokens, updated_at = cache.get(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated_at) * self.rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            # Keep the bucket until it would be full again anyway.
+            cache.set(key, (tokens, now), timeout=int((self.burst - tokens) / self.rate) + 1)
+
+        if allowed:
+            return True
+        self.retry_after = (1 - tokens) / self.rate
+        registry.counter(
+            'plantdoc_rate_limited_total', 'Requests rejected by the per-user rate limit.', view=view
+        ).inc()
+        return False
+
+    def wait(self):
+        return self.retry_after
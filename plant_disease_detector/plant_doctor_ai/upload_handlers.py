@@ -0,0 +1,182 @@
+import hashlib
+import io
+
+from django.conf import settings
+from django.core.files.uploadhandler import FileUploadHandler, MemoryFileUploadHandler, TemporaryFileUploadHandler
+from PIL import Image
+
+from .services.metrics import registry
+
+IMAGE_FORMATS = {'JPEG', 'PNG', 'WEBP'}
+# Leading bytes of those formats, checked as soon as the first chunk arrives.
+IMAGE_SIGNATURES = (b'\xff\xd8\xff', b'\x89PNG\r\n\x1a\n', b'RIFF')
+SIGNATURE_BYTES = 8
+
+# A JPEG's dimensions follow its EXIF block, which can be up to 64KB (plus
+# other APPn segments). Give up on an image whose header is not readable
+# within this many bytes.
+IMAGE_HEADER_MAX_BYTES = 256 * 1024
+
+
+class UploadRejected(ValueError):
+    """
+    Raised while an upload streams in, to stop reading a file that will be
+    rejected anyway. Views turn it into a 4xx response with `status_code`.
+    """
+
+    def __init__(self, message, status_code, reason):
+        super().__init__(message)
+        self.status_code = status_code
+        self.reason = reason
+        registry.counter(
+            'plantdoc_upload_rejections_total', 'Uploads rejected while streaming in, by reason.', reason=reason
+        ).inc()
+
+
+def megabytes(size):
+    return f"{size / (1024 * 1024):.3g}MB"
+
+
+def sniff_image(head):
+    """
+    Reads the format and dimensions of an image from its first bytes.
+    Image.open() only parses the header; no pixels are decoded.
+
+    Returns:
+        tuple: (format, (width, height)), or None if `head` is too short.
+
+    Raises:
+        Image.DecompressionBombError: The image is too large for Pillow to even describe.
+    """
+    try:
+        with Image.open(io.BytesIO(head)) as image:
+            return image.format, image.size
+    except Image.DecompressionBombError:
+        raise
+    except Exception:
+        return None
+
+
+class ImageValidationUploadHandler(FileUploadHandler):
+    """
+    Checks every uploaded file while it streams in, before the hashing
+    handlers after it store anything:
+
+    - the file may not exceed IMAGE_UPLOAD_MAX_BYTES (413);
+    - its first bytes must be a JPEG, PNG or WebP signature (415);
+    - its header must give its dimensions, and width x height may not exceed
+      IMAGE_UPLOAD_MAX_PIXELS (413). Small files that inflate to huge
+      bitmaps (decompression bombs) are stopped here, before any pixel is
+      decoded.
+
+    Chunks are passed on unchanged, so the next handler still builds the file.
+    Only the analyze views install it (see validate_image_uploads()), since
+    they are the ones that turn UploadRejected into a 4xx response.
+    """
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.max_bytes = getattr(settings, 'IMAGE_UPLOAD_MAX_BYTES', 10 * 1024 * 1024)
+        self.max_pixels = getattr(settings, 'IMAGE_UPLOAD_MAX_PIXELS', 50_000_000)
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.received = 0
+        self.head = b''
+        self.image_info = None
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > self.max_bytes:
+            raise UploadRejected(
+                f"'{self.file_name}' is larger than {megabytes(self.max_bytes)}.", 413, 'bytes'
+            )
+        if self.image_info is None:
+            self.head += raw_data
+            self.check_header(complete=False)
+        return raw_data
+
+    def file_complete(self, file_size):
+        if self.image_info is None:
+            self.check_header(complete=True)
+        # The next handler returns the actual file object.
+        return None
+
+    def check_header(self, complete):
+        if len(self.head) < SIGNATURE_BYTES and not complete:
+            return
+        if not self.head.startswith(IMAGE_SIGNATURES):
+            raise UploadRejected(f"'{self.file_name}' is not a JPEG, PNG or WebP image.", 415, 'format')
+
+        try:
+            self.image_info = sniff_image(self.head)
+        except Image.DecompressionBombError:
+            raise self.too_many_pixels()
+        if self.image_info is None:
+            if complete or len(self.head) >= IMAGE_HEADER_MAX_BYTES:
+                raise UploadRejected(f"'{self.file_name}' is not a readable image.", 400, 'header')
+            return
+        self.head = b''
+
+        image_format, (width, height) = self.image_info
+        if image_format not in IMAGE_FORMATS:
+            raise UploadRejected(f"'{self.file_name}' is not a JPEG, PNG or WebP image.", 415, 'format')
+        if width * height > self.max_pixels:
+            raise self.too_many_pixels(f" ({width}x{height})")
+
+    def too_many_pixels(self, dimensions=''):
+        return UploadRejected(
+            f"'{self.file_name}'{dimensions} has too many pixels; images may have at most "
+            f"{self.max_pixels / 1e6:g} megapixels.", 413, 'pixels'
+        )
+
+
+def validate_image_uploads(request):
+    """
+    Puts ImageValidationUploadHandler in front of the request's upload
+    handlers, so every file in its body must be an acceptable image. Call it
+    before the body is read; the caller must handle UploadRejected.
+
+    Args:
+        request: A Django HttpRequest, or a DRF Request wrapping one.
+
+    Raises:
+        AttributeError: The body has already been parsed.
+    """
+    request = getattr(request, '_request', request)
+    request.upload_handlers = [ImageValidationUploadHandler(request), *request.upload_handlers]
+
+
+class ContentHashMixin:
+    """
+    Computes the SHA-256 of an uploaded file while it streams in, and attaches
+    the hex digest to the resulting file object as `sha256`. This saves a
+    second pass over the bytes when the upload is deduplicated.
+    """
+
+    def new_file(self, *args, **kwargs):
+        # Set up the hasher before calling super(): MemoryFileUploadHandler
+        # raises StopFutureHandlers from new_file() when it takes the upload.
+        self.hasher = hashlib.sha256()
+        super().new_file(*args, **kwargs)
+
+    def receive_data_chunk(self, raw_data, start):
+        # The in-memory handler passes chunks on untouched when the upload is
+        # too big for it; only hash the bytes this handler actually keeps.
+        if getattr(self, 'activated', True):
+            self.hasher.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        file = super().file_complete(file_size)
+        if file is not None:
+            file.sha256 = self.hasher.hexdigest()
+        return file
+
+
+class HashingMemoryFileUploadHandler(ContentHashMixin, MemoryFileUploadHandler):
+    pass
+
+
+class HashingTemporaryFileUploadHandler(ContentHashMixin, TemporaryFileUploadHandler):
+    pass
@@ -1,14 +1,27 @@
 from django.urls import path
 from .views import (
     AnalyzePlantView,
+    AnalyzePlantBatchView,
     AnalysisHistoryView,
+    AnalysisDetailView,
     AnalyticsDashboardView,
-    ChatbotView
+    ChatbotView,
+    ChatSessionListView,
+    ChatSessionDetailView,
+    MetricsView
 )
+from .async_views import AsyncAnalyzePlantView, AsyncChatbotView
 
 urlpatterns = [
     path('analyze/', AnalyzePlantView.as_view(), name='analyze-plant'),
+    path('analyze/batch/', AnalyzePlantBatchView.as_view(), name='analyze-plant-batch'),
     path('history/', AnalysisHistoryView.as_view(), name='analysis-history'),
+    path('analysis/<int:pk>/', AnalysisDetailView.as_view(), name='analysis-detail'),
     path('analytics/', AnalyticsDashboardView.as_view(), name='analytics-dashboard'),
-    path('chat/', ChatbotView.as_view(), name='chat')
+    path('chat/', ChatbotView.as_view(), name='chat'),
+    path('chat/sessions/', ChatSessionListView.as_view(), name='chat-sessions'),
+    path('chat/sessions/<uuid:pk>/', ChatSessionDetailView.as_view(), name='chat-session-detail'),
+    path('async/analyze/', AsyncAnalyzePlantView.as_view(), name='analyze-plant-async'),
+    path('async/chat/', AsyncChatbotView.as_view(), name='chat-async'),
+    path('metrics/', MetricsView.as_view(), name='metrics')
 ]
\ No newline at end of file
@@ -1,18 +1,112 @@
 from rest_framework.views import APIView
-from rest_framework.generics import ListAPIView
+from rest_framework.generics import ListAPIView, ListCreateAPIView, RetrieveDestroyAPIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.parsers import MultiPartParser, FormParser
-from django.db.models import Avg, Count
+from rest_framework.settings import api_settings
+from django.conf import settings
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.views import View
+from django.db.models import F
 from django.db import transaction
 
-from .services.model_service import model_service
-from .services.gemini_service import gemini_service
-from .models import AnalysisResult
+from .services.providers import model_service, gemini_service
+from .services.gemini_service import CHAT_ERROR_MESSAGE
+from .services.treatment_cache import treatment_cache
+from .services.content_store import discard_undecodable, store_blob, prediction_memo
+from .services.analytics import record_analyses, get_rollup
+from .services.derivatives import derivative_urls
+from .services.gemini_service import record_fallback
+from .services.metrics import registry, timed
+from .services.chat_sessions import append_turn, build_history, get_session
+from .services.chat_prefilter import chat_prefilter
+from .services.admission import AdmissionRejected, inference_admission
+from .models import AnalysisResult, ChatSession
 from users.models import User
-from .serializers import AnalysisResultSerializer, ChatbotRequestSerializer
+from .serializers import (
+    AnalysisResultSerializer, ChatbotRequestSerializer, ChatMessageSerializer, ChatSessionSerializer
+)
+from .renderers import EventStreamRenderer, sse_event
+from .pagination import HistoryCursorPagination
+from .throttling import AnalyzeRateThrottle
+from .upload_handlers import UploadRejected, megabytes, validate_image_uploads
+from .services.preprocessing import ImageDecodeError
+from .services.enrichment import enrichment_mode, enrichment_queue
+from .services.gemini_service import normalize_language
+import hmac
 import logging
+import time
+from collections import defaultdict
+
+STAGE_METRIC = 'plantdoc_request_stage_seconds'
+STAGE_DESCRIPTION = 'Time spent in each stage of a request.'
+
+# Comment line sent on otherwise idle event streams, so that proxies keep them open.
+SSE_KEEPALIVE = ": keep-alive\n\n"
+SSE_KEEPALIVE_SECONDS = 15
+# Reconnection delay suggested to EventSource clients when a stream times out.
+SSE_RETRY = "retry: 1000\n\n"
+
+def stage(view, name):
+    """Times one stage of a request into plantdoc_request_stage_seconds{view, stage}."""
+    return timed(STAGE_METRIC, STAGE_DESCRIPTION, view=view, stage=name)
+
+def observe_stage(view, name, seconds):
+    registry.histogram(STAGE_METRIC, description=STAGE_DESCRIPTION, view=view, stage=name).observe(seconds)
+
+def chat_request_too_large(request):
+    """True if the request body is larger than CHAT_MAX_REQUEST_BYTES."""
+    try:
+        length = int(request.META.get('CONTENT_LENGTH') or 0)
+    except ValueError:
+        return False
+    return length > getattr(settings, 'CHAT_MAX_REQUEST_BYTES', 1048576)
+
+CHAT_TOO_LARGE_ERROR = {"error": "Chat request is too large. Continue the conversation with a sessionId instead of the full history."}
+
+def resolve_chat_session(user, validated_data):
+    """
+    Finds the chat session of a request and the history to send to Gemini.
+
+    Requests with a sessionId continue that session; requests without one
+    (older clients) carry their own history, trimmed to its newest messages.
+
+    Returns:
+        tuple: (session or None, history). The session is None both for
+               history-carrying requests and for unknown session ids, which
+               the caller tells apart by validated_data['sessionId'].
+    """
+    session_id = validated_data.get('sessionId')
+    if not session_id:
+        return None, validated_data.get('history')
+    session = get_session(user, session_id)
+    return session, build_history(session) if session else []
+
+# Room for the multipart boundaries, part headers and form fields around the files.
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+def upload_too_large(request, max_files=1):
+    """True if the declared body is larger than max_files images can possibly be."""
+    try:
+        length = int(request.META.get('CONTENT_LENGTH') or 0)
+    except ValueError:
+        return False
+    max_bytes = getattr(settings, 'IMAGE_UPLOAD_MAX_BYTES', 10 * 1024 * 1024)
+    return length > max_files * max_bytes + MULTIPART_OVERHEAD_BYTES
+
+def upload_too_large_error():
+    max_bytes = getattr(settings, 'IMAGE_UPLOAD_MAX_BYTES', 10 * 1024 * 1024)
+    return {"error": f"Upload is too large. Images may be at most {megabytes(max_bytes)} each."}
+
+BUSY_ERROR = {"error": "The server is busy analyzing other images. Please try again shortly."}
+
+def busy_response(rejection):
+    """A 503 for a request that admission control turned away, with its Retry-After."""
+    return Response(
+        BUSY_ERROR, status=status.HTTP_503_SERVICE_UNAVAILABLE,
+        headers={'Retry-After': str(rejection.retry_after)}
+    )
 
 def infer_severity(confidence):
     """
@@ -27,16 +121,192 @@ def infer_severity(confidence):
     else:
         return AnalysisResult.Severity.LOW
 
+def format_analysis(analysis, request):
+    """
+    Formats a saved AnalysisResult to match the frontend ResultCard/Modal.
+    """
+    derivatives = derivative_urls(analysis.image, request)
+    return {
+        "id": analysis.id,
+        "disease": analysis.disease_name.replace('___', ' ').replace('_', ' '),
+        "confidence": analysis.confidence,
+        "severity": analysis.severity,
+        "cure": analysis.recommended_treatment,
+        "recoveryTime": analysis.expected_recovery_time,
+        "preventiveMeasures": analysis.prevention_tips,
+        "topPredictions": [
+            {
+                "disease": item['disease'].replace('___', ' ').replace('_', ' '),
+                "confidence": item['confidence']
+            }
+            for item in analysis.top_predictions
+        ],
+        "preview": request.build_absolute_uri(analysis.image.url),
+        "thumbnail": derivatives.get('thumb', {}).get('jpeg'),
+        "derivatives": derivatives,
+        "enrichmentStatus": analysis.enrichment_status
+    }
+
+def wants_event_stream(request):
+    """True for 'Accept: text/event-stream' or '?stream=true'."""
+    if request.query_params.get('stream', '').lower() in ('1', 'true', 'yes'):
+        return True
+    return getattr(request, 'accepted_renderer', None) is not None and \
+        request.accepted_renderer.media_type == EventStreamRenderer.media_type
+
+def event_stream_response(events):
+    response = StreamingHttpResponse(events, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+def classify_uploads(image_files, view='analyze'):
+    """
+    Stores each upload once under its content hash and predicts its disease.
+
+    Uploads whose bytes were seen before reuse the stored file, and a
+    prediction memoized for the current model version skips inference. Only
+    the remaining images reach the model: one through the micro-batcher, or
+    several in a single forward pass.
+
+    Returns:
+        tuple: (blobs, predictions), both in upload order.
+    """
+    with stage(view, 'store'):
+        blobs = [store_blob(image_file) for image_file in image_files]
+    model_version = model_service.model_version
+    with stage(view, 'memo'):
+        predictions = [prediction_memo.get(blob, model_version) for blob in blobs]
+
+    missing = [index for index, prediction in enumerate(predictions) if prediction is None]
+    try:
+        with stage(view, 'predict'):
+            if len(missing) == 1:
+                fresh = [model_service.predict(image_files[missing[0]])]
+            elif missing:
+                fresh = model_service.predict_many([image_files[index] for index in missing])
+            else:
+                fresh = []
+    except ImageDecodeError:
+        # Don't keep the stored files of uploads that turned out not to be images.
+        for index in missing:
+            discard_undecodable(blobs[index], image_files[index])
+        raise
+
+    for index, prediction in zip(missing, fresh):
+        predictions[index] = prediction
+        prediction_memo.set(blobs[index], model_version, prediction)
+    return blobs, predictions
+
+def save_analyses(user, analyses):
+    """
+    Persists analysis results for one user.
+
+    The images are already in storage (see classify_uploads), so only the
+    row inserts, the counter update and the analytics rollup run inside the
+    atomic block. The counters are bumped with F() expressions so that
+    concurrent analyses never overwrite each other's increments.
+
+    Returns:
+        list: The saved AnalysisResult instances, with primary keys set.
+    """
+    with transaction.atomic():
+        analyses = AnalysisResult.objects.bulk_create(analyses)
+        User.objects.filter(pk=user.pk).update(
+            total_uploads=F('total_uploads') + len(analyses),
+            total_analyzed=F('total_analyzed') + len(analyses)
+        )
+        record_analyses(user, analyses)
+    return analyses
+
+def build_analysis(user, blob, prediction, treatment_info, language=None):
+    """
+    Builds an unsaved AnalysisResult from a prediction and its treatment info.
+    The image field points at the shared blob file rather than a copy.
+
+    Without treatment info (None), the analysis is marked as pending and
+    left for the background enrichment queue (see queue_enrichment).
+    """
+    pending = treatment_info is None
+    treatment_info = treatment_info or {}
+    analysis = AnalysisResult(
+        user=user,
+        disease_name=prediction['disease'],
+        confidence=prediction['confidence'],
+        severity=infer_severity(prediction['confidence']),
+        recommended_treatment=treatment_info.get('recommended_treatment', '' if pending else 'N/A'),
+        prevention_tips=treatment_info.get('prevention_tips', []),
+        expected_recovery_time=treatment_info.get('expected_recovery_time', '' if pending else 'Varies'),
+        top_predictions=prediction.get('top_k', []),
+        enrichment_status=(
+            AnalysisResult.EnrichmentStatus.PENDING if pending else AnalysisResult.EnrichmentStatus.COMPLETE
+        ),
+        language=normalize_language(language)
+    )
+    analysis.image.name = blob.file.name
+    return analysis
+
+def lookup_treatments(diseases, language, mode):
+    """
+    Treatment info for each disease.
+
+    'inline' mode fetches it from the cache, or Gemini on a miss. 'background'
+    mode only reads the cache and maps misses to None, so that their
+    analyses are saved as pending and enriched after the response.
+
+    Returns:
+        dict: disease name -> treatment info (or None)
+    """
+    if mode == 'background':
+        return {disease: treatment_cache.get(disease, language) for disease in diseases}
+    return {disease: treatment_cache.get_treatment_info(disease, language=language) for disease in diseases}
+
+def queue_enrichment(analyses, language):
+    """Queues the saved, pending analyses for background enrichment, one job per disease."""
+    pending = defaultdict(list)
+    for analysis in analyses:
+        if analysis.enrichment_status == AnalysisResult.EnrichmentStatus.PENDING:
+            pending[analysis.disease_name].append(analysis.pk)
+    for disease, analysis_ids in pending.items():
+        enrichment_queue.submit(analysis_ids, disease, language)
+
 class AnalyzePlantView(APIView):
     """
     Handles the image upload, analysis, and returns the full result.
+
+    Decoding, inference and treatment enrichment run outside of any database
+    transaction; only the final insert and counter update are atomic.
+
+    Requests are rate limited per user (429), and decoding and inference
+    only start once admission control has a slot for them (503 when the
+    queue is full); see services.admission.
+
+    With '?enrichment=background' (or TREATMENT_ENRICHMENT_MODE='background'),
+    the response does not wait for Gemini: a treatment that is not cached
+    yet is filled in later, and the result says enrichmentStatus 'pending'
+    until then (see AnalysisDetailView).
     """
     permission_classes = [IsAuthenticated]
     parser_classes = [MultiPartParser, FormParser]
+    throttle_classes = [AnalyzeRateThrottle]
 
-    @transaction.atomic
     def post(self, request, *args, **kwargs):
-        image_file = request.data.get('image')
+        # Fail fast, before reading the upload, if it is too large or could not even be queued
+        if upload_too_large(request):
+            return Response(upload_too_large_error(), status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        try:
+            inference_admission.check()
+        except AdmissionRejected as rejection:
+            return busy_response(rejection)
+
+        # Accessing request.data parses the multipart body; the upload
+        # handlers reject bad images while it streams in
+        validate_image_uploads(request)
+        try:
+            with stage('analyze', 'parse'):
+                image_file = request.data.get('image')
+        except UploadRejected as rejection:
+            return Response({"error": str(rejection)}, status=rejection.status_code)
         language = request.headers.get('Language')
         
         if not image_file:
@@ -47,99 +317,211 @@ class AnalyzePlantView(APIView):
 
         user = request.user
 
-        # 1. Predict disease using the PyTorch model
-        prediction = model_service.predict(image_file)
+        # 1. Store the image once and predict its disease (memoized per content hash)
+        try:
+            with inference_admission.admit():
+                (blob,), (prediction,) = classify_uploads([image_file], view='analyze')
+        except AdmissionRejected as rejection:
+            return busy_response(rejection)
+        except ImageDecodeError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
         if not prediction:
             return Response(
                 {"error": "Failed to analyze the image."},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
-        # 2. Get treatment info from Gemini
-        treatment_info = gemini_service.get_treatment_info(prediction['disease'], language=language)
-
-        # 3. Infer severity based on confidence
-        severity = infer_severity(prediction['confidence'])
-
-        # 4. Save the result to the database
-        analysis = AnalysisResult.objects.create(
-            user=user,
-            image=image_file,
-            disease_name=prediction['disease'],
-            confidence=prediction['confidence'],
-            severity=severity,
-            recommended_treatment=treatment_info.get('recommended_treatment', 'N/A'),
-            prevention_tips=treatment_info.get('prevention_tips', []),
-            expected_recovery_time=treatment_info.get('expected_recovery_time', 'Varies')
-        )
+        # 2. Enrich with treatment info, from the cache or Gemini on a miss
+        #    (or, in background mode, later)
+        mode = enrichment_mode(request.query_params.get('enrichment'))
+        with stage('analyze', 'treatment'):
+            treatments = lookup_treatments({prediction['disease']}, language, mode)
 
-        # 5. Update user analytics
-        user.total_uploads += 1
-        user.total_analyzed += 1
-        user.save(update_fields=['total_uploads', 'total_analyzed'])
-
-        # 6. Format the response to match the frontend ResultCard/Modal
-        response_data = {
-            "id": analysis.id,
-            "disease": analysis.disease_name.replace('___', ' ').replace('_', ' '),
-            "confidence": analysis.confidence,
-            "severity": analysis.severity,
-            "cure": analysis.recommended_treatment,
-            "recoveryTime": analysis.expected_recovery_time,
-            "preventiveMeasures": analysis.prevention_tips,
-            "preview": request.build_absolute_uri(analysis.image.url)
-        }
+        # 3. Save the result and update user analytics in a short transaction
+        analysis = build_analysis(user, blob, prediction, treatments[prediction['disease']], language)
+        with stage('analyze', 'save'):
+            analysis, = save_analyses(user, [analysis])
+        queue_enrichment([analysis], language)
+
+        # 4. Format the response to match the frontend ResultCard/Modal
+        with stage('analyze', 'format'):
+            response_data = format_analysis(analysis, request)
+
+        return Response(response_data, status=status.HTTP_200_OK)
+
+
+class AnalyzePlantBatchView(APIView):
+    """
+    Analyzes many images from one multipart request.
+
+    Images not seen before are classified in a single forward pass, treatment info is
+    fetched once per distinct disease, and the results are written with one
+    bulk insert and one counter update. The whole batch takes one admission
+    slot, like a single analysis, since it runs as one forward pass.
+    """
+    permission_classes = [IsAuthenticated]
+    parser_classes = [MultiPartParser, FormParser]
+    throttle_classes = [AnalyzeRateThrottle]
+
+    def post(self, request, *args, **kwargs):
+        max_images = getattr(settings, 'ANALYZE_BATCH_MAX_IMAGES', 32)
+        if upload_too_large(request, max_files=max_images):
+            return Response(upload_too_large_error(), status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        try:
+            inference_admission.check()
+        except AdmissionRejected as rejection:
+            return busy_response(rejection)
+
+        validate_image_uploads(request)
+        try:
+            with stage('analyze_batch', 'parse'):
+                image_files = request.FILES.getlist('images')
+        except UploadRejected as rejection:
+            return Response({"error": str(rejection)}, status=rejection.status_code)
+        language = request.headers.get('Language')
+
+        if not image_files:
+            return Response(
+                {"error": "No image files provided."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        if len(image_files) > max_images:
+            return Response(
+                {"error": f"Too many images. A batch can contain at most {max_images}."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        user = request.user
+
+        # 1. Store the images and predict the new ones with one batched forward pass
+        try:
+            with inference_admission.admit():
+                blobs, predictions = classify_uploads(image_files, view='analyze_batch')
+        except AdmissionRejected as rejection:
+            return busy_response(rejection)
+        except ImageDecodeError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        # 2. Get treatment info once per distinct disease (or, in background mode, later)
+        mode = enrichment_mode(request.query_params.get('enrichment'))
+        with stage('analyze_batch', 'treatment'):
+            treatments = lookup_treatments({prediction['disease'] for prediction in predictions}, language, mode)
+
+        # 3. Save every result and update user analytics in one short transaction
+        analyses = [
+            build_analysis(user, blob, prediction, treatments[prediction['disease']], language)
+            for blob, prediction in zip(blobs, predictions)
+        ]
+        with stage('analyze_batch', 'save'):
+            analyses = save_analyses(user, analyses)
+        queue_enrichment(analyses, language)
+
+        # 4. Format one response entry per image, in upload order
+        with stage('analyze_batch', 'format'):
+            response_data = {
+                "results": [format_analysis(analysis, request) for analysis in analyses]
+            }
 
         return Response(response_data, status=status.HTTP_200_OK)
 
 
 class AnalysisHistoryView(ListAPIView):
     """
-    Returns a paginated list of the user's past analysis results.
+    Returns the user's past analysis results, newest first.
+
+    Pass `page_size` and/or `cursor` to page through them with keyset
+    pagination; without either, the full list is returned.
     """
     permission_classes = [IsAuthenticated]
     serializer_class = AnalysisResultSerializer
+    pagination_class = HistoryCursorPagination
 
     def get_queryset(self):
-        return AnalysisResult.objects.filter(user=self.request.user)
+        # Only load the columns the list serializer needs; the treatment text
+        # and prevention tips are by far the largest part of each row.
+        return AnalysisResult.objects.filter(user=self.request.user).only(
+            'id', 'image', 'disease_name', 'confidence', 'severity', 'enrichment_status', 'created_at'
+        )
+
+
+class AnalysisDetailView(APIView):
+    """
+    Returns one of the user's analyses, formatted like the analyze response.
+
+    Clients that analyze with background enrichment either poll this until
+    enrichmentStatus is no longer 'pending', or ask for an event stream
+    ('Accept: text/event-stream' or '?stream=true'), which sends a single
+    'done' event with the complete result as soon as the treatment is in.
+
+    Each stream holds a worker thread, so it is kept short: after
+    ENRICHMENT_STREAM_TIMEOUT_SECONDS it ends with a 'timeout' event and
+    the client reconnects (EventSource does so by itself).
+    """
+    permission_classes = [IsAuthenticated]
+    renderer_classes = list(api_settings.DEFAULT_RENDERER_CLASSES) + [EventStreamRenderer]
+
+    def get(self, request, pk, *args, **kwargs):
+        analysis = AnalysisResult.objects.filter(user=request.user, pk=pk).first()
+        if analysis is None:
+            return Response({"error": "Analysis not found."}, status=status.HTTP_404_NOT_FOUND)
+
+        if wants_event_stream(request):
+            return event_stream_response(self.event_stream(analysis, request))
+        return Response(format_analysis(analysis, request), status=status.HTTP_200_OK)
+
+    def event_stream(self, analysis, request):
+        """
+        Sends 'done' with the formatted analysis once it is no longer
+        pending. If it still is after ENRICHMENT_STREAM_TIMEOUT_SECONDS, a
+        'timeout' event is sent instead, with a retry hint for reconnecting.
+        """
+        interval = getattr(settings, 'ENRICHMENT_POLL_INTERVAL_SECONDS', 0.5)
+        started = last_sent = time.monotonic()
+        deadline = started + getattr(settings, 'ENRICHMENT_STREAM_TIMEOUT_SECONDS', 10)
+
+        while analysis.enrichment_status == AnalysisResult.EnrichmentStatus.PENDING:
+            if time.monotonic() >= deadline:
+                yield SSE_RETRY
+                yield sse_event({"id": analysis.id, "enrichmentStatus": analysis.enrichment_status}, event='timeout')
+                return
+            # Wakes up as soon as a local enrichment finishes; otherwise polls.
+            enrichment_queue.wait(analysis.pk, interval)
+            analysis.refresh_from_db()
+            if time.monotonic() - last_sent >= SSE_KEEPALIVE_SECONDS:
+                last_sent = time.monotonic()
+                yield SSE_KEEPALIVE
+
+        yield sse_event(format_analysis(analysis, request), event='done')
 
 
 class AnalyticsDashboardView(APIView):
     """
     Provides aggregated data for the user's analytics dashboard.
+
+    The figures come from the user's AnalyticsRollup row, which is kept up to
+    date as analyses are saved, so this is one lookup regardless of history size.
     """
     permission_classes = [IsAuthenticated]
 
     def get(self, request, *args, **kwargs):
         user = request.user
-        queryset = AnalysisResult.objects.filter(user=user)
+        rollup = get_rollup(user)
 
         total_uploads = user.total_uploads
-        total_analyzed = queryset.count()
-
-        avg_confidence_data = queryset.aggregate(avg_conf=Avg('confidence'))
-        avg_confidence = avg_confidence_data['avg_conf'] or 0
-
-        disease_distribution = list(
-            queryset.values('disease_name')
-            .annotate(count=Count('disease_name'))
-            .order_by('-count')
-        )
-        
-        severity_distribution = list(
-            queryset.values('severity')
-            .annotate(count=Count('severity'))
-            .order_by('-count')
-        )
+        total_analyzed = rollup.total_analyzed
+        avg_confidence = rollup.avg_confidence
 
         formatted_disease_dist = [
-            {"name": item['disease_name'].replace('___', ' ').replace('_', ' '), "value": item['count']}
-            for item in disease_distribution
+            {"name": name.replace('___', ' ').replace('_', ' '), "value": count}
+            for name, count in sorted(rollup.disease_counts.items(), key=lambda item: (-item[1], item[0]))
+            if count
         ]
         
         formatted_severity_dist = [
-            {"name": item['severity'], "value": item['count']}
-            for item in severity_distribution
+            {"name": severity, "value": count}
+            for severity, count in sorted(rollup.severity_counts.items(), key=lambda item: (-item[1], item[0]))
+            if count
         ]
 
         dashboard_data = {
@@ -156,24 +538,144 @@ class AnalyticsDashboardView(APIView):
         return Response(dashboard_data, status=status.HTTP_200_OK)
     
 class ChatbotView(APIView):
+    """
+    Answers a chat message. Clients that send 'Accept: text/event-stream' or
+    '?stream=true' get the answer as Server-Sent Events while it is being
+    generated, instead of one JSON blob at the end.
+
+    Conversations can be kept server-side: create a session with
+    POST chat/sessions/ and send its id as 'sessionId' with each message,
+    instead of the whole history (see services.chat_sessions).
+
+    Platform FAQs, greetings and off-topic messages are answered locally,
+    without a Gemini call (see services.chat_prefilter).
+    """
     permission_classes = [IsAuthenticated]
+    renderer_classes = list(api_settings.DEFAULT_RENDERER_CLASSES) + [EventStreamRenderer]
 
     def post(self, request, *args, **kwargs):
-        serializer = ChatbotRequestSerializer(data=request.data)
-        if not serializer.is_valid():
+        if chat_request_too_large(request):
+            return Response(CHAT_TOO_LARGE_ERROR, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+
+        with stage('chat', 'validate'):
+            serializer = ChatbotRequestSerializer(data=request.data)
+            valid = serializer.is_valid()
+        if not valid:
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
         validated_data = serializer.validated_data
-        history = validated_data.get('history')
         new_message = validated_data.get('newMessage')
+        language = request.headers.get('Language')
 
-        try:
-            language = request.headers.get('Language')
-            ai_response = gemini_service.process_chat(history, new_message, language=language)
+        with stage('chat', 'history'):
+            session, history = resolve_chat_session(request.user, validated_data)
+        if session is None and validated_data.get('sessionId'):
+            return Response({"error": "Chat session not found."}, status=status.HTTP_404_NOT_FOUND)
+
+        local_answer = chat_prefilter.answer(new_message, language)
+
+        if wants_event_stream(request):
+            return event_stream_response(self.event_stream(session, history, new_message, language, local_answer))
+
+        if local_answer is not None:
+            ai_response = local_answer
+        else:
+            try:
+                with stage('chat', 'gemini'):
+                    ai_response = gemini_service.process_chat(history, new_message, language=language)
+            except Exception as e:
+                return Response(
+                    {"error": "An unexpected error occurred. We are unable to process your request at this time."},
+                    status=status.HTTP_500_INTERNAL_SERVER_ERROR
+                )
+
+        if session is None:
             return Response({"response": ai_response}, status=status.HTTP_200_OK)
 
+        # Failed answers are not stored, so the user can simply ask again.
+        if ai_response != CHAT_ERROR_MESSAGE:
+            with stage('chat', 'save'):
+                append_turn(session, new_message, ai_response)
+        return Response({"response": ai_response, "sessionId": str(session.id)}, status=status.HTTP_200_OK)
+
+    def event_stream(self, session, history, new_message, language, local_answer=None):
+        """
+        Emits one 'message' event per chunk and a final 'done' event with the
+        full answer (and the sessionId, for session chats). If Gemini fails
+        part-way through, an 'error' event with the usual fallback text is
+        sent instead of 'done'. A local answer is sent as a single chunk.
+        """
+        chunks = []
+        started = time.perf_counter()
+        if local_answer is not None:
+            stream = [local_answer]
+        else:
+            stream = gemini_service.stream_chat(history, new_message, language=language)
+        try:
+            for text in stream:
+                if not chunks:
+                    observe_stage('chat', 'first_chunk', time.perf_counter() - started)
+                chunks.append(text)
+                yield sse_event({"text": text})
         except Exception as e:
-            return Response(
-                {"error": "An unexpected error occurred. We are unable to process your request at this time."},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
\ No newline at end of file
+            print(f"Error during Gemini chat streaming: {e}")
+            record_fallback('chat_stream')
+            error = {"response": CHAT_ERROR_MESSAGE, "partial": "".join(chunks)}
+            if session is not None:
+                error["sessionId"] = str(session.id)
+            yield sse_event(error, event='error')
+            return
+        observe_stage('chat', 'stream', time.perf_counter() - started)
+
+        answer = "".join(chunks).strip()
+        if session is None:
+            yield sse_event({"response": answer}, event='done')
+            return
+        append_turn(session, new_message, answer)
+        yield sse_event({"response": answer, "sessionId": str(session.id)}, event='done')
+
+
+class ChatSessionListView(ListCreateAPIView):
+    """Lists the user's chat sessions, most recently active first, or starts a new one."""
+    permission_classes = [IsAuthenticated]
+    serializer_class = ChatSessionSerializer
+
+    def get_queryset(self):
+        return ChatSession.objects.filter(user=self.request.user)
+
+    def perform_create(self, serializer):
+        serializer.save(user=self.request.user)
+
+
+class ChatSessionDetailView(RetrieveDestroyAPIView):
+    """Returns a chat session with its full transcript, or deletes it."""
+    permission_classes = [IsAuthenticated]
+    serializer_class = ChatSessionSerializer
+
+    def get_queryset(self):
+        return ChatSession.objects.filter(user=self.request.user)
+
+    def retrieve(self, request, *args, **kwargs):
+        session = self.get_object()
+        data = self.get_serializer(session).data
+        data['messages'] = ChatMessageSerializer(session.messages.all(), many=True).data
+        return Response(data)
+
+
+class MetricsView(View):
+    """
+    Exposes the in-process metrics (request and stage latencies, model load
+    time, batching, cache hit rates, Gemini errors and fallbacks) in the
+    Prometheus text format. Scrapers must send METRICS_TOKEN as a bearer
+    token; without a configured token the endpoint is disabled (404).
+    """
+
+    def get(self, request, *args, **kwargs):
+        token = getattr(settings, 'METRICS_TOKEN', '')
+        if not token:
+            raise Http404("Metrics are disabled.")
+        supplied = request.headers.get('Authorization', '').removeprefix('Bearer ').strip()
+        if not hmac.compare_digest(supplied.encode(), token.encode()):
+            return HttpResponse("Unauthorized\n", status=status.HTTP_401_UNAUTHORIZED, content_type='text/plain')
+
+        return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
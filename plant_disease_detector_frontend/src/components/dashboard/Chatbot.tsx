@@ -7,6 +7,8 @@ import { useAppContext } from '../../contexts/AppContext';
 // --- API Configuration ---
 const API_BASE_URL = 'http://127.0.0.1:8000';
 const CHAT_API_ENDPOINT = '/api/plant_doctor_ai/chat/';
+// The API only uses this many of the newest history messages (CHAT_MAX_HISTORY_MESSAGES).
+const MAX_HISTORY_MESSAGES = 40;
 
 // --- Type Definitions ---
 
@@ -60,7 +62,7 @@ const apiClient = {
 // --- Helper Function ---
 
 const formatHistoryForApi = (messages: Message[]): GeminiHistoryItem[] => {
-  return messages.slice(1).map(message => ({
+  return messages.slice(1).slice(-MAX_HISTORY_MESSAGES).map(message => ({
     role: message.isUser ? 'user' : 'model',
     parts: [{ text: message.text }],
   }));